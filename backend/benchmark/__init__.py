@@ -0,0 +1,18 @@
+"""
+Offline load benchmarks for the API.
+
+main.py runs against a local stand-in for its upstreams (mock_upstream.py:
+SportsDB replayed from the Postman collection, simulated Groq latency and
+token streaming, mock Pinata), and load scenarios (scenarios.py) report
+throughput and p50/p95/p99 latency per route:
+
+    cd backend
+    python -m benchmark                                # every scenario, 20s each
+    python -m benchmark -s dashboard_burst -d 10 --json bench.json
+    python -m benchmark --baseline bench.json          # exit 1 on regressions (CI)
+
+A run also exits 1 when any route answered with errors (--max-error-rate).
+    python -m benchmark --target http://localhost:8000 --mock-url http://localhost:8020
+
+Needs uvicorn (backend/requirements.txt) to start the servers.
+"""
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from .runner import LocalStack, compare, failing_routes, format_report, run_scenario
+from .scenarios import SCENARIOS
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Offline load benchmarks for the API")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("-d", "--duration", type=float, default=20.0, help="Measured seconds per scenario")
+    parser.add_argument("-w", "--warmup", type=float, default=3.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("-u", "--users", type=int, help="Virtual users (default: per scenario)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app-workers", type=int, default=1, help="uvicorn workers for the API under test")
+    parser.add_argument("--target", help="Benchmark an already running API instead of starting one")
+    parser.add_argument("--mock-url", help="Mock upstream of the --target API, to report upstream calls")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--max-error-rate", type=float, default=0.0,
+                        help="Allowed share of failed requests per route (default 0: any error fails the run)")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    stack = None
+    base_url, mock_url = args.target, args.mock_url
+    if base_url is None:
+        stack = LocalStack(app_workers=args.app_workers)
+        await stack.start()
+        base_url, mock_url = stack.app_url, stack.mock_url
+    try:
+        results = {}
+        for name in args.scenario or list(SCENARIOS):
+            print(f"Running {name} ({args.warmup:g}s warmup + {args.duration:g}s)...", file=sys.stderr)
+            results[name] = await run_scenario(
+                base_url, SCENARIOS[name], args.duration, args.warmup,
+                users=args.users, seed=args.seed, mock_url=mock_url
+            )
+        return results
+    finally:
+        if stack is not None:
+            stack.stop()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    print(format_report(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"scenarios": results}, f, indent=2)
+    status = 0
+    failing = failing_routes(results, args.max_error_rate)
+    if failing:
+        print("\nRoutes with errors:\n  " + "\n  ".join(failing))
+        status = 1
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["scenarios"]
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print("\nRegressions against " + args.baseline + ":\n  " + "\n  ".join(regressions))
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Local stand-in for the Pinata pinning API.
+
+Stores pinned files in memory and answers with the same CIDs IPFS would
+assign, so the pinning queue can be exercised without a Pinata account:
+
+    uvicorn benchmark.mock_pinata:app --port 8010
+    PINATA_BASE_URL=http://localhost:8010 uvicorn main:app
+
+Set MOCK_PINATA_FAILURE_RATE (0..1) to make a share of pin requests fail
+with a 503, e.g. to watch the queue's retries.
+"""
+import json
+import os
+import random
+from datetime import datetime
+from typing import Dict
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import Response
+
+from ipfs_pinning import compute_cid, encode_json
+
+app = FastAPI(title="Mock Pinata")
+
+FAILURE_RATE = float(os.getenv("MOCK_PINATA_FAILURE_RATE", "0"))
+
+pins: Dict[str, Dict] = {}
+
+
+def pin_content(content: bytes, name: str) -> Dict:
+    if random.random() < FAILURE_RATE:
+        raise HTTPException(status_code=503, detail="Simulated pinning failure")
+    cid = compute_cid(content)
+    if cid is None:
+        raise HTTPException(status_code=413, detail="Mock pinning only supports single-chunk files")
+    duplicate = cid in pins
+    pins[cid] = {"content": content, "name": name, "timestamp": datetime.now().isoformat()}
+    return {"IpfsHash": cid, "PinSize": len(content), "Timestamp": pins[cid]["timestamp"], "isDuplicate": duplicate}
+
+
+@app.post("/pinning/pinFileToIPFS")
+async def pin_file(file: UploadFile = File(...), pinataMetadata: str = Form("{}")):
+    name = json.loads(pinataMetadata).get("name") or file.filename
+    return pin_content(await file.read(), name)
+
+
+@app.post("/pinning/pinJSONToIPFS")
+async def pin_json(body: Dict):
+    name = (body.get("pinataMetadata") or {}).get("name")
+    return pin_content(encode_json(body.get("pinataContent")), name)
+
+
+@app.get("/ipfs/{cid}")
+async def get_content(cid: str):
+    pin = pins.get(cid)
+    if pin is None:
+        raise HTTPException(status_code=404, detail="Not pinned")
+    return Response(content=pin["content"], media_type="application/json")
+
+
+@app.get("/data/pinList")
+async def pin_list():
+    return {
+        "count": len(pins),
+        "rows": [{"ipfs_pin_hash": cid, "size": len(p["content"]), "metadata": {"name": p["name"]}} for cid, p in pins.items()],
+    }
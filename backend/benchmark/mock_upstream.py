@@ -0,0 +1,250 @@
+"""
+Local stand-in for SportsDB, Groq and Pinata, for benchmarks.
+
+SportsDB responses are replayed from the Postman collection in the repo
+root: the saved example of each request becomes the response of its script
+(lookupevent.php, searchteams.php, ...) whatever the query. A few fixups make
+the examples look like what the live API returns to main.py:
+
+* list keys the examples get wrong ("event" -> "events", "tables" -> "table"),
+* single-row lookups echo the id asked for (lookupevent.php?id=5 -> idEvent 5),
+* schedule, table and search lists are padded to MOCK_SPORTSDB_ROWS rows with
+  distinct ids, the size of a real schedule,
+* events with a score but no status are reported as "Match Finished",
+* events looked up with an id from MOCK_UPCOMING_EVENT_IDS on are fixtures
+  that haven't kicked off: dated a week ahead, no score, "Not Started".
+
+Groq chat completions are simulated: a valid prediction JSON naming one of
+the prompt's teams, after MOCK_GROQ_FIRST_TOKEN_MS, then generated at
+MOCK_GROQ_TOKENS_PER_SEC (streamed as SSE deltas when stream=true). The
+Pinata mock (mock_pinata.py) is mounted under /pinata.
+
+    uvicorn benchmark.mock_upstream:app --port 8020
+    SPORTSDB_API_URL=http://localhost:8020/sportsdb/api/v1/json \\
+    GROQ_BASE_URL=http://localhost:8020/groq/openai/v1 \\
+    PINATA_BASE_URL=http://localhost:8020/pinata uvicorn main:app
+
+python -m benchmark starts both for you. Upstream call counts are served on
+/stats, so a run can report how many calls each scenario cost.
+"""
+import asyncio
+import copy
+import json
+import os
+import random
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from . import mock_pinata
+
+COLLECTION_PATH = os.getenv(
+    "MOCK_SPORTSDB_COLLECTION",
+    os.path.join(os.path.dirname(__file__), "..", "..", "TheSportsDB V1 API.postman_collection.json")
+)
+SPORTSDB_LATENCY_MS = float(os.getenv("MOCK_SPORTSDB_LATENCY_MS", "40"))
+SPORTSDB_JITTER_MS = float(os.getenv("MOCK_SPORTSDB_JITTER_MS", "20"))
+SPORTSDB_ROWS = int(os.getenv("MOCK_SPORTSDB_ROWS", "15"))
+GROQ_FIRST_TOKEN_MS = float(os.getenv("MOCK_GROQ_FIRST_TOKEN_MS", "300"))
+GROQ_TOKENS_PER_SEC = float(os.getenv("MOCK_GROQ_TOKENS_PER_SEC", "250"))
+GROQ_ERROR_RATE = float(os.getenv("MOCK_GROQ_ERROR_RATE", "0"))
+# lookupevent.php ids from here on are upcoming fixtures (predictions can be regenerated)
+UPCOMING_EVENT_IDS = int(os.getenv("MOCK_UPCOMING_EVENT_IDS", "3000000"))
+
+# Response list keys the collection's examples name differently from the live API
+KEY_FIXES = {
+    "lookupevent.php": ("event", "events"),
+    "lookuptable.php": ("tables", "table"),
+}
+
+# Single-row lookups: id field set to the id requested
+ECHO_IDS = {
+    "lookupevent.php": "idEvent",
+    "lookupteam.php": "idTeam",
+    "lookupplayer.php": "idPlayer",
+    "lookupleague.php": "idLeague",
+    "lookupvenue.php": "idVenue",
+}
+
+# List responses padded to SPORTSDB_ROWS rows
+PADDED = {
+    "eventsnextleague.php", "eventspastleague.php", "eventsnext.php", "eventslast.php", "eventsday.php",
+    "eventsseason.php", "searchevents.php", "lookuptable.php", "searchteams.php", "search_all_teams.php",
+}
+
+ID_FIELDS = ("idEvent", "idTeam", "idStanding", "idPlayer", "idVenue")
+
+rng = random.Random(os.getenv("MOCK_SEED"))
+calls: Counter = Counter()
+
+app = FastAPI(title="Mock SportsDB / Groq upstream")
+app.mount("/pinata", mock_pinata.app)
+
+
+# ----- SportsDB -----
+
+def _examples(items: List[Dict]):
+    for item in items:
+        if "item" in item:
+            yield from _examples(item["item"])
+            continue
+        for example in item.get("response") or []:
+            url = (example.get("originalRequest") or item["request"]).get("url")
+            raw = url.get("raw", "") if isinstance(url, dict) else url or ""
+            yield raw.split("?", 1)[0].rsplit("/", 1)[-1], example
+
+
+def _pad(rows: List[Dict], count: int) -> List[Dict]:
+    padded = []
+    for position in range(count):
+        row = dict(rows[position % len(rows)])
+        if position >= len(rows):
+            for field in ID_FIELDS:
+                if str(row.get(field) or "").isdigit():
+                    row[field] = str(int(row[field]) * 100 + position)
+        if "intRank" in row:
+            row["intRank"] = str(position + 1)
+        padded.append(row)
+    return padded
+
+
+def _fix_status(rows: List[Dict]):
+    for row in rows:
+        if "idEvent" in row and not row.get("strStatus") and row.get("intHomeScore") is not None \
+                and row.get("intAwayScore") is not None:
+            row["strStatus"] = "Match Finished"
+
+
+def _make_upcoming(row: Dict):
+    kickoff = datetime.now(timezone.utc) + timedelta(days=7)
+    row.update({
+        "dateEvent": kickoff.strftime("%Y-%m-%d"),
+        "strTime": kickoff.strftime("%H:%M:%S"),
+        "strTimestamp": kickoff.strftime("%Y-%m-%dT%H:%M:%S"),
+        "strStatus": "Not Started",
+        "intHomeScore": None,
+        "intAwayScore": None,
+    })
+
+
+def load_fixtures(path: str) -> Dict[str, Dict]:
+    """Script name -> response body, from the first 200 example of each request in the collection"""
+    with open(path, encoding="utf-8") as f:
+        collection = json.load(f)
+    fixtures: Dict[str, Dict] = {}
+    for script, example in _examples(collection["item"]):
+        if script in fixtures or example.get("code", 200) != 200 or not example.get("body"):
+            continue
+        try:
+            body = json.loads(example["body"])
+        except ValueError:
+            continue
+        if script in KEY_FIXES:
+            wrong, right = KEY_FIXES[script]
+            if wrong in body:
+                body[right] = body.pop(wrong)
+        for key, rows in body.items():
+            if isinstance(rows, list) and rows and isinstance(rows[0], dict):
+                if script in PADDED:
+                    body[key] = rows = _pad(rows, SPORTSDB_ROWS)
+                _fix_status(rows)
+        fixtures[script] = body
+    return fixtures
+
+
+fixtures = load_fixtures(COLLECTION_PATH)
+# Bodies that are the same for every query are encoded once
+encoded = {script: json.dumps(body).encode() for script, body in fixtures.items() if script not in ECHO_IDS}
+
+
+async def upstream_latency():
+    delay = SPORTSDB_LATENCY_MS + rng.uniform(-SPORTSDB_JITTER_MS, SPORTSDB_JITTER_MS)
+    await asyncio.sleep(max(0.0, delay) / 1000)
+
+
+@app.get("/sportsdb/api/v1/json/{api_key}/{script}")
+async def sportsdb(script: str, request: Request):
+    calls[script] += 1
+    await upstream_latency()
+    if script in encoded:
+        return Response(content=encoded[script], media_type="application/json")
+    body = fixtures.get(script)
+    if body is None:
+        # The live API answers unknown scripts and empty searches with nulls, not errors
+        return JSONResponse({"events": None})
+    body = copy.deepcopy(body)
+    requested = request.query_params.get("id")
+    if requested:
+        for rows in body.values():
+            if isinstance(rows, list) and rows and isinstance(rows[0], dict):
+                rows[0][ECHO_IDS[script]] = requested
+                if script == "lookupevent.php" and requested.isdigit() and int(requested) >= UPCOMING_EVENT_IDS:
+                    _make_upcoming(rows[0])
+    return JSONResponse(body)
+
+
+# ----- Groq -----
+
+def completion_text(body: Dict[str, Any]) -> str:
+    """A prediction in the JSON shape the prompt asks for, naming one of the prompt's teams"""
+    prompt = " ".join(message.get("content") or "" for message in body.get("messages", []))
+    home = re.search(r"Home Team: (.+)", prompt)
+    away = re.search(r"Away Team: (.+)", prompt)
+    teams = [match.group(1).strip() if match else fallback for match, fallback in ((home, "Home Team"), (away, "Away Team"))]
+    winner = rng.randrange(2)
+    return json.dumps({
+        "prediction": f"{teams[winner]} wins",
+        "roast_loser": f"{teams[1 - winner]} defend like the goalposts are optional decorations.",
+        "confidence": round(rng.uniform(0.55, 0.85), 2),
+        "reasoning": "Recent form, goal difference and home advantage all point the same way.",
+    })
+
+
+def tokenize(text: str) -> List[str]:
+    # Roughly 4 characters per token, like the real tokenizer on English text
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+@app.post("/groq/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    calls["groq"] += 1
+    if rng.random() < GROQ_ERROR_RATE:
+        return JSONResponse({"error": {"message": "Simulated overload", "type": "server_error"}}, status_code=503)
+
+    tokens = tokenize(completion_text(body))
+    await asyncio.sleep(GROQ_FIRST_TOKEN_MS / 1000)
+
+    if body.get("stream"):
+        async def events():
+            for token in tokens:
+                yield "data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": token}}]}) + "\n\n"
+                await asyncio.sleep(1 / GROQ_TOKENS_PER_SEC)
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(len(tokens) / GROQ_TOKENS_PER_SEC)
+    return {
+        "object": "chat.completion",
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+        "usage": {"completion_tokens": len(tokens)},
+    }
+
+
+# ----- bookkeeping -----
+
+@app.get("/stats")
+async def stats():
+    """Upstream calls received per SportsDB script (and "groq"), plus pins"""
+    return {"calls": dict(calls), "pins": len(mock_pinata.pins)}
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    calls.clear()
+    return {"calls": {}}
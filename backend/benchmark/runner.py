@@ -0,0 +1,272 @@
+"""
+Runs scenarios against the API and summarizes latency per route.
+
+Each virtual user drives its scenario script in a closed loop for the
+scenario's duration (after a warmup whose samples are discarded). Latency is
+measured to the end of the response body, so streamed routes count in full.
+Results are per route: requests, throughput, error count, 304s and
+p50/p95/p99, plus how many upstream calls the mock served during the
+scenario.
+"""
+import asyncio
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from .scenarios import Call, Scenario
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Connections per virtual user (browsers open 6 per host)
+USER_CONNECTIONS = 6
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+
+    def record(self, seconds: float, status: str):
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+
+    def summary(self, duration: float) -> Dict:
+        ordered = sorted(self.latencies)
+        errors = sum(count for status, count in self.statuses.items() if not status.startswith(("2", "3")))
+        return {
+            "requests": len(ordered),
+            "rps": round(len(ordered) / duration, 2) if duration else 0.0,
+            "errors": errors,
+            "not_modified": self.statuses.get("304", 0),
+            "statuses": dict(self.statuses),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        }
+
+
+class ScenarioRun:
+    def __init__(self, base_url: str, scenario: Scenario, users: int, seed: int):
+        self.base_url = base_url
+        self.scenario = scenario
+        self.users = users
+        self.seed = seed
+        self.routes: Dict[str, RouteStats] = {}
+        self.recording = False
+
+    async def _send(self, client: httpx.AsyncClient, call: Call) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(
+                call.method, call.url, params=call.params, json=call.json, headers=call.headers
+            )
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        if self.recording:
+            self.routes.setdefault(call.route, RouteStats()).record(time.perf_counter() - start, status)
+        return response
+
+    async def _user(self, user: int):
+        script = self.scenario.script(random.Random(self.seed * 1000 + user), user)
+        outcome = None
+        # One small connection pool per user, like a browser; a single pool shared
+        # by hundreds of users costs the load generator more CPU than the server
+        limits = httpx.Limits(max_connections=USER_CONNECTIONS, max_keepalive_connections=USER_CONNECTIONS)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=60.0, limits=limits) as client:
+            while True:
+                step = script.send(outcome)
+                if isinstance(step, Call):
+                    outcome = await self._send(client, step)
+                elif isinstance(step, list):
+                    outcome = await asyncio.gather(*(self._send(client, call) for call in step))
+                else:
+                    outcome = None
+                    await asyncio.sleep(step)
+
+    async def run(self, duration: float, warmup: float) -> float:
+        """Run for warmup + duration seconds; returns the measured duration"""
+        users = [asyncio.create_task(self._user(user)) for user in range(self.users)]
+        try:
+            await asyncio.sleep(warmup)
+            self.recording = True
+            start = time.perf_counter()
+            await asyncio.sleep(duration)
+            self.recording = False
+            return time.perf_counter() - start
+        finally:
+            for task in users:
+                task.cancel()
+            await asyncio.gather(*users, return_exceptions=True)
+
+
+async def run_scenario(base_url: str, scenario: Scenario, duration: float, warmup: float,
+                       users: Optional[int] = None, seed: int = 1, mock_url: Optional[str] = None) -> Dict:
+    users = users or scenario.users
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        if mock_url:
+            await client.post(f"{mock_url}/stats/reset")
+        run = ScenarioRun(base_url, scenario, users, seed)
+        measured = await run.run(duration, warmup)
+        upstream = (await client.get(f"{mock_url}/stats")).json()["calls"] if mock_url else None
+    routes = {route: stats.summary(measured) for route, stats in sorted(run.routes.items())}
+    return {
+        "users": users,
+        "duration": round(measured, 2),
+        "requests": sum(route["requests"] for route in routes.values()),
+        "rps": round(sum(route["requests"] for route in routes.values()) / measured, 2) if measured else 0.0,
+        "routes": routes,
+        "upstream_calls": upstream,
+    }
+
+
+# ----- local servers -----
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalStack:
+    """The mock upstream and the API (main.py) as uvicorn subprocesses wired to each other"""
+
+    def __init__(self, app_workers: int = 1, env: Optional[Dict[str, str]] = None):
+        self.app_workers = app_workers
+        self.extra_env = env or {}
+        self.mock_port = free_port()
+        self.app_port = free_port()
+        self.data_dir = tempfile.mkdtemp(prefix="ragebet-bench-")
+        self._processes: List[subprocess.Popen] = []
+
+    @property
+    def mock_url(self) -> str:
+        return f"http://127.0.0.1:{self.mock_port}"
+
+    @property
+    def app_url(self) -> str:
+        return f"http://127.0.0.1:{self.app_port}"
+
+    def _spawn(self, app: str, port: int, env: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        self._processes.append(process)
+        return process
+
+    async def _wait_ready(self, url: str, process: subprocess.Popen, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            while time.monotonic() < deadline:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{url} exited with code {process.returncode} during startup")
+                try:
+                    if (await client.get(url)).status_code < 500:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"{url} not ready after {timeout}s")
+
+    async def start(self):
+        env = dict(os.environ)
+        env.pop("REDIS_URL", None)
+        mock = self._spawn("benchmark.mock_upstream:app", self.mock_port, env)
+        await self._wait_ready(f"{self.mock_url}/stats", mock)
+
+        env.update({
+            "SPORTSDB_API_KEY": "benchmark",
+            "SPORTSDB_API_URL": f"{self.mock_url}/sportsdb/api/v1/json",
+            "GROQ_API_KEY": "benchmark",
+            "GROQ_BASE_URL": f"{self.mock_url}/groq/openai/v1",
+            "PINATA_API_KEY": "benchmark",
+            "PINATA_SECRET_KEY": "benchmark",
+            "PINATA_BASE_URL": f"{self.mock_url}/pinata",
+            "DATA_DIR": self.data_dir,
+            "PREDICTION_SCHEDULER_ENABLED": "false",
+            "ORACLE_WORKER_ENABLED": "false",
+            # The mock is plain HTTP/1.1
+            "SPORTSDB_HTTP_HTTP2": "false",
+            "GROQ_HTTP_HTTP2": "false",
+        })
+        env.update(self.extra_env)
+        app = self._spawn("main:app", self.app_port, env, self.app_workers)
+        await self._wait_ready(f"{self.app_url}/health", app)
+
+    def stop(self):
+        for process in reversed(self._processes):
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+        for process in self._processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes = []
+
+
+# ----- reporting -----
+
+def format_report(results: Dict[str, Dict]) -> str:
+    lines = []
+    header = f"{'route':<46} {'reqs':>7} {'rps':>8} {'err':>5} {'304':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    for name, result in results.items():
+        lines.append(f"\n== {name}: {result['users']} users, {result['duration']}s, {result['rps']} req/s")
+        lines.append(header)
+        for route, stats in result["routes"].items():
+            lines.append(
+                f"{route:<46} {stats['requests']:>7} {stats['rps']:>8} {stats['errors']:>5} "
+                f"{stats['not_modified']:>5} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+            )
+        if result.get("upstream_calls") is not None:
+            calls = ", ".join(f"{name} {count}" for name, count in sorted(result["upstream_calls"].items()))
+            lines.append(f"upstream calls: {calls or 'none'}")
+    return "\n".join(lines)
+
+
+def failing_routes(results: Dict[str, Dict], max_error_rate: float = 0.0) -> List[str]:
+    """Routes whose share of failed requests (non-2xx/3xx or transport errors) exceeds max_error_rate"""
+    failing = []
+    for name, result in results.items():
+        for route, stats in result["routes"].items():
+            if stats["requests"] and stats["errors"] / stats["requests"] > max_error_rate:
+                statuses = ", ".join(f"{status} x{count}" for status, count in sorted(stats["statuses"].items()))
+                failing.append(f"{name} {route}: {stats['errors']}/{stats['requests']} failed ({statuses})")
+    return failing
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Routes whose p95 grew, or whose error count rose, beyond tolerance relative to a baseline run"""
+    regressions = []
+    for name, result in results.items():
+        for route, stats in result["routes"].items():
+            before = baseline.get(name, {}).get("routes", {}).get(route)
+            if before is None:
+                continue
+            if before["p95_ms"] and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} {route}: p95 {before['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if stats["errors"] > before["errors"] and stats["errors"] / max(stats["requests"], 1) > 0.01:
+                regressions.append(f"{name} {route}: errors {before['errors']} -> {stats['errors']}")
+    return regressions
@@ -0,0 +1,143 @@
+"""
+Load scenarios for the benchmark runner.
+
+A scenario is a number of virtual users, each running the same script: a
+generator that yields what to do next and is sent back the outcome.
+
+* yield Call(...)             -> one request; the httpx.Response (or None on a
+                                 transport error) is sent back
+* yield [Call(...), ...]      -> requests fired together, like a page load;
+                                 the list of responses is sent back
+* yield 0.5                   -> think time, in seconds
+
+Each Call carries a route label (the route template) that latencies are
+grouped by, so per-route numbers stay comparable whatever ids are used.
+"""
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, Optional
+
+LEAGUES = ["4328", "4335", "4331", "4332", "4334"]
+MATCH_IDS = [str(2070200 + n) for n in range(20)]
+# Fixtures the mock reports as not yet kicked off (MOCK_UPCOMING_EVENT_IDS), so
+# their predictions can still be regenerated
+UPCOMING_MATCH_IDS = [str(3070200 + n) for n in range(20)]
+TEAM_QUERIES = [
+    "Arsenal", "Chelsea", "Liverpool", "Manchester United", "Manchester City", "Tottenham",
+    "Everton", "Newcastle", "Aston Villa", "Brighton", "Crystal Palace", "West Ham",
+]
+PLAYER_QUERIES = ["Saka", "Salah", "Haaland", "Palmer", "Welbeck"]
+
+
+@dataclass
+class Call:
+    route: str
+    method: str
+    url: str
+    params: Optional[Dict[str, Any]] = None
+    json: Optional[Dict[str, Any]] = None
+    headers: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    users: int
+    script: Callable[[random.Random, int], Generator]
+
+
+def dashboard_burst(rng: random.Random, user: int) -> Generator:
+    """Everyone opens the dashboard at once: schedules, table and leaderboard in parallel, then a short read"""
+    while True:
+        league = rng.choice(LEAGUES)
+        yield [
+            Call("GET /api/schedule/next-league/{league_id}", "GET", f"/api/schedule/next-league/{league}"),
+            Call("GET /api/schedule/past-league/{league_id}", "GET", f"/api/schedule/past-league/{league}"),
+            Call("GET /api/lookup/table/{league_id}", "GET", f"/api/lookup/table/{league}"),
+            Call("GET /api/upcoming/{league_id}", "GET", f"/api/upcoming/{league}"),
+            Call("GET /community/roast-leaderboard", "GET", "/community/roast-leaderboard", params={"limit": 10}),
+        ]
+        yield rng.uniform(0.2, 1.0)
+
+
+def search_autocomplete(rng: random.Random, user: int) -> Generator:
+    """Typing into the search box: suggestions per keystroke from the second character on, then the search"""
+    while True:
+        if rng.random() < 0.2:
+            kind, route, url, word = "player", "GET /api/search/players", "/api/search/players", rng.choice(PLAYER_QUERIES)
+        else:
+            kind, route, url, word = "team", "GET /api/search/teams", "/api/search/teams", rng.choice(TEAM_QUERIES)
+        for length in range(2, len(word) + 1):
+            yield Call("GET /api/search/suggest", "GET", "/api/search/suggest", params={"q": word[:length], "types": kind})
+            yield rng.uniform(0.05, 0.15)
+        yield Call(route, "GET", url, params={"q": word})
+        yield rng.uniform(0.5, 1.5)
+
+
+def match_page_polling(rng: random.Random, user: int) -> Generator:
+    """A match page left open: initial load, then polling the score with conditional requests"""
+    poll_interval = 1.0
+    while True:
+        match_id = rng.choice(MATCH_IDS)
+        etags: Dict[str, str] = {}
+        responses = yield [
+            Call("GET /api/lookup/event/{event_id}", "GET", f"/api/lookup/event/{match_id}"),
+            Call("GET /api/odds/{event_id}", "GET", f"/api/odds/{match_id}"),
+            Call("GET /ai/predictions/{match_id}", "GET", f"/ai/predictions/{match_id}"),
+        ]
+        if responses[0] is not None and "etag" in responses[0].headers:
+            etags["event"] = responses[0].headers["etag"]
+        for _ in range(rng.randint(5, 15)):
+            yield poll_interval * rng.uniform(0.8, 1.2)
+            headers = {"If-None-Match": etags["event"]} if "event" in etags else None
+            responses = yield [
+                Call("GET /api/match/{match_id}", "GET", f"/api/match/{match_id}"),
+                Call("GET /api/lookup/event/{event_id}", "GET", f"/api/lookup/event/{match_id}", headers=headers),
+            ]
+            if responses[1] is not None and "etag" in responses[1].headers:
+                etags["event"] = responses[1].headers["etag"]
+
+
+# Fresh ids on every run, also against a long-running --target server
+_market_ids = itertools.count(int(time.time()) * 1000)
+
+
+def oracle_resolution(rng: random.Random, user: int) -> Generator:
+    """Markets opened and settled: track, resolve (the match is over), read back the resolution"""
+    while True:
+        market_id = next(_market_ids)
+        match_id = rng.choice(MATCH_IDS)
+        yield Call("POST /oracle/markets", "POST", "/oracle/markets", json={"market_id": market_id, "match_id": match_id})
+        yield Call("POST /oracle/resolve-market", "POST", "/oracle/resolve-market", json={
+            "market_id": market_id, "match_id": match_id, "ai_was_right": False, "status": "pending",
+        })
+        yield Call("GET /oracle/resolutions/{market_id}", "GET", f"/oracle/resolutions/{market_id}")
+        yield rng.uniform(0.1, 0.5)
+
+
+def prediction_generation(rng: random.Random, user: int) -> Generator:
+    """AI predictions on demand: mostly stored ones, some regenerated, some streamed from Groq"""
+    while True:
+        match_id = rng.choice(UPCOMING_MATCH_IDS)
+        roll = rng.random()
+        if roll < 0.2:
+            yield Call("GET /ai/generate-prediction/stream", "GET", "/ai/generate-prediction/stream",
+                       params={"match_id": match_id, "regenerate": "true"})
+        else:
+            yield Call("POST /ai/generate-prediction", "POST", "/ai/generate-prediction",
+                       params={"match_id": match_id, "regenerate": "true" if roll < 0.35 else "false"})
+        yield rng.uniform(0.2, 0.8)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in (
+        Scenario("dashboard_burst", dashboard_burst.__doc__, 50, dashboard_burst),
+        Scenario("search_autocomplete", search_autocomplete.__doc__, 30, search_autocomplete),
+        Scenario("match_page_polling", match_page_polling.__doc__, 40, match_page_polling),
+        Scenario("oracle_resolution", oracle_resolution.__doc__, 10, oracle_resolution),
+        Scenario("prediction_generation", prediction_generation.__doc__, 10, prediction_generation),
+    )
+}
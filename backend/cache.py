@@ -0,0 +1,301 @@
+"""
+Bounded in-memory cache with LRU eviction and monotonic-clock TTLs.
+
+Replaces the plain module-level dicts in main.py, which grew without bound
+and used wall-clock `timedelta.seconds` (which wraps every day) to decide
+freshness.
+
+Entries can also carry a stale window: after the (soft) TTL they are still
+returned by lookup(), flagged as stale, until the hard TTL (TTL + max
+staleness) so callers can serve them while refreshing in the background.
+"""
+import itertools
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Per-endpoint TTL policy for SportsDB responses, in seconds. Keyed on the
+# SportsDB script name (the part of the endpoint before "?").
+SPORTSDB_TTL_POLICY: Dict[str, float] = {
+    # Search results and static reference data change rarely
+    "searchteams.php": 3600,
+    "searchplayers.php": 3600,
+    "searchvenues.php": 3600,
+    "searchevents.php": 600,
+    "lookupteam.php": 3600,
+    "lookupplayer.php": 3600,
+    "lookupleague.php": 3600,
+    "lookuphonours.php": 86400,
+    "lookupformerteams.php": 86400,
+    "lookupcontracts.php": 86400,
+    # Standings move once per finished match
+    "lookuptable.php": 300,
+    # Schedules, results and in-play data move quickly
+    "lookupevent.php": 60,
+    "lookupeventstats.php": 60,
+    "lookuptimeline.php": 60,
+    "lookuplineup.php": 300,
+    "eventsnextleague.php": 60,
+    "eventspastleague.php": 60,
+    "eventsnext.php": 60,
+    "eventslast.php": 60,
+    "eventsday.php": 60,
+}
+DEFAULT_SPORTSDB_TTL = 300
+
+# How long past its TTL an entry may still be served while it is refreshed in
+# the background (stale-while-revalidate). Endpoints not listed are never
+# served stale.
+SPORTSDB_MAX_STALE_POLICY: Dict[str, float] = {
+    "lookuptable.php": 1800,
+    "eventsnextleague.php": 600,
+    "eventspastleague.php": 600,
+    "eventsnext.php": 600,
+    "eventslast.php": 600,
+    "eventsday.php": 300,
+    "lookupteam.php": 86400,
+    "lookupleague.php": 86400,
+}
+
+
+def apply_ttl_overrides(spec: Optional[str]):
+    """Apply "endpoint=ttl[:max_stale],..." overrides, e.g. "lookuptable.php=120:900" """
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        endpoint, values = item.strip().split("=", 1)
+        ttl, _, max_stale = values.partition(":")
+        if ttl:
+            SPORTSDB_TTL_POLICY[endpoint] = float(ttl)
+        if max_stale:
+            SPORTSDB_MAX_STALE_POLICY[endpoint] = float(max_stale)
+
+
+def sportsdb_ttl(endpoint: str) -> float:
+    """TTL for a SportsDB endpoint such as "lookuptable.php?l=4328" """
+    return SPORTSDB_TTL_POLICY.get(endpoint.split("?", 1)[0], DEFAULT_SPORTSDB_TTL)
+
+
+def sportsdb_max_stale(endpoint: str) -> float:
+    """Seconds a SportsDB response may be served stale past its TTL"""
+    return SPORTSDB_MAX_STALE_POLICY.get(endpoint.split("?", 1)[0], 0)
+
+
+# Containers longer than this are sized from an evenly spaced sample of their items
+SIZE_SAMPLE = 8
+# Nesting deeper than this is sized with sys.getsizeof
+SIZE_MAX_DEPTH = 6
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Approximate the memory held by a cached value, in bytes
+    
+    A structural walk, roughly the size of the value's JSON form, that never
+    serializes it: this runs on every set(), on the hot schedule and table
+    paths. Long lists are sampled, and compact projections (projections.py)
+    and pydantic models are walked through their fields.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return 8
+    if isinstance(value, (str, bytes)):
+        return len(value) + 2
+    if _depth >= SIZE_MAX_DEPTH:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, (list, tuple)):
+        items = value
+    elif hasattr(value, "FIELDS"):
+        items = [(name, getattr(value, name, None)) for name in value.FIELDS]
+    elif hasattr(value, "__dict__"):
+        items = vars(value).items()
+    else:
+        return sys.getsizeof(value)
+    count = len(items)
+    if count > SIZE_SAMPLE:
+        if isinstance(items, (list, tuple)):
+            step = count / SIZE_SAMPLE
+            sample = [items[int(i * step)] for i in range(SIZE_SAMPLE)]
+        else:
+            sample = list(itertools.islice(items, SIZE_SAMPLE))
+    else:
+        sample = items
+    sampled = sum(estimate_size(item, _depth + 1) for item in sample)
+    return 2 + (sampled * count // len(sample) if count else 0)
+
+
+class TTLCache:
+    """LRU cache capped by entry count and total size, with per-entry TTLs"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        default_ttl: float = 300,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sizeof = sizeof
+        # key -> (value, fresh_until, expires_at, version, size)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Every stored value gets a new version, unique to this process (used for ETags)
+        self._versions = itertools.count(1)
+        self._instance = os.urandom(4).hex()
+        self.current_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Entries of a loaded on-disk snapshot, restored on first lookup (see cache_snapshot.py)
+        self.snapshot = None
+        self.restored = 0
+        # Deleted key -> wall-clock time until which copies of it held elsewhere
+        # (other workers' snapshot entries) are out of date; kept for the
+        # longest lifetime (TTL + max staleness) an entry of this cache was given
+        self._deleted: "OrderedDict[str, float]" = OrderedDict()
+        self._longest_life = default_ttl
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Fresh value for key, or default (stale entries count as a miss)"""
+        entry = self.lookup(key, allow_stale=False)
+        return default if entry is None else entry[0]
+
+    def lookup(self, key: str, allow_stale: bool = True) -> Optional[Tuple[Any, bool]]:
+        """(value, is_stale) for key, or None if missing or past its hard TTL"""
+        entry = self._entries.get(key)
+        if entry is None and self.snapshot is not None:
+            entry = self._restore(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, fresh_until, expires_at, _, _ = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        stale = fresh_until <= now
+        if stale and not allow_stale:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return value, stale
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, max_stale: float = 0,
+            version: Optional[str] = None):
+        """Store value, fresh for ttl seconds and servable stale for max_stale more
+        
+        A version is assigned unless one is given (e.g. carried over from a shared cache tier).
+        """
+        if self.snapshot is not None:
+            self.snapshot.discard(key)
+        size = self.sizeof(value)
+        if key in self._entries:
+            self._remove(key)
+        ttl = self.default_ttl if ttl is None else ttl
+        self._longest_life = max(self._longest_life, ttl + max_stale)
+        if size > self.max_bytes:
+            # Never let a single oversized payload flush the whole cache (the
+            # previous value is dropped all the same: it is no longer current)
+            self._tombstone(key)
+            return
+        self._deleted.pop(key, None)
+        fresh_until = time.monotonic() + ttl
+        version = version or f"{self._instance}-{next(self._versions)}"
+        self._entries[key] = (value, fresh_until, fresh_until + max_stale, version, size)
+        self.current_bytes += size
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def freshness(self, key: str) -> Optional[Tuple[str, float, float]]:
+        """(version, seconds left fresh, seconds left servable stale) for key, without touching LRU order or counters"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        _, fresh_until, expires_at, version, _ = entry
+        now = time.monotonic()
+        return version, max(0.0, fresh_until - now), max(0.0, expires_at - max(now, fresh_until))
+
+    def delete(self, key: str):
+        if self.snapshot is not None:
+            self.snapshot.discard(key)
+        if key in self._entries:
+            self._remove(key)
+        self._tombstone(key)
+
+    def _tombstone(self, key: str):
+        self._deleted[key] = time.time() + self._longest_life
+        self._deleted.move_to_end(key)
+        while len(self._deleted) > self.max_entries:
+            self._deleted.popitem(last=False)
+
+    def deleted_keys(self) -> set:
+        """Keys deleted recently enough that copies held elsewhere may predate the delete"""
+        now = time.time()
+        for key in [key for key, until in self._deleted.items() if until <= now]:
+            del self._deleted[key]
+        return set(self._deleted)
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+        self.snapshot = None
+
+    def _restore(self, key: str) -> Optional[tuple]:
+        restored = self.snapshot.take(key)
+        if restored is None:
+            return None
+        value, fresh_for, stale_for, version = restored
+        # TTLCache.set, not self.set: a restored entry isn't a new write for a shared tier
+        TTLCache.set(self, key, value, fresh_for, stale_for, version)
+        self.restored += 1
+        return self._entries.get(key)
+
+    def export(self) -> List[Tuple[str, Any, float, float, str]]:
+        """(key, value, fresh_until, expires_at, version) of the live entries, times as wall-clock epochs"""
+        now = time.monotonic()
+        to_wall = time.time() - now
+        return [
+            (key, value, fresh_until + to_wall, expires_at + to_wall, version)
+            for key, (value, fresh_until, expires_at, version, _) in list(self._entries.items())
+            if expires_at > now
+        ]
+
+    def _remove(self, key: str):
+        size = self._entries.pop(key)[-1]
+        self.current_bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "avg_entry_bytes": round(self.current_bytes / len(self._entries)) if self._entries else 0,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "restored": self.restored,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,293 @@
+"""
+On-disk snapshots of the in-process caches, for warm restarts.
+
+A snapshot is one file holding every registered cache's live entries:
+
+    b"RBSNAP01" | header length (4 bytes, little-endian) | header JSON | payloads
+
+The header maps cache name -> [[key, offset, length, fresh_until, expires_at,
+version], ...] with wall-clock expiry times; payloads are the entries'
+encoded values, back to back. Snapshots are written periodically and on
+shutdown to a temporary file that then replaces the old one, so readers
+(other workers, the next deploy) never see a partial file. Every worker
+snapshots to the same path, so a write carries over the unexpired entries of
+the file it replaces for keys the writer doesn't hold: the last writer adds
+to the other workers' entries instead of dropping them. Keys the writer
+deleted since (TTLCache.deleted_keys) are not carried over, so a delete or
+invalidation isn't undone by an older copy in the file.
+
+Loading is lazy. On startup the payloads are read into memory as they are
+(the file is closed straight away, so it can be replaced while the worker
+runs, Windows included) and only the header is parsed: entries already past
+their hard TTL are dropped, the rest are
+attached to their cache (TTLCache.snapshot) and decoded on the first lookup
+of their key, keeping the time they have left and their version (so ETags
+handed out before the restart still match). A new worker is therefore warm
+as soon as the header is read, and entries nobody asks for again are never
+decoded. Entries not restored yet are carried over into the next snapshot
+until they expire.
+"""
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RBSNAP01"
+_LENGTH = struct.Struct("<I")
+
+
+class SnapshotSection:
+    """Not-yet-restored entries of one cache in a loaded snapshot"""
+
+    def __init__(self, payloads: bytes, entries: List[List], decode: Callable[[bytes], Any]):
+        self._payloads = payloads
+        self.decode = decode
+        now = time.time()
+        # key -> (offset, length, fresh_until, expires_at, version)
+        self._entries: Dict[str, Tuple[int, int, float, float, str]] = {
+            key: (offset, length, fresh_until, expires_at, version)
+            for key, offset, length, fresh_until, expires_at, version in entries
+            if expires_at > now
+        }
+        self.discarded = len(entries) - len(self._entries)
+        self.restored = 0
+
+    def _payload(self, offset: int, length: int) -> bytes:
+        return self._payloads[offset:offset + length]
+
+    def take(self, key: str) -> Optional[Tuple[Any, float, float, str]]:
+        """(value, seconds fresh, seconds servable stale after that, version) for key, removing it"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        offset, length, fresh_until, expires_at, version = entry
+        now = time.time()
+        if expires_at <= now:
+            self.discarded += 1
+            return None
+        try:
+            value = self.decode(self._payload(offset, length))
+        except Exception:
+            logger.exception("Cache snapshot entry %r could not be decoded", key)
+            return None
+        self.restored += 1
+        return value, max(0.0, fresh_until - now), expires_at - max(now, fresh_until), version
+
+    def discard(self, key: str):
+        """Forget key (it was set or deleted since the snapshot was taken)"""
+        self._entries.pop(key, None)
+
+    def pending(self) -> List[Tuple[str, bytes, float, float, str]]:
+        """(key, encoded value, fresh_until, expires_at, version) of unexpired entries not restored yet"""
+        now = time.time()
+        return [
+            (key, self._payload(offset, length), fresh_until, expires_at, version)
+            for key, (offset, length, fresh_until, expires_at, version) in self._entries.items()
+            if expires_at > now
+        ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def read_snapshot(path: str) -> Optional[Tuple[bytes, Dict]]:
+    """(payloads, header) of a snapshot file, or None if there is no usable one"""
+    prefix = len(MAGIC) + _LENGTH.size
+    try:
+        with open(path, "rb") as f:
+            start = f.read(prefix)
+            if len(start) < prefix or start[:len(MAGIC)] != MAGIC:
+                logger.warning("Ignoring cache snapshot %s: not a snapshot file", path)
+                return None
+            (length,) = _LENGTH.unpack(start[len(MAGIC):])
+            encoded_header = f.read(length)
+            payloads = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        header = json.loads(encoded_header)
+    except ValueError as e:
+        logger.warning("Ignoring cache snapshot %s: %r", path, e)
+        return None
+    return payloads, header
+
+
+def merge_snapshot(path: str, sections: Dict[str, List[Tuple[str, bytes, float, float, str]]],
+                   deleted: Optional[Dict[str, set]] = None):
+    """Add the unexpired entries of the snapshot at path to sections, for keys sections don't have
+    
+    deleted maps cache name -> keys deleted since the snapshot may have been
+    written; the file's copies of those are left out.
+    """
+    snapshot = read_snapshot(path)
+    if snapshot is None:
+        return
+    payloads, header = snapshot
+    now = time.time()
+    for name, entries in header.get("caches", {}).items():
+        if name not in sections:
+            continue
+        keys = {entry[0] for entry in sections[name]} | (deleted or {}).get(name, set())
+        sections[name].extend(
+            (key, payloads[offset:offset + length], fresh_until, expires_at, version)
+            for key, offset, length, fresh_until, expires_at, version in entries
+            if key not in keys and expires_at > now
+        )
+
+
+def write_snapshot(path: str, sections: Dict[str, List[Tuple[str, bytes, float, float, str]]]):
+    """Atomically replace path with a snapshot of (key, encoded value, fresh_until, expires_at, version) per cache"""
+    header: Dict[str, Any] = {"created": time.time(), "caches": {}}
+    payloads: List[bytes] = []
+    offset = 0
+    for name, entries in sections.items():
+        index = header["caches"][name] = []
+        for key, payload, fresh_until, expires_at, version in entries:
+            index.append([key, offset, len(payload), round(fresh_until, 3), round(expires_at, 3), version])
+            payloads.append(payload)
+            offset += len(payload)
+    encoded_header = json.dumps(header, separators=(",", ":")).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Per-process temporary name: several workers may snapshot to the same path
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(encoded_header)))
+        f.write(encoded_header)
+        for payload in payloads:
+            f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class CacheSnapshotter:
+    """Snapshots registered caches to one file periodically and on stop(), and warm-loads them with load()"""
+
+    def __init__(
+        self,
+        path: str,
+        caches: Sequence[Tuple[TTLCache, Callable[[Any], bytes], Callable[[bytes], Any]]],
+        interval: float = 300,
+    ):
+        self.path = path
+        # cache name -> (cache, encode, decode)
+        self.caches = {cache.name: (cache, encode, decode) for cache, encode, decode in caches}
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._saving: Optional[asyncio.Future] = None
+        self._lock = asyncio.Lock()
+        self.loaded_entries = 0
+        self.discarded_entries = 0
+        self.load_ms = 0.0
+        self.saves = 0
+        self.last_save_entries = 0
+        self.last_save_bytes = 0
+        self.last_save_ms = 0.0
+        self.errors = 0
+
+    def load(self):
+        """Attach the snapshot's unexpired entries to their caches (values are decoded on first use)"""
+        start = time.perf_counter()
+        snapshot = read_snapshot(self.path)
+        if snapshot is None:
+            return
+        payloads, header = snapshot
+        for name, entries in header.get("caches", {}).items():
+            if name not in self.caches:
+                continue
+            cache, _, decode = self.caches[name]
+            section = SnapshotSection(payloads, entries, decode)
+            cache.snapshot = section
+            self.loaded_entries += len(section)
+            self.discarded_entries += section.discarded
+        self.load_ms = round((time.perf_counter() - start) * 1000, 3)
+        logger.info(
+            "Cache snapshot %s: %d entries to warm-load, %d expired, header read in %sms",
+            self.path, self.loaded_entries, self.discarded_entries, self.load_ms,
+        )
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic snapshots and take a last one"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.save()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
+
+    def _collect(self) -> List[Tuple[str, Callable[[Any], bytes], List, List, set]]:
+        collected = []
+        for name, (cache, encode, _) in self.caches.items():
+            pending = cache.snapshot.pending() if cache.snapshot is not None else []
+            collected.append((name, encode, cache.export(), pending, cache.deleted_keys()))
+        return collected
+
+    @staticmethod
+    def _encode(collected) -> Dict[str, List[Tuple[str, bytes, float, float, str]]]:
+        sections = {}
+        for name, encode, live, pending, _ in collected:
+            entries = [(key, encode(value), fresh_until, expires_at, version)
+                       for key, value, fresh_until, expires_at, version in live]
+            sections[name] = entries + pending
+        return sections
+
+    def _write(self, collected) -> Tuple[int, int]:
+        sections = self._encode(collected)
+        # Keep what the other workers (or an earlier run) snapshotted and this one
+        # doesn't hold, unless this worker has deleted it since
+        merge_snapshot(self.path, sections, {name: deleted for name, _, _, _, deleted in collected})
+        write_snapshot(self.path, sections)
+        return sum(len(entries) for entries in sections.values()), os.path.getsize(self.path)
+
+    async def save(self):
+        """Write a snapshot now"""
+        async with self._lock:
+            if self._saving is not None and not self._saving.done():
+                # The write of a save whose caller was cancelled is still running
+                await asyncio.wait({self._saving})
+            # Entries are gathered on the loop; encoding and file I/O run in a thread
+            self._saving = asyncio.ensure_future(asyncio.to_thread(self._write, self._collect()))
+            start = time.perf_counter()
+            try:
+                self.last_save_entries, self.last_save_bytes = await asyncio.shield(self._saving)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.exception("Cache snapshot to %s failed", self.path)
+                return
+            self.saves += 1
+            self.last_save_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "interval": self.interval,
+            "loaded_entries": self.loaded_entries,
+            "discarded_entries": self.discarded_entries,
+            "load_ms": self.load_ms,
+            "pending": {name: len(cache.snapshot) if cache.snapshot is not None else 0
+                        for name, (cache, _, _) in self.caches.items()},
+            "restored": {name: cache.snapshot.restored if cache.snapshot is not None else 0
+                         for name, (cache, _, _) in self.caches.items()},
+            "saves": self.saves,
+            "last_save_entries": self.last_save_entries,
+            "last_save_bytes": self.last_save_bytes,
+            "last_save_ms": self.last_save_ms,
+            "errors": self.errors,
+        }
@@ -0,0 +1,253 @@
+"""
+Conditional GET, Cache-Control and compression for API responses.
+
+Routes built on cached SportsDB payloads register the cache entries they
+read (see record_dependency). Their ETag is derived from those entries'
+versions plus the request URL, so a matching If-None-Match is answered
+with 304 before the response is even serialized, and max-age is the time
+the entries have left before their TTL runs out.
+
+Routes that mix in local state (e.g. team index matches) add its version
+with record_version, so the ETag changes when that state does.
+
+Other JSON responses get a strong ETag hashed from the body and
+"Cache-Control: no-cache" (clients revalidate every time, but a 304 saves
+the download). Bodies of min_size bytes or more are brotli- or
+gzip-compressed according to Accept-Encoding. Compressed bodies are
+memoized per ETag, so repeated downloads of an unchanged payload are not
+recompressed. Brotli is used when the brotli package is installed.
+"""
+import gzip
+import hashlib
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from cache import TTLCache
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+
+class RequestCacheState:
+    """Cache entries a request's response was built from"""
+
+    __slots__ = ("url", "if_none_match", "versions", "max_age", "stale", "uncacheable")
+
+    def __init__(self, url: str, if_none_match: Optional[str]):
+        self.url = url
+        self.if_none_match = if_none_match
+        self.versions: List[str] = []
+        self.max_age: Optional[float] = None
+        self.stale: Optional[float] = None
+        self.uncacheable = False
+
+
+_request_state: ContextVar[Optional[RequestCacheState]] = ContextVar("http_cache_state", default=None)
+
+
+def record_dependency(freshness: Optional[Tuple[str, float, float]]):
+    """Note that the current response uses a cache entry ((version, fresh_for, stale_for) from TTLCache.freshness)"""
+    state = _request_state.get()
+    if state is None:
+        return
+    if freshness is None:
+        # Served without being cached (e.g. oversized): no version to build an ETag from
+        state.uncacheable = True
+        return
+    version, fresh_for, stale_for = freshness
+    state.versions.append(version)
+    state.max_age = fresh_for if state.max_age is None else min(state.max_age, fresh_for)
+    state.stale = stale_for if state.stale is None else min(state.stale, stale_for)
+
+
+def record_version(version: str):
+    """Note that the current response also uses local state with no TTL of its own (e.g. an index generation)
+
+    It only goes into the ETag of responses that depend on cache entries too:
+    on its own it gives no max-age, so the response gets a body-hash ETag.
+    """
+    state = _request_state.get()
+    if state is not None:
+        state.versions.append(version)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tag = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        # Compressed variants carry an encoding suffix; they validate the same content
+        if candidate == tag or candidate.rsplit("-", 1)[0] == tag:
+            return True
+    return False
+
+
+def versioned_headers() -> Optional[Dict[str, str]]:
+    """ETag / Cache-Control for the current response if it was built purely from cache entries"""
+    state = _request_state.get()
+    if state is None or state.uncacheable or state.max_age is None:
+        return None
+    digest = hashlib.sha1("\n".join([state.url, *state.versions]).encode()).hexdigest()[:20]
+    cache_control = f"public, max-age={int(state.max_age)}"
+    if state.stale:
+        cache_control += f", stale-while-revalidate={int(state.stale)}"
+    return {"ETag": f'"v{digest}"', "Cache-Control": cache_control}
+
+
+def not_modified() -> Optional[Response]:
+    """A 304 for the current request if its If-None-Match still matches the cache entries it read"""
+    state = _request_state.get()
+    headers = versioned_headers()
+    if headers is None or not etag_matches(state.if_none_match, headers["ETag"]):
+        return None
+    return Response(status_code=304, headers=dict(headers, Vary="Accept-Encoding"))
+
+
+class ResponseCompressor:
+    """Picks an encoding for a response and memoizes compressed bodies per ETag"""
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 memo_bytes: int = 16 * 1024 * 1024):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._memo = TTLCache("compressed_responses", max_entries=512, max_bytes=memo_bytes,
+                              default_ttl=3600, sizeof=len)
+        self.not_modified = 0
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def choose_encoding(self, accept_encoding: str, size: int) -> Optional[str]:
+        if size < self.min_size:
+            return None
+        accepted = set()
+        for coding in accept_encoding.split(","):
+            name, _, params = coding.partition(";")
+            quality = params.strip().lower()
+            if quality.startswith("q="):
+                try:
+                    if float(quality[2:]) <= 0:
+                        continue
+                except ValueError:
+                    continue
+            accepted.add(name.strip().lower())
+        if BROTLI_AVAILABLE and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, etag: str, encoding: str) -> bytes:
+        key = f"{etag}:{encoding}"
+        compressed = self._memo.get(key)
+        if compressed is None:
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            self._memo.set(key, compressed)
+        self.compressed += 1
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self) -> Dict:
+        return {
+            "brotli": BROTLI_AVAILABLE,
+            "min_size": self.min_size,
+            "not_modified": self.not_modified,
+            "compressed": self.compressed,
+            "compression_ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            "memo": self._memo.stats(),
+        }
+
+
+class HTTPCachingMiddleware:
+    """ETags, 304s, Cache-Control and compression for JSON GET responses under the given prefixes"""
+
+    def __init__(self, app, compressor: ResponseCompressor, prefixes: Tuple[str, ...] = ("/api/",)):
+        self.app = app
+        self.compressor = compressor
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        query = scope.get("query_string", b"").decode("latin-1")
+        state = RequestCacheState(scope["path"] + ("?" + query if query else ""), request_headers.get("if-none-match"))
+        token = _request_state.set(state)
+
+        start: Optional[dict] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                if message["type"] == "http.response.start" and message["status"] == 304:
+                    self.compressor.not_modified += 1
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (message["status"] != 200 or "content-length" not in headers
+                        or "content-encoding" in headers
+                        or not headers.get("content-type", "").startswith("application/json")):
+                    # 304s, errors, streams and non-JSON go out untouched
+                    passthrough = True
+                    await buffered_send(message)
+                    return
+                start = message
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._finish(start, b"".join(chunks), request_headers, send)
+
+        try:
+            await self.app(scope, receive, buffered_send)
+        finally:
+            _request_state.reset(token)
+
+    async def _finish(self, start: dict, body: bytes, request_headers: Headers, send):
+        headers = MutableHeaders(raw=list(start["headers"]))
+        if "etag" not in headers:
+            headers["ETag"] = '"b' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        if "cache-control" not in headers:
+            headers["Cache-Control"] = "no-cache"
+        etag = headers["etag"]
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            self.compressor.not_modified += 1
+            del headers["content-length"]
+            del headers["content-type"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        headers.add_vary_header("Accept-Encoding")
+        encoding = self.compressor.choose_encoding(request_headers.get("accept-encoding", ""), len(body))
+        if encoding is not None:
+            body = self.compressor.compress(body, etag, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = '"' + etag.strip('"') + "-" + encoding + '"'
+            headers["Content-Length"] = str(len(body))
+
+        await send({"type": "http.response.start", "status": start["status"], "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,156 @@
+"""
+Shared, pooled HTTP clients for the upstream APIs (SportsDB, Groq, Pinata).
+
+One httpx.AsyncClient is kept per upstream host so connections (TCP + TLS)
+are reused across requests instead of being re-established on every call.
+The clients are opened on app startup and closed on shutdown. Every call
+is timed and counted per upstream, endpoint and status code (see metrics.py)
+and, inside a traced request, recorded as a client span (see tracing.py).
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+import httpx
+
+from metrics import upstream_endpoint, upstream_request_seconds, upstream_responses
+from tracing import CLIENT, span
+
+try:
+    import h2  # noqa: F401  (only needed for HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class UpstreamConfig:
+    """Connection settings for a single upstream host"""
+    name: str
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls, name: str, **defaults) -> "UpstreamConfig":
+        """Build a config, letting <NAME>_HTTP_* env vars override the defaults"""
+        config = cls(name=name, **defaults)
+        prefix = f"{name.upper()}_HTTP_"
+        config.timeout = _env_float(prefix + "TIMEOUT", config.timeout)
+        config.connect_timeout = _env_float(prefix + "CONNECT_TIMEOUT", config.connect_timeout)
+        config.max_connections = _env_int(prefix + "MAX_CONNECTIONS", config.max_connections)
+        config.max_keepalive_connections = _env_int(
+            prefix + "MAX_KEEPALIVE", config.max_keepalive_connections
+        )
+        config.keepalive_expiry = _env_float(prefix + "KEEPALIVE_EXPIRY", config.keepalive_expiry)
+        config.http2 = _env_bool(prefix + "HTTP2", config.http2)
+        return config
+
+    def build_transport(self) -> httpx.AsyncBaseTransport:
+        return httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            http2=self.http2 and HTTP2_AVAILABLE,
+        )
+
+    def build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            transport=UpstreamTransport(self.build_transport(), self.name),
+        )
+
+
+class UpstreamTransport(httpx.AsyncBaseTransport):
+    """Records latency (to response headers) and status code of every call to an upstream, and traces it"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str):
+        self.transport = transport
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = upstream_endpoint(self.upstream, request.url.path)
+        # Only the endpoint is recorded: SportsDB URLs carry the API key
+        with span(f"{self.upstream} {endpoint}", kind=CLIENT, **{"http.method": request.method}) as call:
+            start = time.perf_counter()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except Exception:
+                upstream_responses.inc(self.upstream, endpoint, "error")
+                raise
+            finally:
+                upstream_request_seconds.observe(time.perf_counter() - start, self.upstream, endpoint)
+            call.set(**{"http.status_code": response.status_code})
+        upstream_responses.inc(self.upstream, endpoint, str(response.status_code))
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class UpstreamClients:
+    """Registry of one pooled AsyncClient per upstream"""
+
+    def __init__(self, configs: Dict[str, UpstreamConfig]):
+        self.configs = configs
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the pooled client for an upstream, creating it on first use"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self.configs[name].build_client()
+            self._clients[name] = client
+        return client
+
+    def timeout(self, name: str) -> float:
+        return self.configs[name].timeout
+
+    async def start(self):
+        for name in self.configs:
+            self.get(name)
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+def default_upstream_clients() -> UpstreamClients:
+    """Clients for the upstreams used by main.py, tuned per host"""
+    return UpstreamClients({
+        # SportsDB is served over HTTP/2 via its CDN; lots of small GETs
+        "sportsdb": UpstreamConfig.from_env(
+            "sportsdb", timeout=10.0, max_connections=50, max_keepalive_connections=20, http2=True
+        ),
+        # Groq completions are slow, keep the pool small and the timeout long
+        "groq": UpstreamConfig.from_env(
+            "groq", timeout=30.0, max_connections=20, max_keepalive_connections=10, http2=True
+        ),
+        "pinata": UpstreamConfig.from_env(
+            "pinata", timeout=30.0, max_connections=10, max_keepalive_connections=5
+        ),
+    })
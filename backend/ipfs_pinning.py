@@ -0,0 +1,310 @@
+"""
+Background IPFS pinning with locally computed CIDs.
+
+JSON payloads are serialized canonically and their IPFS CID (CIDv0, the
+default of `ipfs add` / Pinata for a single file) is computed locally, so
+callers get the hash immediately. The bytes are then pinned in the
+background by a small pool of workers, with retries and exponential
+backoff. Identical payloads hash to the same CID and are pinned once.
+
+The local CID covers payloads that fit in a single 256 KiB UnixFS chunk,
+which every prediction and NFT metadata document does. Larger payloads have
+no local CID and must be pinned inline with pin_now().
+
+Pin records are kept in SQLite, with the content of pins not done yet, so a
+restart neither pins content again nor drops the pins still queued: open()
+loads the records and queues the unfinished ones again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+QUEUED = "queued"
+PINNING = "pinning"
+PINNED = "pinned"
+FAILED = "failed"
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _base58(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    leading_zeros = len(data) - len(data.lstrip(b"\0"))
+    return "1" * leading_zeros + encoded
+
+
+def _normalize(value: Any) -> Any:
+    # JSON.stringify writes 1.0 as 1; match it so the bytes are the same everywhere
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def encode_json(data: Any) -> bytes:
+    """Canonical bytes for a JSON document (compact, UTF-8, key order kept)"""
+    return json.dumps(_normalize(data), separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def compute_cid(content: bytes) -> Optional[str]:
+    """CIDv0 of a file added to IPFS with default settings, or None if it spans several chunks"""
+    if len(content) > CHUNK_SIZE:
+        return None
+    # UnixFS Data { Type: File, Data: content, filesize } inside a dag-pb PBNode { Data }
+    unixfs = b"\x08\x02"
+    if content:
+        unixfs += b"\x12" + _varint(len(content)) + content
+    unixfs += b"\x18" + _varint(len(content))
+    node = b"\x0a" + _varint(len(unixfs)) + unixfs
+    # sha2-256 multihash, base58btc
+    return _base58(b"\x12\x20" + hashlib.sha256(node).digest())
+
+
+class PinQueue:
+    """Pins content in the background, deduplicated by CID"""
+
+    def __init__(
+        self,
+        pin: Callable[[bytes, str], Awaitable[str]],
+        path: str = ":memory:",
+        concurrency: int = 2,
+        max_retries: int = 5,
+        backoff_base: float = 5.0,
+        max_tracked: int = 10000,
+    ):
+        self.pin = pin
+        self.path = path
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_tracked = max_tracked
+
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._payloads: Dict[str, tuple] = {}  # cid -> (content, name) until pinned
+        self._pins: "OrderedDict[str, Dict]" = OrderedDict()
+        self._workers = []
+        self._retry_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._recent_failures: deque = deque(maxlen=20)
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.pinned = 0
+        self.failed = 0
+        self.retries = 0
+        self.cid_mismatches = 0
+
+    # ---- persistence -------------------------------------------------
+
+    def open(self):
+        """Load the pin records and queue the pins a previous run didn't finish"""
+        if self._db is not None:
+            return
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pins ("
+            "cid TEXT PRIMARY KEY, data TEXT NOT NULL, content BLOB, updated_at REAL NOT NULL)"
+        )
+        # Oldest first, so the newest records are the ones kept in memory
+        for cid, data, content in self._db.execute("SELECT cid, data, content FROM pins ORDER BY updated_at"):
+            entry = json.loads(data)
+            if entry["status"] in (QUEUED, PINNING):
+                if content is None:
+                    continue
+                entry["status"] = QUEUED
+                self._payloads[cid] = (bytes(content), entry["name"])
+                self._queue.put_nowait(cid)
+            self._track(cid, entry)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _save(self, cid: str, content: Optional[bytes] = None):
+        """Write a pin's record (content is kept only until it is pinned or given up on)"""
+        if self._db is None:
+            return
+        entry = self._pins.get(cid)
+        if entry is None:
+            return
+        with self._db:
+            if content is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pins (cid, data, content, updated_at) VALUES (?, ?, ?, ?)",
+                    (cid, json.dumps(entry), content, time.time())
+                )
+            elif entry["status"] in (PINNED, FAILED):
+                self._db.execute(
+                    "UPDATE pins SET data = ?, content = NULL, updated_at = ? WHERE cid = ?",
+                    (json.dumps(entry), time.time(), cid)
+                )
+            else:
+                self._db.execute(
+                    "UPDATE pins SET data = ?, updated_at = ? WHERE cid = ?", (json.dumps(entry), time.time(), cid)
+                )
+
+    def _stored(self, cid: str) -> Optional[Dict]:
+        """A pin record no longer tracked in memory"""
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT data FROM pins WHERE cid = ?", (cid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # ---- queue -------------------------------------------------------
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Give queued pins a moment to finish, then stop the workers"""
+        if self._workers and not self._queue.empty():
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("IPFS pin queue stopped with %d pins outstanding", self._queue.qsize())
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._retry_handles.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit_json(self, data: Any, name: str) -> Optional[str]:
+        """Queue a JSON document for pinning and return its CID (None if it can't be computed locally)"""
+        return self.submit(encode_json(data), name)
+
+    def submit(self, content: bytes, name: str) -> Optional[str]:
+        cid = compute_cid(content)
+        if cid is None:
+            return None
+        self.submitted += 1
+        existing = self._pins.get(cid)
+        if existing is None:
+            existing = self._stored(cid)
+            if existing is not None and existing["status"] == PINNED:
+                self._track(cid, existing)
+        if existing is not None and existing["status"] != FAILED:
+            self.deduplicated += 1
+            return cid
+        self._track(cid, {"status": QUEUED, "name": name, "size": len(content), "attempts": 0,
+                          "error": None, "queued_at": time.time(), "pinned_at": None})
+        self._payloads[cid] = (content, name)
+        self._save(cid, content)
+        self._queue.put_nowait(cid)
+        return cid
+
+    async def pin_now(self, data: Any, name: str) -> str:
+        """Pin a JSON document inline (for payloads too large for a local CID)"""
+        return await self.pin(encode_json(data), name)
+
+    def status(self, cid: str) -> Optional[Dict]:
+        pin = self._pins.get(cid) or self._stored(cid)
+        return dict(pin, cid=cid) if pin else None
+
+    def _track(self, cid: str, entry: Dict):
+        self._pins[cid] = entry
+        self._pins.move_to_end(cid)
+        while len(self._pins) > self.max_tracked:
+            oldest, pin = next(iter(self._pins.items()))
+            if pin["status"] in (QUEUED, PINNING):
+                break
+            del self._pins[oldest]
+
+    async def _worker(self):
+        while True:
+            cid = await self._queue.get()
+            try:
+                await self._pin_one(cid)
+            finally:
+                self._queue.task_done()
+
+    async def _pin_one(self, cid: str):
+        content, name = self._payloads[cid]
+        entry = self._pins[cid]
+        entry["status"] = PINNING
+        entry["attempts"] += 1
+        try:
+            remote_cid = await self.pin(content, name)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            entry["error"] = repr(e)
+            if entry["attempts"] <= self.max_retries:
+                self.retries += 1
+                entry["status"] = QUEUED
+                delay = self.backoff_base * 2 ** (entry["attempts"] - 1)
+                self._retry_handles[cid] = asyncio.get_running_loop().call_later(delay, self._requeue, cid)
+            else:
+                self.failed += 1
+                entry["status"] = FAILED
+                self._payloads.pop(cid, None)
+                self._recent_failures.append({"cid": cid, "name": name, "error": repr(e)})
+            self._save(cid)
+            return
+
+        if remote_cid and remote_cid != cid:
+            # The pinning service hashed differently (e.g. other chunking); record what it pinned
+            self.cid_mismatches += 1
+            entry["remote_cid"] = remote_cid
+        entry.update(status=PINNED, error=None, pinned_at=time.time())
+        self._payloads.pop(cid, None)
+        self._save(cid)
+        self.pinned += 1
+
+    def _requeue(self, cid: str):
+        self._retry_handles.pop(cid, None)
+        if cid in self._payloads:
+            self._queue.put_nowait(cid)
+
+    def stats(self) -> Dict[str, Any]:
+        by_status: Dict[str, int] = {}
+        for pin in self._pins.values():
+            by_status[pin["status"]] = by_status.get(pin["status"], 0) + 1
+        return {
+            "queue_depth": self._queue.qsize(),
+            "tracked": len(self._pins),
+            "by_status": by_status,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "pinned": self.pinned,
+            "failed": self.failed,
+            "retries": self.retries,
+            "cid_mismatches": self.cid_mismatches,
+            "recent_failures": list(self._recent_failures),
+        }
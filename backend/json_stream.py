@@ -0,0 +1,128 @@
+"""
+Incremental parser for a streamed JSON object.
+
+LLM completions arrive token by token. IncrementalJSONFields is fed the text as
+it streams in and reports each top-level field of the JSON object as soon as
+its value is complete, so callers can forward "prediction" before "reasoning"
+has finished generating. Any text before the opening brace (such as a
+```json fence) is ignored.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Parser states
+_BEFORE_OBJECT = "before_object"
+_BEFORE_KEY = "before_key"
+_IN_KEY = "in_key"
+_BEFORE_COLON = "before_colon"
+_BEFORE_VALUE = "before_value"
+_IN_VALUE = "in_value"
+_AFTER_VALUE = "after_value"
+_DONE = "done"
+
+
+class IncrementalJSONFields:
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._state = _BEFORE_OBJECT
+        self._token: List[str] = []
+        self._key: Optional[str] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume more text and return the (key, value) pairs completed by it"""
+        completed = []
+        for char in text:
+            if self._state == _DONE:
+                break
+            field = self._step(char)
+            if field is not None:
+                completed.append(field)
+        return completed
+
+    def _step(self, char: str) -> Optional[Tuple[str, Any]]:
+        state = self._state
+        if state == _BEFORE_OBJECT:
+            if char == "{":
+                self._state = _BEFORE_KEY
+        elif state == _BEFORE_KEY:
+            if char == '"':
+                self._token = [char]
+                self._escaped = False
+                self._state = _IN_KEY
+            elif char == "}":
+                self._state = _DONE
+        elif state == _IN_KEY:
+            self._token.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._key = json.loads("".join(self._token))
+                self._state = _BEFORE_COLON
+        elif state == _BEFORE_COLON:
+            if char == ":":
+                self._state = _BEFORE_VALUE
+        elif state == _BEFORE_VALUE:
+            if not char.isspace():
+                self._token = []
+                self._depth = 0
+                self._in_string = False
+                self._escaped = False
+                self._state = _IN_VALUE
+                return self._value_char(char)
+        elif state == _IN_VALUE:
+            return self._value_char(char)
+        elif state == _AFTER_VALUE:
+            if char == ",":
+                self._state = _BEFORE_KEY
+            elif char == "}":
+                self._state = _DONE
+        return None
+
+    def _value_char(self, char: str) -> Optional[Tuple[str, Any]]:
+        if self._in_string:
+            self._token.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    return self._finish_value(_AFTER_VALUE)
+        elif char == '"':
+            self._in_string = True
+            self._token.append(char)
+        elif char in "{[":
+            self._depth += 1
+            self._token.append(char)
+        elif char in "}]" and self._depth > 0:
+            self._depth -= 1
+            self._token.append(char)
+            if self._depth == 0:
+                return self._finish_value(_AFTER_VALUE)
+        elif char in ",}" and self._depth == 0:
+            # A bare scalar (number / true / false / null) ends at the separator
+            return self._finish_value(_DONE if char == "}" else _BEFORE_KEY)
+        else:
+            self._token.append(char)
+        return None
+
+    def _finish_value(self, next_state: str) -> Optional[Tuple[str, Any]]:
+        raw = "".join(self._token).strip()
+        self._token = []
+        self._state = next_state
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        self.fields[self._key] = value
+        return self._key, value
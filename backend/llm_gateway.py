@@ -0,0 +1,233 @@
+"""
+Admission control for LLM (Groq) calls.
+
+Every completion goes through an LLMGateway, which combines:
+- a concurrency limit (semaphore) so a traffic spike can't open unlimited
+  parallel 30 s requests,
+- a token-bucket rate limiter sized to the account's request quota,
+- a queue deadline: callers that can't get a slot in time are rejected,
+- a circuit breaker that fails fast while the upstream is unhealthy.
+
+Rejections raise LLMGatewayError so callers can serve their fallback at once
+instead of holding a worker slot until the upstream times out.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class LLMGatewayError(Exception):
+    """The gateway refused to send the call upstream"""
+
+
+class CircuitOpenError(LLMGatewayError):
+    pass
+
+
+class QueueTimeoutError(LLMGatewayError):
+    pass
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` tokens per second, bursting up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()  # waiters are served in arrival order
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, deadline: float):
+        """Take one token, waiting until `deadline` (monotonic) at most"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                if time.monotonic() + wait > deadline:
+                    raise QueueTimeoutError("Rate limit: no token available before the deadline")
+                await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single probe through after a cool-down"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+
+    def record_abandoned(self):
+        """An allowed call never reached the upstream (e.g. it timed out in the queue)"""
+        self._probe_in_flight = False
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class LLMGateway:
+    """Concurrency cap + rate limit + queue deadline + circuit breaker around LLM calls"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 4,
+        requests_per_minute: float = 30,
+        burst: Optional[float] = None,
+        queue_timeout: float = 10.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.bucket = (
+            TokenBucket(requests_per_minute / 60.0, burst or max(1.0, requests_per_minute / 10.0))
+            if requests_per_minute > 0 else None
+        )
+        self.breaker = breaker or CircuitBreaker()
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = {"circuit_open": 0, "queue_timeout": 0}
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self._recent_waits: deque = deque(maxlen=512)
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once admitted, raising LLMGatewayError if it isn't"""
+        async with self.admit():
+            return await fn()
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold a gateway slot for the body of the block (e.g. a streamed completion).
+
+        Raises LLMGatewayError if the call isn't admitted. An exception raised
+        by the body counts as an upstream failure for the circuit breaker.
+        """
+        self.calls += 1
+        if not self.breaker.allow():
+            self.rejected["circuit_open"] += 1
+            raise CircuitOpenError(f"{self.name} circuit breaker is open")
+
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        self.waiting += 1
+        try:
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise QueueTimeoutError(f"No {self.name} slot free within {self.queue_timeout}s")
+            try:
+                if self.bucket is not None:
+                    await self.bucket.acquire(deadline)
+            except BaseException:
+                self._semaphore.release()
+                raise
+        except LLMGatewayError:
+            self.rejected["queue_timeout"] += 1
+            self.breaker.record_abandoned()
+            raise
+        except BaseException:
+            self.breaker.record_abandoned()
+            raise
+        finally:
+            self.waiting -= 1
+
+        self._record_wait(time.monotonic() - start)
+        self.in_flight += 1
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.record_abandoned()
+            raise
+        except Exception:
+            self.failed += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+        self.succeeded += 1
+        self.breaker.record_success()
+
+    def _record_wait(self, wait: float):
+        self.queue_wait_total += wait
+        self.queue_wait_max = max(self.queue_wait_max, wait)
+        self._recent_waits.append(wait)
+
+    def status(self) -> Dict[str, Any]:
+        waits = sorted(self._recent_waits)
+        admitted = self.succeeded + self.failed + self.in_flight
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4) if waits else 0.0
+
+        return {
+            "name": self.name,
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": dict(self.rejected),
+            "queue_wait_seconds": {
+                "avg": round(self.queue_wait_total / admitted, 4) if admitted else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(self.queue_wait_max, 4),
+            },
+            "breaker": self.breaker.status(),
+        }
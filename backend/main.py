@@ -1,20 +1,99 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Awaitable, Callable
 import httpx
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import json
+import logging
 from dotenv import load_dotenv
 import os.path
-import random
 import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+
+from cache import apply_ttl_overrides, sportsdb_max_stale, sportsdb_ttl
+from cache_snapshot import CacheSnapshotter
+from http_caching import HTTPCachingMiddleware, ResponseCompressor, record_dependency, record_version
+from http_clients import default_upstream_clients
+from ipfs_pinning import PinQueue
+from json_stream import IncrementalJSONFields
+from llm_gateway import CircuitBreaker, CircuitOpenError, LLMGateway, QueueTimeoutError
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import LoopLagMonitor, RouteMetricsMiddleware, fallback_rates, record_fallback
+from metrics import registry as metrics_registry
+from market_resolution import MarketConflict, ResolutionStore, ResolutionWorker, build_resolution
+from match_watcher import MatchWatcher
+from shared_cache import DistributedSingleFlight, TieredCache, open_cache_backend
+from prediction_scheduler import PredictionScheduler, parse_kickoff, utc_now
+from prediction_store import open_prediction_store
+from projections import compact_response, decode_cached, encode_cached, project_response, projection_stats
+from ratings import RatingEngine
+from team_form import FormEngine
+from search_index import KINDS as SEARCH_KINDS, SearchIndex
+from team_index import TeamIndex, fold_text
+from tracing import Tracer, TracingMiddleware, current_span, span, traced
+from vote_store import VoteStore
+
+# Load .env from the backend directory if present (helps local dev)
+load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open pooled upstream clients and local stores on startup, close them on shutdown"""
+    if CACHE_SNAPSHOT_ENABLED:
+        cache_snapshotter.load()
+        cache_snapshotter.start()
+    await http_clients.start()
+    loop_lag_monitor.start()
+    tracer.start()
+    if cache_backend is not None:
+        await cache_backend.start()
+    pin_queue.open()
+    pin_queue.start()
+    search_index.open()
+    team_index.open()
+    prediction_store.open()
+    resolution_store.open()
+    vote_store.open()
+    vote_store.start()
+    warm_task = asyncio.create_task(warm_team_index())
+    if PREDICTION_SCHEDULER_ENABLED:
+        prediction_scheduler.start()
+    if ORACLE_WORKER_ENABLED:
+        resolution_worker.start()
+    try:
+        yield
+    finally:
+        warm_task.cancel()
+        await prediction_scheduler.stop()
+        if CACHE_SNAPSHOT_ENABLED:
+            await cache_snapshotter.stop()
+        await match_watcher.stop()
+        await resolution_worker.stop()
+        await pin_queue.stop()
+        await vote_store.stop()
+        if cache_backend is not None:
+            await cache_backend.stop()
+        await loop_lag_monitor.stop()
+        await tracer.stop()
+        await http_clients.aclose()
+        pin_queue.close()
+        team_index.close()
+        search_index.close()
+        prediction_store.close()
+        resolution_store.close()
+        vote_store.close()
 
 app = FastAPI(
     title="Rage Bet API - Complete SportsDB Integration",
     description="Full SportsDB API integration with AI trash talk for football predictions",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,12 +105,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load .env from the backend directory if present (helps local dev)
-load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
+# ETags / 304s, Cache-Control from the SportsDB cache TTLs, and gzip/brotli for large JSON (see http_caching.py)
+response_compressor = ResponseCompressor(
+    min_size=int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024")),
+    gzip_level=int(os.getenv("RESPONSE_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+)
+app.add_middleware(HTTPCachingMiddleware, compressor=response_compressor)
+
+# Per-route latency histograms (outside HTTP caching, so compression time is included; only
+# tracing wraps it) and event loop lag, for /metrics
+app.add_middleware(RouteMetricsMiddleware)
+loop_lag_monitor = LoopLagMonitor(interval=float(os.getenv("LOOP_LAG_INTERVAL", "0.5")))
+
+# Per-request span trees, exported as JSON lines and/or OTLP (see tracing.py).
+# Only TRACE_SAMPLE_RATE of requests are traced (1% by default; 1.0 traces all).
+# Added last so the root span covers the whole request.
+tracer = Tracer(
+    service_name=os.getenv("OTEL_SERVICE_NAME", "ragebet-backend"),
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.01")),
+    debug=os.getenv("TRACE_DEBUG", "false").lower() == "true",
+    max_spans=int(os.getenv("TRACE_MAX_SPANS", "256")),
+    json_path=os.getenv("TRACE_EXPORT_PATH") or None,
+    otlp_endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or None
+)
+app.add_middleware(TracingMiddleware, tracer=tracer)
 
 # SportsDB API configuration (must be set in environment or backend/.env)
+# SPORTSDB_API_URL / GROQ_BASE_URL can point at a local stand-in (see benchmark/mock_upstream.py)
 SPORTSDB_API_KEY = os.getenv("SPORTSDB_API_KEY")
-SPORTSDB_BASE_URL = f"https://www.thesportsdb.com/api/v1/json/{SPORTSDB_API_KEY}"
+SPORTSDB_API_URL = os.getenv("SPORTSDB_API_URL", "https://www.thesportsdb.com/api/v1/json").rstrip("/")
+SPORTSDB_BASE_URL = f"{SPORTSDB_API_URL}/{SPORTSDB_API_KEY}"
 
 # Fail fast with a clear error if critical env var is missing
 if not SPORTSDB_API_KEY:
@@ -42,16 +146,174 @@ if not SPORTSDB_API_KEY:
 
 # Groq AI API configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1").rstrip("/")
 
 # IPFS configuration (using Pinata for simplicity)
 PINATA_API_KEY = os.getenv("PINATA_API_KEY")
 PINATA_SECRET_KEY = os.getenv("PINATA_SECRET_KEY")
-PINATA_BASE_URL = "https://api.pinata.cloud"
+PINATA_BASE_URL = os.getenv("PINATA_BASE_URL", "https://api.pinata.cloud")
+
+# Pooled HTTP clients, one per upstream host (see http_clients.py)
+http_clients = default_upstream_clients()
+
+# Admission control for Groq completions (see llm_gateway.py)
+groq_gateway = LLMGateway(
+    "groq",
+    max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "4")),
+    requests_per_minute=float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+    queue_timeout=float(os.getenv("GROQ_QUEUE_TIMEOUT", "10")),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("GROQ_BREAKER_FAILURES", "5")),
+        recovery_timeout=float(os.getenv("GROQ_BREAKER_RECOVERY", "30"))
+    )
+)
 
-# Cache for API responses (simple in-memory cache)
-api_cache = {}
-ai_prediction_cache = {}  # Cache for AI predictions
+# Optional shared tier for multiple workers (REDIS_URL, see shared_cache.py)
+cache_backend = open_cache_backend(os.getenv("REDIS_URL"), prefix=os.getenv("REDIS_KEY_PREFIX", "ragebet"))
+
+# Bounded LRU caches for API responses and AI predictions. SportsDB responses
+# are shared through Redis when it is configured; predictions have their own
+# shared store, so workers only share invalidations for them.
+apply_ttl_overrides(os.getenv("SPORTSDB_TTL_OVERRIDES"))
+api_cache = TieredCache(
+    "sportsdb",
+    backend=cache_backend,
+    encode=encode_cached,
+    decode=decode_cached,
+    max_entries=int(os.getenv("API_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("API_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+ai_prediction_cache = TieredCache(
+    "ai_predictions",
+    backend=cache_backend,
+    share_values=False,
+    max_entries=int(os.getenv("AI_PREDICTION_CACHE_MAX_ENTRIES", "1024")),
+    default_ttl=6 * 60 * 60,  # Cache for 6 hours
+)
+# Canned fallback predictions (Groq down, rejected or unparseable) are never
+# stored; they are only cached this long, so the next request tries Groq again
+FALLBACK_PREDICTION_TTL = float(os.getenv("FALLBACK_PREDICTION_TTL", "300"))
+
+# Local team name -> idTeam index, warmed per league on startup
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
+# Autocomplete over the teams, players and venues seen so far (/api/search/suggest).
+# Queries SportsDB was already asked stay answered locally for SEARCH_COVERAGE_TTL,
+# and so do longer queries when the answer had fewer than SEARCH_UPSTREAM_PAGE_LIMIT
+# rows (a full page may have been cut short upstream).
+search_index = SearchIndex(
+    os.getenv("SEARCH_INDEX_PATH", os.path.join(DATA_DIR, "search_index.sqlite3")),
+    coverage_ttl=float(os.getenv("SEARCH_COVERAGE_TTL", "3600")),
+    page_limit=int(os.getenv("SEARCH_UPSTREAM_PAGE_LIMIT", "10"))
+)
+team_index = TeamIndex(
+    os.getenv("TEAM_INDEX_PATH", os.path.join(DATA_DIR, "team_index.sqlite3")),
+    on_team=lambda team: search_index.add("team", [team], persist=False)
+)
+TEAM_INDEX_LEAGUES = [l for l in os.getenv("TEAM_INDEX_LEAGUES", "4328").split(",") if l.strip()]
+# Suggest queries shorter than this never go upstream; longer ones wait at most
+# SEARCH_UPSTREAM_WAIT seconds for SportsDB before answering from the index
+SEARCH_UPSTREAM_MIN_CHARS = int(os.getenv("SEARCH_UPSTREAM_MIN_CHARS", "3"))
+SEARCH_UPSTREAM_WAIT = float(os.getenv("SEARCH_UPSTREAM_WAIT", "0.3"))
+
+# The caches are snapshotted to disk every CACHE_SNAPSHOT_INTERVAL seconds and on
+# shutdown, and lazily restored on startup, so a restart doesn't begin cold
+# (see cache_snapshot.py). The team and search indexes persist on their own.
+CACHE_SNAPSHOT_ENABLED = os.getenv("CACHE_SNAPSHOT_ENABLED", "true").lower() == "true"
+cache_snapshotter = CacheSnapshotter(
+    os.getenv("CACHE_SNAPSHOT_PATH", os.path.join(DATA_DIR, "cache.snapshot")),
+    caches=[
+        (api_cache, encode_cached, decode_cached),
+        (ai_prediction_cache, lambda prediction: json.dumps(prediction.dict()).encode(),
+         lambda raw: AIPrediction(**json.loads(raw))),
+    ],
+    interval=float(os.getenv("CACHE_SNAPSHOT_INTERVAL", "300"))
+)
+
+# Durable prediction repository (sqlite:///path or memory://)
+prediction_store = open_prediction_store(
+    os.getenv("PREDICTION_STORE_URL", f"sqlite:///{os.path.join(DATA_DIR, 'predictions.sqlite3')}")
+)
+# Stored predictions older than this are regenerated on the next request (0 = never)
+PREDICTION_MAX_AGE_HOURS = float(os.getenv("PREDICTION_MAX_AGE_HOURS", "0"))
+
+# Background pre-generation of predictions for upcoming fixtures
+PREDICTION_SCHEDULER_ENABLED = os.getenv("PREDICTION_SCHEDULER_ENABLED", "false").lower() == "true"
+prediction_scheduler = PredictionScheduler(
+    generate=lambda match_id: pregenerate_prediction(match_id),
+    fetch_fixtures=lambda league_id: league_next_events(league_id),
+    has_prediction=lambda match_id: has_real_prediction(match_id),
+    leagues=[l.strip() for l in os.getenv("PREDICTION_SCHEDULER_LEAGUES", "4328").split(",") if l.strip()],
+    horizon_days=float(os.getenv("PREDICTION_SCHEDULER_HORIZON_DAYS", "3")),
+    concurrency=int(os.getenv("PREDICTION_SCHEDULER_CONCURRENCY", "2")),
+    refresh_interval=float(os.getenv("PREDICTION_SCHEDULER_INTERVAL", "900")),
+    max_retries=int(os.getenv("PREDICTION_SCHEDULER_MAX_RETRIES", "3"))
+)
+
+# Background IPFS pinning (CIDs are computed locally and returned at once); pin
+# records and unfinished pins survive restarts in IPFS_PIN_STORE_PATH
+pin_queue = PinQueue(
+    pin=lambda content, name: pin_to_pinata(content, name),
+    path=os.getenv("IPFS_PIN_STORE_PATH", os.path.join(DATA_DIR, "pins.sqlite3")),
+    concurrency=int(os.getenv("IPFS_PIN_CONCURRENCY", "2")),
+    max_retries=int(os.getenv("IPFS_PIN_MAX_RETRIES", "5")),
+    backoff_base=float(os.getenv("IPFS_PIN_BACKOFF", "5"))
+)
+
+# Market resolution: tracked markets are resolved against the AI prediction stored
+# before kickoff by a background worker once their match is over
+resolution_store = ResolutionStore(os.getenv("RESOLUTION_STORE_PATH", os.path.join(DATA_DIR, "resolutions.sqlite3")))
+ORACLE_WORKER_ENABLED = os.getenv("ORACLE_WORKER_ENABLED", "true").lower() == "true"
+resolution_worker = ResolutionWorker(
+    store=resolution_store,
+    fetch_event=lambda match_id: find_match_data(match_id),
+    get_prediction=lambda match_id, event: prediction_at_kickoff(match_id, event),
+    poll_interval=float(os.getenv("ORACLE_POLL_INTERVAL", "300")),
+    max_missing=int(os.getenv("ORACLE_MAX_MISSING", "5")),
+    concurrency=int(os.getenv("ORACLE_POLL_CONCURRENCY", "4"))
+)
+
+# Roast votes: deduplicated per voter/roast, batched to SQLite, leaderboard kept sorted in memory
+vote_store = VoteStore(
+    os.getenv("VOTE_STORE_PATH", os.path.join(DATA_DIR, "votes.sqlite3")),
+    batch_size=int(os.getenv("VOTE_BATCH_SIZE", "200")),
+    flush_interval=float(os.getenv("VOTE_FLUSH_INTERVAL", "0.5"))
+)
+
+# Batch prediction limits
+BATCH_PREDICTION_MAX_MATCHES = int(os.getenv("BATCH_PREDICTION_MAX_MATCHES", "25"))
+BATCH_PREDICTION_CONCURRENCY = int(os.getenv("BATCH_PREDICTION_CONCURRENCY", "4"))
+
+# Per-stage timeout for the team-stats pipeline (seconds)
+TEAM_STATS_STAGE_TIMEOUT = float(os.getenv("TEAM_STATS_STAGE_TIMEOUT", "4.0"))
+
+# Per-team rolling form, updated from finished events; a team's eventslast is
+# refetched only after FORM_MAX_AGE seconds
+form_engine = FormEngine(max_age=float(os.getenv("FORM_MAX_AGE", str(6 * 60 * 60))))
+
+# Elo / Poisson league strength ratings, fitted from past league events and tables
+rating_engine = RatingEngine()
+
+# One adaptive upstream poller per live match, fanned out to WebSocket subscribers
+def cache_watched_event(event: Dict):
+    """Keep /api/lookup/event answers for a watched match as fresh as the last poll"""
+    api_cache.set(f"event_{event.get('idEvent')}", {"events": [event]}, sportsdb_ttl("lookupevent.php"))
+
+match_watcher = MatchWatcher(
+    fetch_event=lambda match_id: find_match_data(match_id, fresh=True),
+    live_interval=float(os.getenv("LIVE_POLL_INTERVAL", "15")),
+    near_interval=float(os.getenv("NEAR_KICKOFF_POLL_INTERVAL", "30")),
+    idle_interval=float(os.getenv("IDLE_POLL_INTERVAL", "600")),
+    near_window=float(os.getenv("NEAR_KICKOFF_WINDOW", "900")),
+    on_event=cache_watched_event
+)
+
+# Coalesce concurrent identical upstream fetches / prediction generations
+# (across workers too when the shared cache tier is configured)
+upstream_flights = DistributedSingleFlight("sportsdb", cache_backend, lock_ttl=15, wait_timeout=15)
+PREDICTION_LOCK_TTL = float(os.getenv("PREDICTION_LOCK_TTL", "120"))
+prediction_flights = DistributedSingleFlight(
+    "ai_predictions", cache_backend, lock_ttl=PREDICTION_LOCK_TTL, wait_timeout=PREDICTION_LOCK_TTL
+)
 
 # Models
 class MatchData(BaseModel):
@@ -85,6 +347,10 @@ class MarketResolution(BaseModel):
     away_score: Optional[int] = None
     status: str
 
+class MarketRegistration(BaseModel):
+    market_id: int
+    match_id: str
+
 class AIPrediction(BaseModel):
     match_id: str
     home_team: str
@@ -96,6 +362,14 @@ class AIPrediction(BaseModel):
     reasoning: str
     ipfs_hash: Optional[str] = None
     created_at: str
+    generation: Optional[int] = None
+    # Canned answer used because Groq couldn't produce one (not stored, see finalize_prediction)
+    fallback: bool = False
+
+class BatchPredictionRequest(BaseModel):
+    match_ids: List[str]
+    regenerate: bool = False
+    stream: bool = False
 
 class TeamStats(BaseModel):
     team_name: str
@@ -127,169 +401,143 @@ class CommunityVote(BaseModel):
     timestamp: str
 
 # Helper functions
-async def fetch_match_data(match_id: str) -> Dict:
-    """Fetch match data from SportsDB API"""
-    async with httpx.AsyncClient() as client:
-        try:
+@traced()
+async def find_match_data(match_id: str, fresh: bool = False) -> Optional[Dict]:
+    """fetch_match_data, but None when SportsDB doesn't know the match (for the background workers)"""
+    try:
+        return await fetch_match_data(match_id, fresh)
+    except HTTPException as e:
+        if e.status_code == 404:
+            return None
+        raise
+
+async def fetch_match_data(match_id: str, fresh: bool = False) -> Dict:
+    """Fetch match data from SportsDB API
+    
+    Served from the event_{id} cache entry the live watcher keeps current;
+    fresh=True (the watcher's own polls) always asks SportsDB.
+    """
+    try:
+        if fresh:
+            client = http_clients.get("sportsdb")
             url = f"{SPORTSDB_BASE_URL}/lookupevent.php?id={match_id}"
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data.get("events"):
-                raise HTTPException(status_code=404, detail="Match not found")
-            
-            return data["events"][0]
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=500, detail=f"Failed to fetch match data: {str(e)}")
+            data = await upstream_flights.do(
+                url, lambda: _get_json(client, url, project=f"lookupevent.php?id={match_id}")
+            )
+        else:
+            data = await fetch_sportsdb(f"lookupevent.php?id={match_id}", f"event_{match_id}")
+        
+        if not data.get("events"):
+            raise HTTPException(status_code=404, detail="Match not found")
+        
+        form_engine.ingest_events(data["events"])
+        rating_engine.ingest_events(data["events"])
+        return data["events"][0]
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch match data: {str(e)}")
+
+@traced()
+async def resolve_team(team_name: str) -> Optional[Dict]:
+    """Resolve a team name to its SportsDB team, using the local index before searchteams"""
+    team = team_index.lookup(team_name)
+    current_span().set(team=team_name, source="index" if team is not None else "searchteams")
+    if team is not None:
+        return team
+    
+    data = await asyncio.wait_for(
+        fetch_sportsdb(f"searchteams.php?t={team_name}", f"search_teams_{team_name}"),
+        TEAM_STATS_STAGE_TIMEOUT
+    )
+    teams = data.get("teams") or []
+    if not teams:
+        return None
+    
+    team_index.add_teams(teams)
+    team_index.add_alias(team_name, teams[0]["idTeam"])
+    return teams[0]
 
 async def fetch_team_stats(team_name: str) -> Dict:
     """Fetch team statistics from SportsDB API"""
-    async with httpx.AsyncClient() as client:
-        try:
-            url = f"{SPORTSDB_BASE_URL}/searchteams.php?t={team_name}"
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("teams"):
-                return data["teams"][0]
-            return {}
-        except:
-            return {}
+    try:
+        return await resolve_team(team_name) or {}
+    except:
+        return {}
+
+def unknown_team_stats(team_name: str) -> TeamStats:
+    """Placeholder stats used when a team can't be resolved"""
+    return TeamStats(
+        team_name=team_name,
+        recent_form="Unknown",
+        goals_scored=0,
+        goals_conceded=0,
+        wins=0,
+        draws=0,
+        losses=0,
+        home_advantage=0.0,
+        key_players=[],
+        injuries=[]
+    )
+
+@traced()
+async def load_team_form(team_id: str):
+    """Load a team's recent results (eventslast) into the form engine"""
+    data = await fetch_sportsdb(f"eventslast.php?id={team_id}", f"last_team_{team_id}")
+    results = data.get("results") or []
+    form_engine.load_team_results(team_id, results)
+    return results
 
+@traced()
 async def fetch_team_detailed_stats(team_name: str) -> TeamStats:
     """Fetch detailed team statistics for AI analysis"""
+    current_span().set(team=team_name)
     try:
-        # Search for team
-        async with httpx.AsyncClient() as client:
-            search_url = f"{SPORTSDB_BASE_URL}/searchteams.php?t={team_name}"
-            search_response = await client.get(search_url, timeout=10.0)
-            search_data = search_response.json()
-            
-            if not search_data.get("teams"):
-                return TeamStats(
-                    team_name=team_name,
-                    recent_form="Unknown",
-                    goals_scored=0,
-                    goals_conceded=0,
-                    wins=0,
-                    draws=0,
-                    losses=0,
-                    home_advantage=0.0,
-                    key_players=[],
-                    injuries=[]
-                )
-            
-            team_id = search_data["teams"][0]["idTeam"]
-            
-            # Get team details
-            details_url = f"{SPORTSDB_BASE_URL}/lookupteam.php?id={team_id}"
-            details_response = await client.get(details_url, timeout=10.0)
-            details_data = details_response.json()
-            
-            team = details_data.get("teams", [{}])[0]
-            
-            # Get recent matches for form analysis
-            recent_matches_url = f"{SPORTSDB_BASE_URL}/eventslast.php?id={team_id}"
-            matches_response = await client.get(recent_matches_url, timeout=10.0)
-            matches_data = matches_response.json()
-            
-            # Analyze recent form
-            recent_form = "Unknown"
-            goals_scored = 0
-            goals_conceded = 0
-            wins = 0
-            draws = 0
-            losses = 0
-            
-            if matches_data.get("results"):
-                recent_matches = matches_data["results"][:5]  # Last 5 matches
-                for match in recent_matches:
-                    home_team = match.get("strHomeTeam", "")
-                    away_team = match.get("strAwayTeam", "")
-                    home_score = match.get("intHomeScore", 0)
-                    away_score = match.get("intAwayScore", 0)
-                    
-                    if home_team == team_name:
-                        goals_scored += int(home_score) if home_score else 0
-                        goals_conceded += int(away_score) if away_score else 0
-                        if int(home_score) > int(away_score):
-                            wins += 1
-                        elif int(home_score) == int(away_score):
-                            draws += 1
-                        else:
-                            losses += 1
-                    elif away_team == team_name:
-                        goals_scored += int(away_score) if away_score else 0
-                        goals_conceded += int(home_score) if home_score else 0
-                        if int(away_score) > int(home_score):
-                            wins += 1
-                        elif int(away_score) == int(home_score):
-                            draws += 1
-                        else:
-                            losses += 1
-                
-                # Create form string
-                form_results = []
-                for match in recent_matches[:5]:
-                    home_team = match.get("strHomeTeam", "")
-                    away_team = match.get("strAwayTeam", "")
-                    home_score = match.get("intHomeScore", 0)
-                    away_score = match.get("intAwayScore", 0)
-                    
-                    if home_team == team_name:
-                        if int(home_score) > int(away_score):
-                            form_results.append("W")
-                        elif int(home_score) == int(away_score):
-                            form_results.append("D")
-                        else:
-                            form_results.append("L")
-                    elif away_team == team_name:
-                        if int(away_score) > int(home_score):
-                            form_results.append("W")
-                        elif int(away_score) == int(home_score):
-                            form_results.append("D")
-                        else:
-                            form_results.append("L")
-                
-                recent_form = "".join(form_results) if form_results else "Unknown"
-            
-            # Calculate home advantage (simplified)
-            home_advantage = 0.1  # 10% base home advantage
-            
-            return TeamStats(
-                team_name=team_name,
-                recent_form=recent_form,
-                goals_scored=goals_scored,
-                goals_conceded=goals_conceded,
-                wins=wins,
-                draws=draws,
-                losses=losses,
-                home_advantage=home_advantage,
-                key_players=[],  # Would need additional API calls
-                injuries=[]  # Would need additional API calls
-            )
-            
-    except Exception as e:
-        print(f"Error fetching detailed team stats: {e}")
+        # Resolve the team (each stage gets its own timeout)
+        team = await resolve_team(team_name)
+        
+        if not team:
+            return unknown_team_stats(team_name)
+        
+        team_id = team["idTeam"]
+        
+        # Recent form comes from the form engine, which is kept current from
+        # every finished event we see; eventslast is only fetched when the
+        # team has never been loaded (or its load is older than FORM_MAX_AGE).
+        # Team details (lookupteam) are not used by the prediction, so that
+        # round trip is skipped.
+        if form_engine.needs_load(team_id):
+            try:
+                await asyncio.wait_for(load_team_form(team_id), TEAM_STATS_STAGE_TIMEOUT)
+            except (asyncio.TimeoutError, HTTPException) as e:
+                # Partial result: the team is known but its form may not be
+                record_fallback("sportsdb", "team_form_unavailable")
+                logger.warning("Recent matches unavailable for %s: %r", team_name, e)
+        
+        form = form_engine.summary(team_id, window=5)
+        
+        # Calculate home advantage (simplified)
+        home_advantage = 0.1  # 10% base home advantage
+        
         return TeamStats(
             team_name=team_name,
-            recent_form="Unknown",
-            goals_scored=0,
-            goals_conceded=0,
-            wins=0,
-            draws=0,
-            losses=0,
-            home_advantage=0.0,
-            key_players=[],
-            injuries=[]
+            recent_form=form.form or "Unknown",
+            goals_scored=form.goals_scored,
+            goals_conceded=form.goals_conceded,
+            wins=form.wins,
+            draws=form.draws,
+            losses=form.losses,
+            home_advantage=home_advantage,
+            key_players=[],  # Would need additional API calls
+            injuries=[]  # Would need additional API calls
         )
-
-async def call_groq_api(context: Dict) -> Dict:
-    """Call Groq API for AI prediction and roast generation"""
-    try:
-        prompt = f"""
+        
+    except Exception:
+        record_fallback("sportsdb", "team_stats_error")
+        logger.exception("Error fetching detailed team stats for %s", team_name)
+        return unknown_team_stats(team_name)
+
+def build_groq_request(context: Dict) -> Dict:
+    """Chat completion request body for the prediction/roast prompt"""
+    prompt = f"""
         You are a football expert and master of trash talk. Analyze this match and provide:
 
         1. A clear prediction for who will win (only one team)
@@ -306,6 +554,7 @@ async def call_groq_api(context: Dict) -> Dict:
 
         Home Team Stats: {context.get('home_stats', {})}
         Away Team Stats: {context.get('away_stats', {})}
+        Rating Model (Elo/Poisson): {context.get('model_probabilities') or 'Unavailable'}
 
         Requirements:
         - Choose ONE winner (Home Team or Away Team)
@@ -324,98 +573,170 @@ async def call_groq_api(context: Dict) -> Dict:
         }}
         """
 
-        async with httpx.AsyncClient() as client:
+    return {
+        "model": "llama-3.1-70b-versatile",
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a football expert and master of trash talk. Always respond in valid JSON format."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0.8,
+        "max_tokens": 1000
+    }
+
+# Fields a Groq completion must carry to make a prediction
+GROQ_FIELDS = ("prediction", "roast_loser", "confidence", "reasoning")
+
+def groq_headers() -> Dict:
+    return {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+@traced()
+async def call_groq_api(context: Dict) -> Dict:
+    """Call Groq API for AI prediction and roast generation"""
+    try:
+        client = http_clients.get("groq")
+        
+        async def request_completion() -> str:
             response = await client.post(
                 f"{GROQ_BASE_URL}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.1-70b-versatile",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a football expert and master of trash talk. Always respond in valid JSON format."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "temperature": 0.8,
-                    "max_tokens": 1000
-                },
-                timeout=30.0
+                headers=groq_headers(),
+                json=build_groq_request(context)
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                
-                # Parse JSON response
-                try:
-                    return json.loads(content)
-                except json.JSONDecodeError:
-                    # Fallback if JSON parsing fails
-                    return {
-                        "prediction": f"{context['home_team']} wins",
-                        "roast_loser": f"{context['away_team']} is going to get roasted!",
-                        "confidence": 0.6,
-                        "reasoning": "AI analysis completed"
-                    }
-            else:
+            if response.status_code != 200:
                 raise Exception(f"Groq API error: {response.status_code}")
-                
+            return response.json()["choices"][0]["message"]["content"]
+        
+        # Admission control: concurrency cap, rate limit and circuit breaker.
+        # Rejections raise straight into the fallback below.
+        content = await groq_gateway.call(request_completion)
+        
+        # Parse JSON response
+        try:
+            ai_response = json.loads(content)
+        except json.JSONDecodeError:
+            # Fallback if JSON parsing fails
+            record_fallback("groq", "invalid_json")
+            return {
+                "prediction": f"{context['home_team']} wins",
+                "roast_loser": f"{context['away_team']} is going to get roasted!",
+                "confidence": 0.6,
+                "reasoning": "AI analysis completed",
+                "fallback": True
+            }
+        if not isinstance(ai_response, dict) or any(field not in ai_response for field in GROQ_FIELDS):
+            raise ValueError(f"Groq response lacks prediction fields: {content[:200]!r}")
+        return {field: ai_response[field] for field in GROQ_FIELDS}
+            
     except Exception as e:
         # Fallback response
-        return {
-            "prediction": f"{context['home_team']} wins",
-            "roast_loser": f"{context['away_team']} is going to get absolutely destroyed!",
-            "confidence": 0.5,
-            "reasoning": f"Fallback prediction due to error: {str(e)}"
-        }
+        return groq_fallback_response(context, e)
+
+def groq_fallback_response(context: Dict, error: Any) -> Dict:
+    """Canned prediction used when Groq can't produce one"""
+    if isinstance(error, CircuitOpenError):
+        record_fallback("groq", "circuit_open")
+    elif isinstance(error, QueueTimeoutError):
+        record_fallback("groq", "queue_timeout")
+    else:
+        record_fallback("groq", "error")
+    return {
+        "prediction": f"{context['home_team']} wins",
+        "roast_loser": f"{context['away_team']} is going to get absolutely destroyed!",
+        "confidence": 0.5,
+        "reasoning": f"Fallback prediction due to error: {str(error)}",
+        "fallback": True
+    }
 
-async def generate_ai_prediction_and_roast(match_data: Dict) -> AIPrediction:
+async def stream_groq_completion(context: Dict) -> AsyncIterator[str]:
+    """Yield the content deltas of a streamed Groq completion as they arrive"""
+    client = http_clients.get("groq")
+    async with groq_gateway.admit():
+        async with client.stream(
+            "POST",
+            f"{GROQ_BASE_URL}/chat/completions",
+            headers=groq_headers(),
+            json=dict(build_groq_request(context), stream=True)
+        ) as response:
+            if response.status_code != 200:
+                raise Exception(f"Groq API error: {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+@traced()
+async def build_prediction_context(match_data: Dict, team_stats: Optional[Dict[str, TeamStats]] = None) -> Dict:
+    """Match details and team stats the Groq prompt is built from
+    
+    team_stats can carry stats already fetched for some teams (e.g. shared
+    across a batch); the rest are fetched here.
+    """
+    home_team = match_data.get("strHomeTeam", "Unknown Team")
+    away_team = match_data.get("strAwayTeam", "Unknown Team")
+    team_stats = team_stats or {}
+    
+    async def stats_for(team_name: str) -> TeamStats:
+        if team_name in team_stats:
+            return team_stats[team_name]
+        return await fetch_team_detailed_stats(team_name)
+    
+    # Fetch team stats for better predictions (both teams in parallel)
+    home_stats, away_stats = await asyncio.gather(stats_for(home_team), stats_for(away_team))
+    
+    return {
+        "home_team": home_team,
+        "away_team": away_team,
+        "league": match_data.get("strLeague", "Unknown League"),
+        "home_stats": home_stats.dict(),
+        "away_stats": away_stats.dict(),
+        "match_date": match_data.get("dateEvent"),
+        "venue": match_data.get("strVenue"),
+        "model_probabilities": rating_engine.predict(match_data.get("idHomeTeam"), match_data.get("idAwayTeam"))
+    }
+
+def prediction_from_ai_response(match_data: Dict, ai_response: Dict) -> AIPrediction:
+    return AIPrediction(
+        match_id=match_data.get("idEvent", "unknown"),
+        home_team=match_data.get("strHomeTeam", "Unknown Team"),
+        away_team=match_data.get("strAwayTeam", "Unknown Team"),
+        league=match_data.get("strLeague", "Unknown League"),
+        ai_prediction=ai_response["prediction"],
+        ai_roast_loser=ai_response["roast_loser"],
+        confidence=ai_response["confidence"],
+        reasoning=ai_response["reasoning"],
+        created_at=datetime.now().isoformat(),
+        fallback=bool(ai_response.get("fallback", False))
+    )
+
+@traced()
+async def generate_ai_prediction_and_roast(
+    match_data: Dict,
+    team_stats: Optional[Dict[str, TeamStats]] = None
+) -> AIPrediction:
     """Generate AI prediction and roasts using Groq API"""
     try:
-        # Extract match information
-        match_id = match_data.get("idEvent", "unknown")
-        home_team = match_data.get("strHomeTeam", "Unknown Team")
-        away_team = match_data.get("strAwayTeam", "Unknown Team")
-        league = match_data.get("strLeague", "Unknown League")
-        
-        # Fetch team stats for better predictions
-        home_stats = await fetch_team_detailed_stats(home_team)
-        away_stats = await fetch_team_detailed_stats(away_team)
-        
         # Prepare context for AI
-        context = {
-            "home_team": home_team,
-            "away_team": away_team,
-            "league": league,
-            "home_stats": home_stats.dict(),
-            "away_stats": away_stats.dict(),
-            "match_date": match_data.get("dateEvent"),
-            "venue": match_data.get("strVenue")
-        }
+        context = await build_prediction_context(match_data, team_stats)
         
         # Generate AI prediction and roasts
         ai_response = await call_groq_api(context)
         
-        return AIPrediction(
-            match_id=match_id,
-            home_team=home_team,
-            away_team=away_team,
-            league=league,
-            ai_prediction=ai_response["prediction"],
-            ai_roast_loser=ai_response["roast_loser"],
-            confidence=ai_response["confidence"],
-            reasoning=ai_response["reasoning"],
-            created_at=datetime.now().isoformat()
-        )
+        return prediction_from_ai_response(match_data, ai_response)
         
-    except Exception as e:
+    except Exception:
         # Fallback response
         return AIPrediction(
             match_id=match_data.get("idEvent", "unknown"),
@@ -426,51 +747,247 @@ async def generate_ai_prediction_and_roast(match_data: Dict) -> AIPrediction:
             ai_roast_loser="This team is going to get roasted!",
             confidence=0.5,
             reasoning="Fallback prediction due to API error",
-            created_at=datetime.now().isoformat()
+            created_at=datetime.now().isoformat(),
+            fallback=True
         )
 
+async def pin_to_pinata(content: bytes, name: str) -> str:
+    """Pin raw bytes as a file with Pinata and return the CID it reports"""
+    client = http_clients.get("pinata")
+    response = await client.post(
+        f"{PINATA_BASE_URL}/pinning/pinFileToIPFS",
+        headers={
+            "pinata_api_key": PINATA_API_KEY,
+            "pinata_secret_api_key": PINATA_SECRET_KEY
+        },
+        files={"file": (f"{name}.json", content, "application/json")},
+        data={"pinataMetadata": json.dumps({"name": name})}
+    )
+    
+    if response.status_code != 200:
+        raise Exception(f"Pinata API error: {response.status_code}")
+    return response.json()["IpfsHash"]
+
+@traced()
 async def upload_to_ipfs(data: Dict) -> str:
-    """Upload data to IPFS using Pinata"""
+    """Queue data for pinning to IPFS and return its CID
+    
+    The CID is computed locally and the pin happens in the background, so
+    this doesn't wait on Pinata. Only payloads too large for a local CID
+    are pinned inline.
+    """
+    if not PINATA_API_KEY or not PINATA_SECRET_KEY:
+        return None
+    name = f"rage-bet-prediction-{data.get('match_id', 'unknown')}"
+    cid = pin_queue.submit_json(data, name)
+    if cid is not None:
+        return cid
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{PINATA_BASE_URL}/pinning/pinJSONToIPFS",
-                headers={
-                    "pinata_api_key": PINATA_API_KEY,
-                    "pinata_secret_api_key": PINATA_SECRET_KEY,
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "pinataContent": data,
-                    "pinataMetadata": {
-                        "name": f"rage-bet-prediction-{data.get('match_id', 'unknown')}"
-                    }
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["IpfsHash"]
-            else:
-                raise Exception(f"Pinata API error: {response.status_code}")
-                
+        return await pin_queue.pin_now(data, name)
     except Exception as e:
-        print(f"Error uploading to IPFS: {e}")
+        record_fallback("pinata", "pin_failed")
+        logger.error("Error uploading to IPFS: %r", e)
         return None
 
+@traced()
+def load_prediction(match_id: str) -> Optional[AIPrediction]:
+    """Cached or stored prediction for a match, without generating one"""
+    prediction = ai_prediction_cache.get(match_id)
+    if prediction is not None:
+        current_span().set(source="cache")
+        return prediction
+    
+    stored = prediction_store.get(match_id)
+    current_span().set(source="store" if stored is not None else "miss")
+    if stored is None:
+        return None
+    
+    prediction = AIPrediction(**stored)
+    if PREDICTION_MAX_AGE_HOURS > 0:
+        age = datetime.now() - datetime.fromisoformat(prediction.created_at)
+        if age.total_seconds() > PREDICTION_MAX_AGE_HOURS * 3600:
+            return None
+    
+    # Read back from the store: fill this worker's L1 without invalidating the others
+    ai_prediction_cache.set(match_id, prediction, publish=False)
+    return prediction
+
+async def create_prediction(
+    match_id: str,
+    match_data: Optional[Dict] = None,
+    team_stats: Optional[Dict[str, TeamStats]] = None
+) -> AIPrediction:
+    """Generate, pin, store and cache a new AI prediction for a match"""
+    # Fetch match data
+    if match_data is None:
+        match_data = await fetch_match_data(match_id)
+    
+    if not match_data:
+        raise HTTPException(status_code=404, detail="Match not found")
+    
+    # Generate AI prediction and roasts
+    prediction = await generate_ai_prediction_and_roast(match_data, team_stats)
+    
+    return await finalize_prediction(match_id, prediction)
+
+@traced()
+async def finalize_prediction(match_id: str, prediction: AIPrediction) -> AIPrediction:
+    """Pin, store and cache a freshly generated prediction
+    
+    Fallback predictions are only cached in this worker, for
+    FALLBACK_PREDICTION_TTL: a transient Groq outage must not become the
+    stored answer for the match.
+    """
+    if prediction.fallback:
+        ai_prediction_cache.set(match_id, prediction, FALLBACK_PREDICTION_TTL, publish=False)
+        return prediction
+    
+    # Upload to IPFS
+    ipfs_hash = await upload_to_ipfs(prediction.dict())
+    if ipfs_hash:
+        prediction.ipfs_hash = ipfs_hash
+    
+    # Store as a new generation, then cache (the other workers drop their copy)
+    prediction.generation = prediction_store.put(match_id, prediction.dict())
+    ai_prediction_cache.set(match_id, prediction)
+    
+    return prediction
+
+async def stream_prediction(match_id: str, emit: Callable[[str, Any], None]) -> AIPrediction:
+    """Generate a prediction from a streamed Groq completion, emitting progress as it goes"""
+    emit("status", {"stage": "match"})
+    match_data = await fetch_match_data(match_id)
+    
+    emit("status", {"stage": "team_stats"})
+    context = await build_prediction_context(match_data)
+    
+    emit("status", {"stage": "generating"})
+    parser = IncrementalJSONFields()
+    try:
+        async for delta in stream_groq_completion(context):
+            emit("token", {"text": delta})
+            for name, value in parser.feed(delta):
+                emit("field", {"name": name, "value": value})
+        if not all(key in parser.fields for key in GROQ_FIELDS):
+            raise ValueError("Incomplete JSON in streamed completion")
+        ai_response = {field: parser.fields[field] for field in GROQ_FIELDS}
+    except Exception as e:
+        ai_response = groq_fallback_response(context, e)
+    
+    prediction = prediction_from_ai_response(match_data, ai_response)
+    return await finalize_prediction(match_id, prediction)
+
+def generated_elsewhere(match_id: str) -> Callable[[], Awaitable[Optional[AIPrediction]]]:
+    """ready() hook for prediction_flights: the generation another worker stored while we waited for its lock"""
+    stored = prediction_store.get(match_id)
+    known_generation = stored.get("generation") if stored else None
+    
+    async def ready() -> Optional[AIPrediction]:
+        stored = prediction_store.get(match_id)
+        if stored is None or stored.get("generation") == known_generation:
+            return None
+        prediction = AIPrediction(**stored)
+        ai_prediction_cache.set(match_id, prediction, publish=False)
+        return prediction
+    
+    return ready
+
+@traced()
+async def create_prediction_once(
+    match_id: str,
+    match_data: Optional[Dict] = None,
+    team_stats: Optional[Dict[str, TeamStats]] = None
+) -> AIPrediction:
+    """Generate a prediction, or join the generation already running for this match (in any worker)"""
+    return await prediction_flights.do(
+        match_id, lambda: create_prediction(match_id, match_data, team_stats), ready=generated_elsewhere(match_id)
+    )
+
+def has_real_prediction(match_id: str) -> bool:
+    """Whether a match has a usable prediction (a cached fallback doesn't count)"""
+    prediction = load_prediction(match_id)
+    return prediction is not None and not prediction.fallback
+
+async def pregenerate_prediction(match_id: str) -> AIPrediction:
+    """Scheduler job; a fallback raises, so the scheduler retries it with backoff instead of counting it done"""
+    prediction = await create_prediction_once(match_id)
+    if prediction.fallback:
+        raise RuntimeError(f"Groq fallback for {match_id}: {prediction.reasoning}")
+    return prediction
+
+def kicked_off(match_data: Dict) -> bool:
+    kickoff = parse_kickoff(match_data)
+    return kickoff is not None and kickoff <= utc_now()
+
+def prediction_at_kickoff(match_id: str, match_data: Dict) -> Optional[Dict]:
+    """The generation markets on a match settle against: the latest one stored before kickoff"""
+    kickoff = parse_kickoff(match_data)
+    if kickoff is None:
+        return prediction_store.get(match_id)
+    return prediction_store.latest_before(match_id, kickoff.replace(tzinfo=timezone.utc).timestamp())
+
+async def check_regenerate(match_id: str):
+    """Refuse to regenerate a prediction once its match has kicked off"""
+    if kicked_off(await fetch_match_data(match_id)):
+        raise HTTPException(status_code=409, detail="Match has kicked off; its prediction can no longer be regenerated")
+
+async def generate_predictions_batch(match_ids: List[str], regenerate: bool = False) -> AsyncIterator[Dict]:
+    """Yield one result per match, in completion order
+    
+    Stored predictions are yielded first. For the rest, match data is fetched
+    up front so each distinct team's stats are fetched once for the whole
+    batch, then predictions are generated with bounded parallelism. Matches
+    that have kicked off can't be regenerated.
+    """
+    pending = []
+    for match_id in match_ids:
+        prediction = None if regenerate else load_prediction(match_id)
+        if prediction is not None:
+            yield {"match_id": match_id, "success": True, "cached": True, "prediction": prediction}
+        else:
+            pending.append(match_id)
+    if not pending:
+        return
+    
+    match_results = await asyncio.gather(*(fetch_match_data(m) for m in pending), return_exceptions=True)
+    matches = {}
+    for match_id, result in zip(pending, match_results):
+        if isinstance(result, Exception):
+            detail = result.detail if isinstance(result, HTTPException) else str(result)
+            yield {"match_id": match_id, "success": False, "error": detail}
+        elif regenerate and kicked_off(result):
+            yield {"match_id": match_id, "success": False,
+                   "error": "Match has kicked off; its prediction can no longer be regenerated"}
+        else:
+            matches[match_id] = result
+    
+    team_names = list(dict.fromkeys(
+        team for match_data in matches.values()
+        for team in (match_data.get("strHomeTeam", "Unknown Team"), match_data.get("strAwayTeam", "Unknown Team"))
+    ))
+    team_stats = dict(zip(team_names, await asyncio.gather(*(fetch_team_detailed_stats(t) for t in team_names))))
+    
+    semaphore = asyncio.Semaphore(BATCH_PREDICTION_CONCURRENCY)
+    
+    async def generate(match_id: str) -> Dict:
+        async with semaphore:
+            try:
+                prediction = await create_prediction_once(match_id, matches[match_id], team_stats)
+                return {"match_id": match_id, "success": True, "cached": False, "prediction": prediction}
+            except Exception as e:
+                return {"match_id": match_id, "success": False, "error": str(e)}
+    
+    for result in asyncio.as_completed([generate(match_id) for match_id in matches]):
+        yield await result
+
 async def fetch_upcoming_matches(league_id: str = "4328") -> List[Dict]:
-    """Fetch upcoming matches for a league (default: Premier League)"""
-    async with httpx.AsyncClient() as client:
-        try:
-            url = f"{SPORTSDB_BASE_URL}/eventsnextleague.php?id={league_id}"
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            return data.get("events", [])
-        except:
-            return []
+    """Fetch upcoming matches for a league (default: Premier League), shared with the schedule endpoint's cache"""
+    try:
+        return await league_next_events(league_id)
+    except (HTTPException, httpx.HTTPError, ValueError) as e:
+        # fetch_sportsdb reports upstream errors as HTTPException
+        logger.warning("Error fetching upcoming matches for league %s: %r", league_id, e)
+        return []
 
 def generate_trash_talk(team1: str, team2: str, team1_stats: Dict, team2_stats: Dict) -> str:
     """Generate AI trash talk based on team stats"""
@@ -493,13 +1010,23 @@ def generate_trash_talk(team1: str, team2: str, team1_stats: Dict, team2_stats:
     return random.choice(trash_talks)
 
 def make_prediction(team1: str, team2: str, team1_stats: Dict, team2_stats: Dict) -> tuple[str, float]:
-    """Make a prediction based on team stats"""
-    
-    # Simple prediction logic
-    # In production, use ML model
+    """Make a prediction from the league rating model (team1 at home)"""
+    probabilities = rating_engine.predict(
+        (team1_stats or {}).get("idTeam"),
+        (team2_stats or {}).get("idTeam")
+    )
+    if probabilities:
+        outcomes = [
+            (f"{team1} to WIN", probabilities["home_win"]),
+            ("DRAW", probabilities["draw"]),
+            (f"{team2} to WIN", probabilities["away_win"]),
+        ]
+        prediction, confidence = max(outcomes, key=lambda outcome: outcome[1])
+        return prediction, min(confidence, 0.95)
     
-    team1_strength = 0.5
-    team2_strength = 0.5
+    # Teams without rated results in the model: fall back to home advantage
+    team1_strength = 0.55
+    team2_strength = 0.45
     
     # Adjust based on available stats
     if team1_stats and team2_stats:
@@ -510,39 +1037,79 @@ def make_prediction(team1: str, team2: str, team1_stats: Dict, team2_stats: Dict
             else:
                 team2_strength += 0.1
     
-    # Random factor for variation
-    import random
-    team1_strength += random.uniform(-0.2, 0.2)
-    team2_strength += random.uniform(-0.2, 0.2)
+    if team1_strength >= team2_strength:
+        return f"{team1} to WIN", team1_strength / (team1_strength + team2_strength)
+    return f"{team2} to WIN", team2_strength / (team1_strength + team2_strength)
+
+async def _get_json(client: httpx.AsyncClient, url: str, project: Optional[str] = None) -> Dict:
+    """GET a URL and decode the JSON body, raising on HTTP errors
     
-    if team1_strength > team2_strength:
-        confidence = min(team1_strength / (team1_strength + team2_strength), 0.95)
-        return f"{team1} to WIN", confidence
-    else:
-        confidence = min(team2_strength / (team1_strength + team2_strength), 0.95)
-        return f"{team2} to WIN", confidence
+    With project set to the SportsDB endpoint, rows are cut down to their
+    compact projection (see projections.py).
+    """
+    response = await client.get(url)
+    response.raise_for_status()
+    data = response.json()
+    return project_response(project, data) if project else data
 
 # Helper function for API calls with caching
-async def fetch_sportsdb(endpoint: str, cache_key: str = None, cache_duration: int = 300):
-    """Fetch data from SportsDB API with optional caching"""
-    if cache_key and cache_key in api_cache:
-        cached_data, cached_time = api_cache[cache_key]
-        if (datetime.now() - cached_time).seconds < cache_duration:
-            return cached_data
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            url = f"{SPORTSDB_BASE_URL}/{endpoint}"
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-            
-            if cache_key:
-                api_cache[cache_key] = (data, datetime.now())
-            
-            return data
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=500, detail=f"SportsDB API error: {str(e)}")
+@traced()
+async def fetch_sportsdb(endpoint: str, cache_key: str = None, cache_duration: float = None, max_stale: float = None):
+    """Fetch data from SportsDB API with caching (TTL from the per-endpoint policy by default)
+    
+    Entries past their TTL but within max_stale are served immediately while a
+    single background request refreshes them (stale-while-revalidate).
+    """
+    cache_key = cache_key or endpoint
+    if cache_duration is None:
+        cache_duration = sportsdb_ttl(endpoint)
+    if max_stale is None:
+        max_stale = sportsdb_max_stale(endpoint)
+    
+    client = http_clients.get("sportsdb")
+    url = f"{SPORTSDB_BASE_URL}/{endpoint}"
+    
+    async def fetch_and_cache():
+        data = await _get_json(client, url, project=endpoint)
+        api_cache.set(cache_key, data, cache_duration, max_stale)
+        return data
+    
+    async def fetched_elsewhere():
+        # A fresh copy another worker stored while we waited for its lock
+        shared = await api_cache.lookup_shared(cache_key, allow_stale=False)
+        return shared[0] if shared else None
+    
+    current_span().set(endpoint=endpoint.split("?", 1)[0])
+    with span("cache.lookup", cache=api_cache.name) as lookup:
+        cached = await api_cache.lookup_shared(cache_key)
+        lookup.set(outcome="miss" if cached is None else "stale" if cached[1] else "hit")
+    if cached is not None:
+        cached_data, stale = cached
+        if stale and not upstream_flights.running(url):
+            refresh = asyncio.ensure_future(upstream_flights.do(url, fetch_and_cache, ready=fetched_elsewhere))
+            refresh.add_done_callback(lambda task: task.cancelled() or task.exception())
+        record_dependency(api_cache.freshness(cache_key))
+        return cached_data
+    
+    try:
+        data = await upstream_flights.do(url, fetch_and_cache, ready=fetched_elsewhere)
+        record_dependency(api_cache.freshness(cache_key))
+        return data
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"SportsDB API error: {str(e)}")
+
+async def warm_team_index():
+    """Fill the team index from the table and schedules of each configured league"""
+    for league_id in TEAM_INDEX_LEAGUES:
+        results = await asyncio.gather(
+            league_table(league_id.strip()),
+            league_next_events(league_id.strip()),
+            league_past_events(league_id.strip()),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("Team index warm-up failed for league %s: %r", league_id, result)
 
 # ========================================
 # ROOT & HEALTH ENDPOINTS
@@ -564,29 +1131,226 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    """Degraded while the Groq breaker is open (predictions fall back) or the shared cache tier is failing"""
+    breaker = groq_gateway.breaker.status()
+    checks = {
+        "groq": {"breaker": breaker, "ok": breaker["state"] != "open"},
+        "event_loop": {
+            "lag_seconds": round(loop_lag_monitor.last_lag, 4),
+            "max_lag_seconds": round(loop_lag_monitor.max_lag, 4),
+            "ok": loop_lag_monitor.last_lag < 0.5,
+        },
+        "fallbacks": fallback_rates(),
+    }
+    if cache_backend is not None:
+        shared = cache_backend.stats()
+        checks["shared_cache"] = {"errors": shared["errors"], "last_error": shared["last_error"],
+                                  "ok": shared["listening"]}
+    healthy = all(check["ok"] for check in checks.values() if "ok" in check)
+    return {
+        "status": "healthy" if healthy else "degraded",
+        "timestamp": datetime.now().isoformat(),
+        "checks": checks,
+    }
+
+cache_hit_ratio = metrics_registry.gauge("ragebet_cache_hit_ratio", "Fresh + stale hits over lookups", ("cache",))
+cache_entries = metrics_registry.gauge("ragebet_cache_entries", "Entries held in the in-process cache", ("cache",))
+cache_bytes = metrics_registry.gauge("ragebet_cache_bytes", "Estimated bytes held in the in-process cache", ("cache",))
+cache_events = metrics_registry.counter("ragebet_cache_events_total", "Cache lookups / writes by outcome",
+                                        ("cache", "event"))
+singleflight_calls = metrics_registry.counter("ragebet_singleflight_calls_total", "Executed vs coalesced calls",
+                                              ("flight", "outcome"))
+breaker_state = metrics_registry.gauge("ragebet_circuit_breaker_state", "0 = closed, 1 = half open, 2 = open",
+                                       ("upstream",))
+gateway_in_flight = metrics_registry.gauge("ragebet_llm_in_flight", "LLM calls in flight", ("upstream",))
+gateway_waiting = metrics_registry.gauge("ragebet_llm_waiting", "LLM calls queued for admission", ("upstream",))
+pin_queue_depth = metrics_registry.gauge("ragebet_ipfs_pin_queue_depth", "Pins waiting for a worker")
+http_not_modified = metrics_registry.counter("ragebet_http_not_modified_total", "304 responses served")
+
+@metrics_registry.collector
+def collect_service_metrics():
+    """Cache, coalescing, breaker and queue gauges / counters from the services' own stats"""
+    for cache in (api_cache, ai_prediction_cache):
+        stats = cache.stats()
+        cache_hit_ratio.set(stats["hit_ratio"], stats["name"])
+        cache_entries.set(stats["entries"], stats["name"])
+        cache_bytes.set(stats["bytes"], stats["name"])
+        for kind in ("hits", "stale_hits", "misses", "evictions", "restored"):
+            cache_events.set_total(stats[kind], stats["name"], kind)
+        for kind, value in (stats.get("l2") or {}).items():
+            if kind in ("hits", "misses", "writes"):
+                cache_events.set_total(value, stats["name"], f"l2_{kind}")
+    for flights in (upstream_flights, prediction_flights):
+        stats = flights.stats()
+        singleflight_calls.set_total(stats["executions"], stats["name"], "executed")
+        singleflight_calls.set_total(stats["coalesced"], stats["name"], "coalesced")
+    gateway = groq_gateway.status()
+    breaker_state.set({"closed": 0, "half_open": 1, "open": 2}[groq_gateway.breaker.state], "groq")
+    gateway_in_flight.set(gateway["in_flight"], "groq")
+    gateway_waiting.set(gateway["waiting"], "groq")
+    pins = pin_queue.stats()
+    pin_queue_depth.set(pins["queue_depth"])
+    responses = response_compressor.stats()
+    http_not_modified.set_total(responses["not_modified"])
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of route, upstream, cache and event loop metrics"""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss/eviction and request-coalescing counters for the in-memory caches"""
+    return {
+        "caches": [api_cache.stats(), ai_prediction_cache.stats()],
+        "singleflight": [upstream_flights.stats(), prediction_flights.stats()],
+        "shared_tier": cache_backend.stats() if cache_backend is not None else None,
+        "team_form": form_engine.stats(),
+        "search_index": search_index.stats(),
+        "snapshot": cache_snapshotter.stats() if CACHE_SNAPSHOT_ENABLED else None,
+        "ratings": rating_engine.stats(),
+        "projections": projection_stats.report(),
+        "responses": response_compressor.stats()
+    }
+
+@app.get("/debug/traces")
+async def recent_traces(limit: int = Query(20, ge=1, le=100)):
+    """Recently finished request traces (needs TRACE_DEBUG=true)"""
+    if not tracer.debug:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"tracer": tracer.stats(), "traces": tracer.recent(limit)}
+
+@app.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Span tree of a recent trace, e.g. the X-Trace-Id of a debug request (needs TRACE_DEBUG=true)"""
+    trace = tracer.find(trace_id) if tracer.debug else None
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
 
 # ========================================
 # SEARCH ENDPOINTS
 # ========================================
 
+# Search index kind -> (SportsDB search script and parameter, list key, cache key prefix)
+SEARCH_SCRIPTS = {
+    "team": ("searchteams.php?t=", "teams", "search_teams_"),
+    "player": ("searchplayers.php?p=", "players", "search_players_"),
+    "venue": ("searchvenues.php?v=", "venues", "search_venues_"),
+}
+
+# Upstream searches started by /api/search/suggest, by (kind, folded query)
+suggest_fetches: Dict[tuple, asyncio.Task] = {}
+
+async def search_sportsdb(kind: str, q: str) -> list:
+    """SportsDB name search for one kind; the results are added to the search (and team) index"""
+    script, key, cache_prefix = SEARCH_SCRIPTS[kind]
+    data = await fetch_sportsdb(f"{script}{q}", f"{cache_prefix}{q}")
+    rows = data.get(key) or []
+    if kind == "team":
+        team_index.add_teams(rows)
+    else:
+        search_index.add(kind, rows)
+    search_index.mark_searched(kind, q, len(rows))
+    return rows
+
+def suggest_fetch(kind: str, q: str) -> asyncio.Task:
+    """The upstream search that will answer q: one in flight for q or a prefix of it, else a new one
+
+    Runs detached from the request (own context, so it is neither cancelled
+    with it nor counted in its cache headers) and fills the index for the
+    keystrokes that follow.
+    """
+    key = fold_text(q)
+    for (fetch_kind, prefix), task in suggest_fetches.items():
+        if fetch_kind == kind and key.startswith(prefix):
+            return task
+    task = asyncio.get_running_loop().create_task(search_sportsdb(kind, q), context=contextvars.Context())
+    suggest_fetches[(kind, key)] = task
+
+    def done(task: asyncio.Task):
+        suggest_fetches.pop((kind, key), None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Suggest search for %s %r failed: %r", kind, q, task.exception())
+
+    task.add_done_callback(done)
+    return task
+
+@app.get("/api/search/suggest")
+async def search_suggest(
+    q: str = Query(..., description="What has been typed so far"),
+    types: Optional[str] = Query(None, description="Comma-separated kinds: team, player, venue (default: all)"),
+    limit: int = Query(8, ge=1, le=25)
+):
+    """Autocomplete suggestions, answered from the local search index
+
+    A query of SEARCH_UPSTREAM_MIN_CHARS or more that the index can't fill
+    and SportsDB hasn't been asked yet starts an upstream search; the answer
+    waits at most SEARCH_UPSTREAM_WAIT seconds for it, and a search still
+    running after that fills the index for the next keystroke. "complete" is
+    false while SportsDB may know matches the suggestions don't include.
+    """
+    kinds = list(SEARCH_KINDS)
+    if types:
+        kinds = [kind.strip() for kind in types.split(",") if kind.strip() in SEARCH_KINDS]
+        if not kinds:
+            raise HTTPException(status_code=400, detail=f"types must name some of: {', '.join(SEARCH_KINDS)}")
+
+    suggestions = search_index.suggest(q, kinds, limit)
+    missing = [kind for kind in kinds if not search_index.covered(kind, q)]
+    if missing and len(suggestions) < limit and len(fold_text(q)) >= SEARCH_UPSTREAM_MIN_CHARS:
+        current_span().set(upstream=",".join(missing))
+        await asyncio.wait([suggest_fetch(kind, q) for kind in missing], timeout=SEARCH_UPSTREAM_WAIT)
+        suggestions = search_index.suggest(q, kinds, limit)
+        missing = [kind for kind in missing if not search_index.covered(kind, q)]
+    return {"query": q, "suggestions": suggestions, "complete": not missing}
+
 @app.get("/api/search/teams")
-async def search_teams(q: str = Query(..., description="Team name to search")):
-    """Search for teams by name"""
-    data = await fetch_sportsdb(f"searchteams.php?t={q}", f"search_teams_{q}")
-    return data.get("teams", [])
+async def search_teams(
+    q: str = Query(..., description="Team name to search"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    """Search for teams by name
+
+    Served from the local team index when SportsDB was already asked for this
+    query (or a prefix of it). Otherwise the index only holds the teams seen
+    so far (an exact name/alias match included: "Arsenal" also finds Arsenal
+    Tula), so SportsDB is searched and its results are merged with the local
+    matches.
+    """
+    local = team_index.search(q)
+    exact = team_index.lookup(q)
+    if exact is not None and exact not in local:
+        local.insert(0, exact)
+    if search_index.covered("team", q):
+        return compact_response(local, fields)
+    # The SportsDB entry's version alone would let a client keep a stale copy of the local matches
+    local_version = team_index.version
+    try:
+        teams = list(await search_sportsdb("team", q))
+    except HTTPException:
+        if not local:
+            raise
+        return compact_response(local, fields)
+    record_version(f"team_index:{local_version}")
+    seen = {team.get("idTeam") for team in teams}
+    teams += [team for team in local if team.get("idTeam") not in seen]
+    return compact_response(teams, fields)
 
 @app.get("/api/search/players")
-async def search_players(q: str = Query(..., description="Player name to search")):
+async def search_players(
+    q: str = Query(..., description="Player name to search"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Search for players by name"""
-    data = await fetch_sportsdb(f"searchplayers.php?p={q}", f"search_players_{q}")
-    return data.get("players", [])
+    return compact_response(await search_sportsdb("player", q), fields)
 
 @app.get("/api/search/events")
 async def search_events(
     q: str = Query(..., description="Event name"),
     season: Optional[str] = None,
-    date: Optional[str] = None
+    date: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
 ):
     """Search for events/matches"""
     endpoint = f"searchevents.php?e={q}"
@@ -595,54 +1359,88 @@ async def search_events(
     if date:
         endpoint += f"&d={date}"
     data = await fetch_sportsdb(endpoint)
-    return data.get("events", [])
+    return compact_response(data.get("events") or [], fields)
 
 @app.get("/api/search/venues")
-async def search_venues(q: str = Query(..., description="Venue name")):
+async def search_venues(
+    q: str = Query(..., description="Venue name"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Search for venues/stadiums"""
-    data = await fetch_sportsdb(f"searchvenues.php?v={q}", f"search_venues_{q}")
-    return data.get("venues", [])
+    return compact_response(await search_sportsdb("venue", q), fields)
 
 # ========================================
 # LOOKUP ENDPOINTS
 # ========================================
 
 @app.get("/api/lookup/team/{team_id}")
-async def lookup_team(team_id: str):
+async def lookup_team(
+    team_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Get detailed team information"""
     data = await fetch_sportsdb(f"lookupteam.php?id={team_id}", f"team_{team_id}")
-    teams = data.get("teams", [])
-    return teams[0] if teams else None
+    teams = data.get("teams") or []
+    return compact_response(teams[0] if teams else None, fields)
 
 @app.get("/api/lookup/player/{player_id}")
-async def lookup_player(player_id: str):
+async def lookup_player(
+    player_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Get detailed player information"""
     data = await fetch_sportsdb(f"lookupplayer.php?id={player_id}", f"player_{player_id}")
-    players = data.get("players", [])
-    return players[0] if players else None
+    players = data.get("players") or []
+    return compact_response(players[0] if players else None, fields)
 
-@app.get("/api/lookup/event/{event_id}")
-async def lookup_event(event_id: str):
-    """Get detailed event/match information"""
+async def event_details(event_id: str):
+    """A single event (None if SportsDB doesn't know it)"""
     data = await fetch_sportsdb(f"lookupevent.php?id={event_id}", f"event_{event_id}")
-    events = data.get("events", [])
+    events = data.get("events") or []
+    form_engine.ingest_events(events)
+    rating_engine.ingest_events(events)
     return events[0] if events else None
 
+@app.get("/api/lookup/event/{event_id}")
+async def lookup_event(
+    event_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    """Get detailed event/match information"""
+    return compact_response(await event_details(event_id), fields)
+
 @app.get("/api/lookup/league/{league_id}")
-async def lookup_league(league_id: str):
+async def lookup_league(
+    league_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Get league information"""
     data = await fetch_sportsdb(f"lookupleague.php?id={league_id}", f"league_{league_id}")
-    leagues = data.get("leagues", [])
-    return leagues[0] if leagues else None
+    leagues = data.get("leagues") or []
+    return compact_response(leagues[0] if leagues else None, fields)
 
-@app.get("/api/lookup/table/{league_id}")
-async def lookup_table(league_id: str, season: Optional[str] = None):
-    """Get league table/standings"""
+async def league_table(league_id: str, season: Optional[str] = None):
+    """A league's standings, also fed to the team index and (current season) the ratings"""
     endpoint = f"lookuptable.php?l={league_id}"
     if season:
         endpoint += f"&s={season}"
     data = await fetch_sportsdb(endpoint, f"table_{league_id}_{season}")
-    return data.get("table", [])
+    table = data.get("table") or []
+    team_index.add_teams(
+        dict(row, idLeague=row.get("idLeague") or league_id) for row in table
+    )
+    if not season:
+        rating_engine.ingest_table(league_id, table)
+    return table
+
+@app.get("/api/lookup/table/{league_id}")
+async def lookup_table(
+    league_id: str,
+    season: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
+    """Get league table/standings"""
+    return compact_response(await league_table(league_id, season), fields)
 
 @app.get("/api/lookup/stats/{event_id}")
 async def lookup_event_stats(event_id: str):
@@ -684,35 +1482,62 @@ async def lookup_contracts(player_id: str):
 # SCHEDULE ENDPOINTS
 # ========================================
 
+async def league_next_events(league_id: str):
+    """Upcoming events of a league"""
+    data = await fetch_sportsdb(f"eventsnextleague.php?id={league_id}", f"next_league_{league_id}")
+    events = data.get("events") or []
+    team_index.add_events(events)
+    rating_engine.ingest_events(events, league_id)
+    return events
+
 @app.get("/api/schedule/next-league/{league_id}")
-async def next_league_events(league_id: str):
+async def next_league_events(
+    league_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Get upcoming events for a league"""
-    data = await fetch_sportsdb(f"eventsnextleague.php?id={league_id}", f"next_league_{league_id}", 60)
-    return data.get("events", [])
+    return compact_response(await league_next_events(league_id), fields)
+
+async def league_past_events(league_id: str):
+    """Recent results of a league"""
+    data = await fetch_sportsdb(f"eventspastleague.php?id={league_id}", f"past_league_{league_id}")
+    events = data.get("events") or []
+    team_index.add_events(events)
+    form_engine.ingest_events(events)
+    rating_engine.ingest_events(events, league_id)
+    return events
 
 @app.get("/api/schedule/past-league/{league_id}")
-async def past_league_events(league_id: str):
+async def past_league_events(
+    league_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Get past events for a league"""
-    data = await fetch_sportsdb(f"eventspastleague.php?id={league_id}", f"past_league_{league_id}", 60)
-    return data.get("events", [])
+    return compact_response(await league_past_events(league_id), fields)
 
 @app.get("/api/schedule/next-team/{team_id}")
-async def next_team_events(team_id: str):
+async def next_team_events(
+    team_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Get upcoming events for a team"""
-    data = await fetch_sportsdb(f"eventsnext.php?id={team_id}", f"next_team_{team_id}", 60)
-    return data.get("events", [])
+    data = await fetch_sportsdb(f"eventsnext.php?id={team_id}", f"next_team_{team_id}")
+    return compact_response(data.get("events") or [], fields)
 
 @app.get("/api/schedule/last-team/{team_id}")
-async def last_team_events(team_id: str):
+async def last_team_events(
+    team_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
+):
     """Get recent events for a team"""
-    data = await fetch_sportsdb(f"eventslast.php?id={team_id}", f"last_team_{team_id}", 60)
-    return data.get("results", [])
+    return compact_response(await load_team_form(team_id), fields)
 
 @app.get("/api/schedule/by-date/{date}")
 async def events_by_date(
     date: str,
     sport: Optional[str] = Query(None, description="Sport filter"),
-    league: Optional[str] = Query(None, description="League filter")
+    league: Optional[str] = Query(None, description="League filter"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return")
 ):
     """Get all events on a specific date"""
     endpoint = f"eventsday.php?d={date}"
@@ -721,7 +1546,7 @@ async def events_by_date(
     if league:
         endpoint += f"&l={league}"
     data = await fetch_sportsdb(endpoint)
-    return data.get("events", [])
+    return compact_response(data.get("events") or [], fields)
 
 # ========================================
 # PREDICTION & BETTING ENDPOINTS
@@ -731,9 +1556,11 @@ async def events_by_date(
 async def generate_trash_talk_endpoint(match_data: MatchData) -> TrashTalkResponse:
     """Generate AI trash talk for a match"""
     
-    # Fetch team statistics
-    team1_stats = await fetch_team_stats(match_data.team1)
-    team2_stats = await fetch_team_stats(match_data.team2)
+    # Fetch team statistics (both teams in parallel)
+    team1_stats, team2_stats = await asyncio.gather(
+        fetch_team_stats(match_data.team1),
+        fetch_team_stats(match_data.team2)
+    )
     
     # Generate trash talk
     trash_talk = generate_trash_talk(
@@ -762,9 +1589,9 @@ async def generate_trash_talk_endpoint(match_data: MatchData) -> TrashTalkRespon
 
 @app.get("/api/match/{match_id}")
 async def get_match_result(match_id: str) -> MatchResult:
-    """Get match result from SportsDB"""
+    """Get match result from SportsDB (from the live watcher when the match is being watched)"""
     
-    match_data = await fetch_match_data(match_id)
+    match_data = match_watcher.latest(match_id) or await fetch_match_data(match_id)
     
     return MatchResult(
         match_id=match_id,
@@ -776,6 +1603,79 @@ async def get_match_result(match_id: str) -> MatchResult:
         date=match_data.get("dateEvent", "")
     )
 
+@app.websocket("/ws/match/{match_id}")
+async def match_updates_socket(websocket: WebSocket, match_id: str):
+    """
+    Push score / status changes for a match. Sends a "snapshot" first, then an
+    "update" (with the changed fields) whenever they change and a "final" once
+    the match is over ("not_found" if SportsDB doesn't know it). All viewers
+    of a match share one upstream poller.
+    """
+    await websocket.accept()
+    queue = match_watcher.subscribe(match_id)
+    
+    async def forward():
+        while True:
+            await websocket.send_json(await queue.get())
+    
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        match_watcher.unsubscribe(match_id, queue)
+        (outcome,) = await asyncio.gather(sender, return_exceptions=True)
+        if isinstance(outcome, Exception) and not isinstance(outcome, WebSocketDisconnect):
+            logger.error("Match socket sender for %s failed", match_id, exc_info=outcome)
+
+@app.get("/api/live/status")
+async def live_watcher_status():
+    """Matches being watched, their subscribers and next poll times"""
+    return match_watcher.status()
+
+@app.get("/api/odds/{event_id}")
+async def get_match_odds(event_id: str):
+    """Win/draw/loss probabilities and fair decimal odds from the rating model"""
+    event = await event_details(event_id)
+    if not event:
+        raise HTTPException(status_code=404, detail="Match not found")
+    
+    probabilities = rating_engine.predict(event.get("idHomeTeam"), event.get("idAwayTeam"))
+    if probabilities is None:
+        # Ratings for this league haven't been built yet: fetch its table and results once
+        league_id = event.get("idLeague")
+        if league_id:
+            await asyncio.gather(league_table(league_id), league_past_events(league_id), return_exceptions=True)
+            probabilities = rating_engine.predict(event.get("idHomeTeam"), event.get("idAwayTeam"))
+    if probabilities is None:
+        raise HTTPException(status_code=404, detail="No ratings available for this match")
+    
+    def fair_odds(probability: float) -> Optional[float]:
+        return round(1 / probability, 2) if probability > 0 else None
+    
+    return {
+        "match_id": event_id,
+        "home_team": event.get("strHomeTeam"),
+        "away_team": event.get("strAwayTeam"),
+        "probabilities": probabilities,
+        "odds": {
+            "home": fair_odds(probabilities["home_win"]),
+            "draw": fair_odds(probabilities["draw"]),
+            "away": fair_odds(probabilities["away_win"]),
+            "over_2_5": fair_odds(probabilities["over_2_5"]),
+        }
+    }
+
+@app.get("/api/ratings/{league_id}")
+async def get_league_ratings(league_id: str):
+    """Elo and attack/defence ratings for a league's teams"""
+    return rating_engine.standings(league_id)
+
 @app.get("/api/upcoming/{league_id}")
 async def get_upcoming_matches(league_id: str):
     """Get upcoming matches for a league"""
@@ -799,34 +1699,25 @@ async def get_upcoming_matches(league_id: str):
     }
 
 @app.post("/ai/generate-prediction")
-async def generate_prediction_endpoint(match_id: str = Query(..., description="Match ID to generate prediction for")):
+async def generate_prediction_endpoint(
+    match_id: str = Query(..., description="Match ID to generate prediction for"),
+    regenerate: bool = Query(False, description="Generate a new prediction even if one is stored")
+):
     """
     Generate AI prediction and roasts for a match
     """
+    if regenerate:
+        await check_regenerate(match_id)
+    
     try:
-        # Check cache first
-        if match_id in ai_prediction_cache:
-            cached_prediction, cached_time = ai_prediction_cache[match_id]
-            # Cache for 6 hours
-            if datetime.now() - cached_time < timedelta(hours=6):
+        # Check cache / prediction store first
+        if not regenerate:
+            cached_prediction = load_prediction(match_id)
+            if cached_prediction is not None:
                 return {"prediction": cached_prediction, "cached": True}
         
-        # Fetch match data
-        match_data = await fetch_match_data(match_id)
-        
-        if not match_data:
-            raise HTTPException(status_code=404, detail="Match not found")
-        
-        # Generate AI prediction and roasts
-        prediction = await generate_ai_prediction_and_roast(match_data)
-        
-        # Cache the prediction
-        ai_prediction_cache[match_id] = (prediction, datetime.now())
-        
-        # Upload to IPFS
-        ipfs_hash = await upload_to_ipfs(prediction.dict())
-        if ipfs_hash:
-            prediction.ipfs_hash = ipfs_hash
+        # Generate, or join a generation already running for this match
+        prediction = await create_prediction_once(match_id)
         
         return {
             "success": True,
@@ -837,20 +1728,110 @@ async def generate_prediction_endpoint(match_id: str = Query(..., description="M
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating prediction: {str(e)}")
 
+@app.post("/ai/generate-predictions")
+async def generate_predictions_batch_endpoint(request: BatchPredictionRequest):
+    """
+    Generate AI predictions for several matches in one request
+    
+    With `stream: true` results are sent as newline-delimited JSON in
+    completion order; otherwise they are returned together in request order.
+    """
+    match_ids = list(dict.fromkeys(request.match_ids))
+    if not match_ids:
+        raise HTTPException(status_code=400, detail="match_ids must not be empty")
+    if len(match_ids) > BATCH_PREDICTION_MAX_MATCHES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_PREDICTION_MAX_MATCHES} matches per batch"
+        )
+    
+    results = generate_predictions_batch(match_ids, request.regenerate)
+    
+    if request.stream:
+        async def ndjson():
+            async for result in results:
+                if result.get("prediction") is not None:
+                    result = dict(result, prediction=result["prediction"].dict())
+                yield json.dumps(result, default=str) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    by_match = {result["match_id"]: result async for result in results}
+    return {
+        "success": True,
+        "count": len(match_ids),
+        "results": [by_match[match_id] for match_id in match_ids]
+    }
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.get("/ai/generate-prediction/stream")
+async def stream_prediction_endpoint(
+    match_id: str = Query(..., description="Match ID to generate prediction for"),
+    regenerate: bool = Query(False, description="Generate a new prediction even if one is stored")
+):
+    """
+    Stream AI prediction generation as Server-Sent Events
+    
+    Emits `status` (pipeline stage), `token` (raw Groq output), `field` (each
+    JSON field as soon as it is complete) and finally `prediction` with the
+    validated AIPrediction, or `error`.
+    """
+    if regenerate:
+        await check_regenerate(match_id)
+    
+    async def event_stream():
+        if not regenerate:
+            cached_prediction = load_prediction(match_id)
+            if cached_prediction is not None:
+                yield sse_event("prediction", {"prediction": cached_prediction.dict(), "cached": True})
+                return
+        
+        events: asyncio.Queue = asyncio.Queue()
+        # Runs as the match's single-flight generation: if one is already in
+        # progress (in any worker) we just wait for its result. It keeps running
+        # (and stores the prediction) even if this client disconnects.
+        generation = asyncio.ensure_future(prediction_flights.do(
+            match_id,
+            lambda: stream_prediction(match_id, lambda event, data: events.put_nowait((event, data))),
+            ready=generated_elsewhere(match_id)
+        ))
+        generation.add_done_callback(lambda task: task.cancelled() or task.exception())
+        
+        while not generation.done():
+            next_event = asyncio.ensure_future(events.get())
+            await asyncio.wait({next_event, generation}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield sse_event(*next_event.result())
+            else:
+                next_event.cancel()
+        while not events.empty():
+            yield sse_event(*events.get_nowait())
+        
+        try:
+            prediction = generation.result()
+            yield sse_event("prediction", {"prediction": prediction.dict(), "cached": False})
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield sse_event("error", {"detail": f"Error generating prediction: {detail}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/ai/predictions/{match_id}")
 async def get_prediction(match_id: str):
     """
     Get AI prediction for a specific match
     """
     try:
-        # In a real app, this would fetch from database
-        # For now, we'll generate on-demand
-        match_data = await fetch_match_data(match_id)
-        
-        if not match_data:
-            raise HTTPException(status_code=404, detail="Match not found")
-        
-        prediction = await generate_ai_prediction_and_roast(match_data)
+        # Served from the prediction store; only generated if none exists yet
+        prediction = load_prediction(match_id)
+        if prediction is None:
+            prediction = await create_prediction_once(match_id)
         
         return {
             "success": True,
@@ -860,6 +1841,44 @@ async def get_prediction(match_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching prediction: {str(e)}")
 
+@app.get("/ai/gateway/status")
+async def llm_gateway_status():
+    """
+    Queue wait times, rejections and circuit breaker state of the Groq gateway
+    """
+    return {"success": True, "gateway": groq_gateway.status()}
+
+@app.get("/ipfs/status")
+async def ipfs_pin_queue_status():
+    """Queue depth, dedup and retry counters of the background IPFS pinning queue"""
+    return {"success": True, "pin_queue": pin_queue.stats()}
+
+@app.get("/ipfs/pins/{cid}")
+async def ipfs_pin_status(cid: str):
+    """Pin status of a CID returned by the API (queued, pinning, pinned or failed)"""
+    pin = pin_queue.status(cid)
+    if pin is None:
+        raise HTTPException(status_code=404, detail="Unknown CID")
+    return pin
+
+@app.get("/ai/scheduler/status")
+async def prediction_scheduler_status():
+    """
+    Queue depth, throughput and failures of the prediction pre-generation scheduler
+    """
+    return {"success": True, "scheduler": prediction_scheduler.status()}
+
+@app.get("/ai/predictions/{match_id}/history")
+async def get_prediction_history(match_id: str):
+    """
+    Get every stored generation of the AI prediction for a match
+    """
+    return {
+        "success": True,
+        "match_id": match_id,
+        "generations": prediction_store.history(match_id)
+    }
+
 @app.post("/nft/generate-metadata")
 async def generate_nft_metadata(
     match_id: str,
@@ -916,46 +1935,54 @@ async def generate_nft_metadata(
 @app.post("/community/vote-roast")
 async def vote_for_roast(vote: CommunityVote):
     """
-    Vote for the funniest AI roast
+    Vote for the funniest AI roast (one vote per voter per roast, weighted by vote_weight)
     """
+    if vote.vote_weight <= 0:
+        raise HTTPException(status_code=400, detail="vote_weight must be positive")
+    
     try:
-        # In a real app, this would store in database
-        # For now, we'll just return success
+        tally = vote_store.add(
+            vote.match_id, vote.roast_id, vote.voter_address, vote.vote_weight, vote.timestamp
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recording vote: {str(e)}")
+    
+    if tally is None:
         return {
-            "success": True,
+            "success": False,
+            "duplicate": True,
             "vote": vote,
-            "message": "Vote recorded successfully"
+            "message": "This address already voted for this roast"
         }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error recording vote: {str(e)}")
+    
+    return {
+        "success": True,
+        "vote": vote,
+        "tally": tally,
+        "message": "Vote recorded successfully"
+    }
 
 @app.get("/community/roast-leaderboard")
-async def get_roast_leaderboard():
+async def get_roast_leaderboard(
+    limit: int = Query(10, ge=1, le=100, description="Roasts per page"),
+    offset: int = Query(0, ge=0, description="Rank offset"),
+    match_id: Optional[str] = Query(None, description="Only roasts of this match")
+):
     """
     Get leaderboard of funniest roasts
     """
     try:
-        # In a real app, this would fetch from database
-        # For now, we'll return mock data
+        total, rows = vote_store.leaderboard(limit, offset, match_id)
+        for row in rows:
+            prediction = load_prediction(row["match_id"])
+            row["roast"] = prediction.ai_roast_loser if prediction else None
+        
         return {
             "success": True,
-            "leaderboard": [
-                {
-                    "roast_id": "roast_1",
-                    "match_id": "2267156",
-                    "roast": "United's midfield is slower than my grandma's Wi-Fi!",
-                    "votes": 150,
-                    "rank": 1
-                },
-                {
-                    "roast_id": "roast_2", 
-                    "match_id": "2267157",
-                    "roast": "Liverpool's defense has more holes than Swiss cheese!",
-                    "votes": 120,
-                    "rank": 2
-                }
-            ],
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "leaderboard": rows,
             "message": "Roast leaderboard retrieved successfully"
         }
         
@@ -967,81 +1994,57 @@ async def resolve_market_oracle(resolution: MarketResolution):
     """
     Resolve a prediction market using Web2 oracle logic
     This replaces the Chainlink oracle functionality
+    
+    The market is tracked either way; if its match isn't over yet the
+    resolution worker settles it once it is.
     """
     try:
-        # Resolve the match result
-        match_result = await resolve_match_result(resolution.match_id)
-        
-        # Update the resolution with actual data
-        resolution.ai_was_right = match_result.ai_was_right
-        resolution.home_score = match_result.home_score
-        resolution.away_score = match_result.away_score
-        resolution.status = match_result.status
-        
-        return {
-            "success": True,
-            "market_id": resolution.market_id,
-            "match_id": resolution.match_id,
-            "ai_was_right": resolution.ai_was_right,
-            "home_score": resolution.home_score,
-            "away_score": resolution.away_score,
-            "status": resolution.status,
-            "message": "Market resolved successfully"
-        }
-        
+        record = await resolution_worker.resolve_now(resolution.market_id, resolution.match_id)
+    except MarketConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error resolving market: {str(e)}")
+    
+    if record is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Match not finished yet; the market will be resolved when it is"
+        )
+    
+    return {
+        "success": True,
+        "market_id": record["market_id"],
+        "match_id": record["match_id"],
+        "ai_was_right": record["ai_was_right"],
+        "home_score": record["home_score"],
+        "away_score": record["away_score"],
+        "status": record["status"],
+        "result": record["result"],
+        "reason": record["reason"],
+        "message": "Market resolved successfully"
+    }
 
-async def resolve_match_result(match_id: str) -> MarketResolution:
-    """Resolve match result and determine if AI was right"""
+@app.post("/oracle/markets")
+async def track_market(market: MarketRegistration):
+    """Track an open market so the resolution worker settles it when its match ends"""
     try:
-        # Fetch match data
-        match_data = await fetch_match_data(match_id)
-        
-        if not match_data:
-            raise HTTPException(status_code=404, detail="Match not found")
-        
-        # Extract match information
-        home_team = match_data.get("strHomeTeam", "Unknown Team")
-        away_team = match_data.get("strAwayTeam", "Unknown Team")
-        home_score = match_data.get("intHomeScore")
-        away_score = match_data.get("intAwayScore")
-        status = match_data.get("strStatus", "Unknown")
-        
-        # Determine if match is finished
-        if status != "Match Finished" or home_score is None or away_score is None:
-            return MarketResolution(
-                market_id=0,  # Will be set by caller
-                match_id=match_id,
-                ai_was_right=False,
-                home_score=home_score,
-                away_score=away_score,
-                status=status
-            )
-        
-        # Simple AI prediction logic (in real app, this would be more sophisticated)
-        # For now, we'll use a simple heuristic: home team advantage + random factor
-        home_advantage = 0.1  # 10% home advantage
-        random_factor = random.uniform(-0.3, 0.3)  # Random factor
-        
-        # Predict home team win if home_score > away_score
-        predicted_home_win = home_score > away_score
-        actual_home_win = home_score > away_score
-        
-        # AI was right if prediction matches actual result
-        ai_was_right = predicted_home_win == actual_home_win
-        
-        return MarketResolution(
-            market_id=0,  # Will be set by caller
-            match_id=match_id,
-            ai_was_right=ai_was_right,
-            home_score=home_score,
-            away_score=away_score,
-            status=status
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error resolving match: {str(e)}")
+        existing = resolution_worker.track(market.market_id, market.match_id)
+    except MarketConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"success": True, "market": resolution_store.market(market.market_id), "resolution": existing}
+
+@app.get("/oracle/resolutions/{market_id}")
+async def get_market_resolution(market_id: int):
+    """Resolution record of a market (or its tracking state while it is open)"""
+    market = resolution_store.market(market_id)
+    if market is None:
+        raise HTTPException(status_code=404, detail="Market not tracked")
+    return {"market": market, "resolution": resolution_store.get(market_id)}
+
+@app.get("/oracle/status")
+async def resolution_worker_status():
+    """Open / resolved market counts and resolution worker activity"""
+    return {"success": True, "worker": resolution_worker.status()}
 
 @app.post("/chainlink")
 async def chainlink_adapter(request: dict):
@@ -1061,25 +2064,27 @@ async def chainlink_adapter(request: dict):
                 "statusCode": 500
             }
         
-        # Fetch match data
-        match_data = await fetch_match_data(match_id)
-        
-        # Extract scores
-        home_score = int(match_data.get("intHomeScore") or 0)
-        away_score = int(match_data.get("intAwayScore") or 0)
-        status = match_data.get("strStatus", "")
+        # With a marketId the market is tracked and resolved idempotently;
+        # otherwise the match is judged against the AI prediction stored before kickoff
+        market_id = request.get("data", {}).get("marketId")
+        if market_id is not None:
+            record = await resolution_worker.resolve_now(int(market_id), match_id)
+        else:
+            match_data = await fetch_match_data(match_id)
+            record = build_resolution(0, match_id, match_data, prediction_at_kickoff(match_id, match_data))
         
         # Check if match is finished
-        if status not in ["Match Finished", "FT"]:
+        if record is None:
             return {
                 "jobRunID": request.get("id"),
                 "error": "Match not finished yet",
                 "statusCode": 400
             }
         
-        # Determine result (home win for AI prediction)
-        # This is simplified - in production, compare with actual AI prediction
-        ai_was_right = home_score > away_score
+        ai_was_right = record["ai_was_right"]
+        home_score = record["home_score"]
+        away_score = record["away_score"]
+        status = record["status"]
         
         return {
             "jobRunID": request.get("id"),
@@ -1087,12 +2092,19 @@ async def chainlink_adapter(request: dict):
                 "aiWasRight": ai_was_right,
                 "homeScore": home_score,
                 "awayScore": away_score,
-                "status": status
+                "status": status,
+                "resolution": record["result"]
             },
             "result": ai_was_right,
             "statusCode": 200
         }
         
+    except MarketConflict as e:
+        return {
+            "jobRunID": request.get("id"),
+            "error": str(e),
+            "statusCode": 409
+        }
     except Exception as e:
         return {
             "jobRunID": request.get("id"),
@@ -0,0 +1,390 @@
+"""
+Prediction market resolution.
+
+Open market/match pairs are tracked in a SQLite store. A background worker
+polls their matches in batches (one lookup per distinct match, however many
+markets reference it). Once a match is over, each of its markets gets a
+resolution record comparing the final result with the AI prediction that
+stood at kickoff (get_prediction is handed the event, so a generation stored
+after kickoff never settles a market). Records are written once per market,
+so repeated resolve calls and worker passes return the same answer. Lookups
+that fail are retried with exponential backoff; the markets of a match
+SportsDB doesn't know (fetch_event returns None) are voided after max_missing
+lookups.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from match_watcher import CANCELLED_STATUSES
+from team_form import FINISHED_STATUSES, parse_score
+from team_index import fold_text, normalize_team_name
+
+logger = logging.getLogger(__name__)
+
+HOME = "home"
+AWAY = "away"
+DRAW = "draw"
+
+# On folded prediction text: "<team> wins" / "<team> to win", or a call of a
+# draw ("Draw", "It's a draw") - a draw mentioned further on doesn't count
+_WINNER = re.compile(r"^(?P<team>.+?) (?:wins?|to win|will win)\b")
+_DRAW = re.compile(r"^(?:it s |it is |it will be |it ends in |ends in )?(?:a )?draw\b")
+_HOME_NAMES = {"home", "home team", "the home team"}
+_AWAY_NAMES = {"away", "away team", "the away team"}
+
+
+class MarketConflict(ValueError):
+    """A market is already tracked against a different match"""
+
+
+def actual_outcome(home_score: int, away_score: int) -> str:
+    if home_score > away_score:
+        return HOME
+    if home_score < away_score:
+        return AWAY
+    return DRAW
+
+
+def predicted_outcome(prediction: Dict) -> Optional[str]:
+    """The outcome an AI prediction text calls ("Home Team wins", "Arsenal wins", "DRAW"), or None
+
+    The winner must be named as a whole: "Home Team" / "Away Team" or the
+    stored team name (so "Arsenal Tula wins" is not a call for Arsenal).
+    """
+    text = fold_text(prediction.get("ai_prediction") or "")
+    winner = _WINNER.match(text)
+    if winner is None:
+        return DRAW if _DRAW.match(text) else None
+    team = winner.group("team")
+    named = normalize_team_name(team)
+    home = team in _HOME_NAMES or named == normalize_team_name(prediction.get("home_team") or "")
+    away = team in _AWAY_NAMES or named == normalize_team_name(prediction.get("away_team") or "")
+    if home != away:
+        return HOME if home else AWAY
+    return None
+
+
+def void_resolution(market_id: int, match_id: str, reason: str) -> Dict:
+    """Resolution record for a market that can't be settled against its match"""
+    return {
+        "market_id": market_id,
+        "match_id": match_id,
+        "status": "",
+        "home_score": None,
+        "away_score": None,
+        "actual_outcome": None,
+        "predicted_outcome": None,
+        "prediction_generation": None,
+        "ai_was_right": False,
+        "result": "void",
+        "reason": reason,
+    }
+
+
+def build_resolution(market_id: int, match_id: str, event: Dict, prediction: Optional[Dict]) -> Optional[Dict]:
+    """Resolution record for a market, or None while the match isn't over"""
+    status = event.get("strStatus") or ""
+    home_score = parse_score(event.get("intHomeScore"))
+    away_score = parse_score(event.get("intAwayScore"))
+    record = {
+        "market_id": market_id,
+        "match_id": match_id,
+        "status": status,
+        "home_score": home_score,
+        "away_score": away_score,
+        "actual_outcome": None,
+        "predicted_outcome": None,
+        "prediction_generation": (prediction or {}).get("generation"),
+        "ai_was_right": False,
+        "result": "void",
+        "reason": None,
+    }
+    if status in CANCELLED_STATUSES:
+        record["reason"] = f"Match {status.lower()}"
+        return record
+    if status not in FINISHED_STATUSES or home_score is None or away_score is None:
+        return None
+
+    record["actual_outcome"] = actual_outcome(home_score, away_score)
+    if prediction is None:
+        record["reason"] = "No stored AI prediction for this match"
+        return record
+    record["predicted_outcome"] = predicted_outcome(prediction)
+    if record["predicted_outcome"] is None:
+        record["reason"] = "AI prediction does not name an outcome"
+        return record
+    record["ai_was_right"] = record["predicted_outcome"] == record["actual_outcome"]
+    record["result"] = "settled"
+    return record
+
+
+class ResolutionStore:
+    """SQLite store of tracked markets and their (write-once) resolutions"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        if self._db is not None:
+            return
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS markets (
+                market_id INTEGER PRIMARY KEY,
+                match_id TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS markets_due ON markets (state, next_attempt_at)")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS resolutions (
+                market_id INTEGER PRIMARY KEY,
+                match_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            )"""
+        )
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.open()
+        return self._db
+
+    def track(self, market_id: int, match_id: str):
+        db = self._conn()
+        with db:
+            db.execute(
+                "INSERT OR IGNORE INTO markets (market_id, match_id, state, next_attempt_at, created_at) "
+                "VALUES (?, ?, 'open', 0, ?)",
+                (market_id, match_id, time.time())
+            )
+
+    def due(self, now: float, limit: int) -> List[Tuple[int, str, int]]:
+        """(market_id, match_id, attempts) of open markets whose next attempt is due"""
+        return self._conn().execute(
+            "SELECT market_id, match_id, attempts FROM markets "
+            "WHERE state = 'open' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+            (now, limit)
+        ).fetchall()
+
+    def reschedule(self, market_ids: List[int], next_attempt_at: float, error: Optional[str] = None):
+        db = self._conn()
+        with db:
+            db.executemany(
+                "UPDATE markets SET next_attempt_at = ?, last_error = ?, "
+                "attempts = attempts + ? WHERE market_id = ?",
+                [(next_attempt_at, error, 1 if error else 0, market_id) for market_id in market_ids]
+            )
+
+    def record(self, resolutions: List[Dict]) -> List[Dict]:
+        """Store resolutions and close their markets; an existing resolution is never replaced"""
+        db = self._conn()
+        now = time.time()
+        with db:
+            db.executemany(
+                "INSERT OR IGNORE INTO resolutions (market_id, match_id, data, resolved_at) VALUES (?, ?, ?, ?)",
+                [(r["market_id"], r["match_id"], json.dumps(dict(r, resolved_at=now)), now) for r in resolutions]
+            )
+            db.executemany(
+                "UPDATE markets SET state = 'resolved', last_error = NULL WHERE market_id = ?",
+                [(r["market_id"],) for r in resolutions]
+            )
+        return [self.get(r["market_id"]) for r in resolutions]
+
+    def get(self, market_id: int) -> Optional[Dict]:
+        row = self._conn().execute("SELECT data FROM resolutions WHERE market_id = ?", (market_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def market(self, market_id: int) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT match_id, state, attempts, next_attempt_at, last_error FROM markets WHERE market_id = ?",
+            (market_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "market_id": market_id,
+            "match_id": row[0],
+            "state": row[1],
+            "attempts": row[2],
+            "next_attempt_at": row[3],
+            "last_error": row[4],
+        }
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT state, COUNT(*) FROM markets GROUP BY state").fetchall()
+        return dict(rows)
+
+
+class ResolutionWorker:
+    """Batch-polls the matches of open markets and records their resolutions"""
+
+    def __init__(
+        self,
+        store: ResolutionStore,
+        fetch_event: Callable[[str], Awaitable[Optional[Dict]]],
+        get_prediction: Callable[[str, Dict], Optional[Dict]],
+        poll_interval: float = 300,
+        max_missing: int = 5,
+        concurrency: int = 4,
+        batch_size: int = 200,
+        backoff_base: float = 60,
+        max_backoff: float = 3600,
+    ):
+        self.store = store
+        self.fetch_event = fetch_event
+        self.get_prediction = get_prediction
+        self.poll_interval = poll_interval
+        self.max_missing = max_missing
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+
+        self._task: Optional[asyncio.Task] = None
+        self._recent_failures: deque = deque(maxlen=20)
+        self.passes = 0
+        self.matches_polled = 0
+        self.resolved = 0
+        self.voided = 0
+        self.errors = 0
+        self.last_pass: Optional[float] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Resolution pass failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def track(self, market_id: int, match_id: str) -> Optional[Dict]:
+        """Start tracking a market; returns its resolution if it already has one
+
+        Raises MarketConflict if the market is already tracked for another match.
+        """
+        self.store.track(market_id, match_id)
+        tracked = self.store.market(market_id)["match_id"]
+        if tracked != match_id:
+            raise MarketConflict(f"Market {market_id} is tracked for match {tracked}, not {match_id}")
+        return self.store.get(market_id)
+
+    async def resolve_now(self, market_id: int, match_id: str) -> Optional[Dict]:
+        """Resolve one market immediately if its match is over (None if it isn't yet)"""
+        existing = self.track(market_id, match_id)
+        if existing is not None:
+            return existing
+        tracked = self.store.market(market_id)
+        records = await self._poll_match(tracked["match_id"], [(market_id, tracked["attempts"])])
+        return records[0] if records else None
+
+    async def run_once(self) -> int:
+        """Poll every match with due markets once; returns the number of markets resolved"""
+        due = self.store.due(time.time(), self.batch_size)
+        by_match: Dict[str, List[Tuple[int, int]]] = {}
+        for market_id, match_id, attempts in due:
+            by_match.setdefault(match_id, []).append((market_id, attempts))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll(match_id: str, markets: List[Tuple[int, int]]) -> List[Dict]:
+            async with semaphore:
+                return await self._poll_match(match_id, markets)
+
+        results = await asyncio.gather(*(poll(m, markets) for m, markets in by_match.items()))
+        self.passes += 1
+        self.last_pass = time.time()
+        return sum(len(records) for records in results)
+
+    async def _poll_match(self, match_id: str, markets: List[Tuple[int, int]]) -> List[Dict]:
+        market_ids = [market_id for market_id, _ in markets]
+        self.matches_polled += 1
+        try:
+            event = await self.fetch_event(match_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.errors += 1
+            self._recent_failures.append({"match_id": match_id, "error": repr(e), "at": time.time()})
+            # Back off per market from its own attempt count
+            for market_id, attempts in markets:
+                delay = min(self.backoff_base * 2 ** attempts, self.max_backoff)
+                self.store.reschedule([market_id], time.time() + delay, repr(e))
+            return []
+
+        if event is None:
+            return self._missing(match_id, markets)
+
+        prediction = self.get_prediction(match_id, event)
+        resolutions = [build_resolution(market_id, match_id, event, prediction) for market_id in market_ids]
+        if resolutions[0] is None:
+            # Not over yet: look again next pass
+            self.store.reschedule(market_ids, time.time() + self.poll_interval)
+            return []
+        records = self.store.record(resolutions)
+        self.resolved += len(records)
+        return records
+
+    def _missing(self, match_id: str, markets: List[Tuple[int, int]]) -> List[Dict]:
+        """SportsDB doesn't know the match: void the markets out of lookups, back off the rest"""
+        self._recent_failures.append({"match_id": match_id, "error": "Match not found", "at": time.time()})
+        voided = []
+        for market_id, attempts in markets:
+            if attempts + 1 >= self.max_missing:
+                voided.append(void_resolution(market_id, match_id, f"Match not found after {attempts + 1} lookups"))
+            else:
+                delay = min(self.backoff_base * 2 ** attempts, self.max_backoff)
+                self.store.reschedule([market_id], time.time() + delay, "Match not found")
+        if not voided:
+            return []
+        records = self.store.record(voided)
+        self.voided += len(records)
+        return records
+
+    def status(self) -> Dict:
+        counts = self.store.counts()
+        return {
+            "running": self._task is not None,
+            "open_markets": counts.get("open", 0),
+            "resolved_markets": counts.get("resolved", 0),
+            "passes": self.passes,
+            "matches_polled": self.matches_polled,
+            "resolved": self.resolved,
+            "voided": self.voided,
+            "errors": self.errors,
+            "last_pass": self.last_pass,
+            "recent_failures": list(self._recent_failures),
+        }
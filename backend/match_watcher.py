@@ -0,0 +1,244 @@
+"""
+Live match watcher with fan-out to subscribers.
+
+For every match with at least one subscriber, a single task polls SportsDB
+on an adaptive schedule: every few seconds while the match is in play, more
+often as kickoff approaches, rarely before that, and not at all once it has
+finished. Score / status changes are diffed against the previous poll and
+pushed to every subscriber's queue, so N viewers of a match cost one
+upstream poll instead of N. A match SportsDB doesn't know (fetch_event
+returns None) is given up on after max_missing lookups in a row, with a
+"not_found" message to its subscribers.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from prediction_scheduler import parse_kickoff, utc_now
+from team_form import FINISHED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+NOT_STARTED_STATUSES = {"", "Not Started", "NS", "TBD"}
+CANCELLED_STATUSES = {"Postponed", "PST", "Cancelled", "CANC", "Abandoned", "ABD", "Suspended", "SUSP"}
+
+# Fields compared between polls and sent to subscribers
+WATCHED_FIELDS = {
+    "home_score": "intHomeScore",
+    "away_score": "intAwayScore",
+    "status": "strStatus",
+    "progress": "strProgress",
+}
+
+
+def match_snapshot(event: Dict) -> Dict[str, Any]:
+    snapshot = {field: event.get(key) for field, key in WATCHED_FIELDS.items()}
+    snapshot["home_team"] = event.get("strHomeTeam")
+    snapshot["away_team"] = event.get("strAwayTeam")
+    return snapshot
+
+
+def is_over(event: Dict) -> bool:
+    status = event.get("strStatus") or ""
+    return status in FINISHED_STATUSES or status in CANCELLED_STATUSES
+
+
+def is_in_play(event: Dict) -> bool:
+    status = (event.get("strStatus") or "").strip()
+    return bool(status) and status not in NOT_STARTED_STATUSES and not is_over(event)
+
+
+class MatchWatcher:
+    """One adaptive poller per subscribed match, fanning changes out to subscriber queues"""
+
+    def __init__(
+        self,
+        fetch_event: Callable[[str], Awaitable[Dict]],
+        live_interval: float = 15.0,
+        near_interval: float = 30.0,
+        idle_interval: float = 600.0,
+        near_window: float = 15 * 60,
+        max_error_interval: float = 300.0,
+        max_missing: int = 3,
+        queue_size: int = 32,
+        on_event: Optional[Callable[[Dict], None]] = None,
+    ):
+        self.fetch_event = fetch_event
+        self.live_interval = live_interval
+        self.near_interval = near_interval
+        self.idle_interval = idle_interval
+        self.near_window = near_window
+        self.max_error_interval = max_error_interval
+        self.max_missing = max_missing
+        self.queue_size = queue_size
+        self.on_event = on_event
+
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Dict] = {}
+        self._next_poll: Dict[str, float] = {}
+
+        self.polls = 0
+        self.poll_errors = 0
+        self.not_found = 0
+        self.changes = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+
+    # ----- subscriptions -----
+
+    def subscribe(self, match_id: str) -> asyncio.Queue:
+        """Register a subscriber; the first one for a match starts its poller"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(match_id, set()).add(queue)
+        latest = self._latest.get(match_id)
+        if latest is not None and is_over(latest):
+            # Nothing left to poll for a finished match
+            self._put(queue, self._message("final", match_id, latest))
+            return queue
+        if latest is not None:
+            self._put(queue, self._message("snapshot", match_id, latest))
+        task = self._tasks.get(match_id)
+        if task is None or task.done():
+            self._tasks[match_id] = asyncio.create_task(self._watch(match_id))
+        return queue
+
+    def unsubscribe(self, match_id: str, queue: asyncio.Queue):
+        """Drop a subscriber; the poller stops when a match has none left"""
+        subscribers = self._subscribers.get(match_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[match_id]
+            task = self._tasks.pop(match_id, None)
+            if task is not None:
+                task.cancel()
+            self._next_poll.pop(match_id, None)
+            self._latest.pop(match_id, None)
+
+    def latest(self, match_id: str) -> Optional[Dict]:
+        """The last polled event of a watched match (None if it isn't watched)"""
+        return self._latest.get(match_id)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    # ----- polling -----
+
+    def interval_for(self, event: Dict) -> Optional[float]:
+        """Seconds until the next poll, or None once the match is over"""
+        if is_over(event):
+            return None
+        if is_in_play(event):
+            return self.live_interval
+        kickoff = parse_kickoff(event)
+        if kickoff is None:
+            return self.idle_interval
+        until_kickoff = (kickoff - utc_now()).total_seconds()
+        if until_kickoff <= self.near_window:
+            # Close to (or past) kickoff without an in-play status yet
+            return self.near_interval
+        # Sleep until the near-kickoff window opens, but re-check at least every idle_interval
+        return min(self.idle_interval, until_kickoff - self.near_window)
+
+    async def _watch(self, match_id: str):
+        error_interval = self.near_interval
+        missing = 0
+        while True:
+            self.polls += 1
+            try:
+                event = await self.fetch_event(match_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.poll_errors += 1
+                logger.exception("Match watcher poll failed for %s", match_id)
+                self._next_poll[match_id] = time.time() + error_interval
+                await asyncio.sleep(error_interval)
+                error_interval = min(error_interval * 2, self.max_error_interval)
+                continue
+            if not event:
+                missing += 1
+                if missing >= self.max_missing:
+                    self.not_found += 1
+                    self._broadcast(match_id, {"type": "not_found", "match_id": match_id})
+                    self._next_poll.pop(match_id, None)
+                    return
+                self._next_poll[match_id] = time.time() + error_interval
+                await asyncio.sleep(error_interval)
+                error_interval = min(error_interval * 2, self.max_error_interval)
+                continue
+            error_interval = self.near_interval
+            missing = 0
+
+            self._publish(match_id, event)
+            interval = self.interval_for(event)
+            if interval is None:
+                self._broadcast(match_id, self._message("final", match_id, event))
+                self._next_poll.pop(match_id, None)
+                return
+            self._next_poll[match_id] = time.time() + interval
+            await asyncio.sleep(interval)
+
+    def _publish(self, match_id: str, event: Dict):
+        previous = self._latest.get(match_id)
+        self._latest[match_id] = event
+        if self.on_event is not None:
+            self.on_event(event)
+        if previous is None:
+            self._broadcast(match_id, self._message("snapshot", match_id, event))
+            return
+        before, after = match_snapshot(previous), match_snapshot(event)
+        changes = {field: [before[field], after[field]] for field in WATCHED_FIELDS if before[field] != after[field]}
+        if changes:
+            self.changes += 1
+            self._broadcast(match_id, self._message("update", match_id, event, changes))
+
+    # ----- fan-out -----
+
+    @staticmethod
+    def _message(kind: str, match_id: str, event: Dict, changes: Optional[Dict] = None) -> Dict:
+        message = {"type": kind, "match_id": match_id, "match": match_snapshot(event)}
+        if changes is not None:
+            message["changes"] = changes
+        return message
+
+    def _broadcast(self, match_id: str, message: Dict):
+        for queue in self._subscribers.get(match_id, ()):
+            self._put(queue, message)
+
+    def _put(self, queue: asyncio.Queue, message: Dict):
+        # A slow subscriber loses its oldest message rather than holding up the rest
+        if queue.full():
+            queue.get_nowait()
+            self.messages_dropped += 1
+        queue.put_nowait(message)
+        self.messages_sent += 1
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "watched_matches": len(self._tasks),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "not_found": self.not_found,
+            "changes": self.changes,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "matches": {
+                match_id: {
+                    "subscribers": len(self._subscribers.get(match_id, ())),
+                    "status": (self._latest.get(match_id) or {}).get("strStatus"),
+                    "next_poll_in": round(max(0.0, self._next_poll[match_id] - now), 1)
+                    if match_id in self._next_poll else None,
+                }
+                for match_id in self._tasks
+            },
+        }
@@ -0,0 +1,271 @@
+"""
+In-process metrics in the Prometheus text format.
+
+A small registry of counters, gauges and histograms (with labels) plus
+collectors: callbacks run at scrape time that turn the stats the caches,
+gateways and workers already keep into gauges (or counters, for running
+totals). Fed by:
+
+* RouteMetricsMiddleware: latency histogram per route template and status,
+* UpstreamTransport (http_clients.py): calls, latency and status codes per
+  upstream and endpoint,
+* record_fallback(): whenever a degraded answer is served instead of an
+  upstream one (Groq fallback text, unknown team stats, failed pins),
+* LoopLagMonitor: how late the event loop wakes a sleeping task.
+
+Served on /metrics by main.py.
+"""
+import asyncio
+import bisect
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set_total(self, value: float, *labels: str):
+        """Set from a running total kept elsewhere (in a collector)"""
+        self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Register fn to refresh gauges / counters right before each scrape (usable as a decorator)"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception:
+                logger.exception("Metrics collector %s failed", getattr(collect, "__name__", collect))
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram(
+    "ragebet_http_request_duration_seconds", "API request latency by route template", ("method", "route", "status")
+)
+upstream_request_seconds = registry.histogram(
+    "ragebet_upstream_request_duration_seconds", "Upstream call latency (to response headers)",
+    ("upstream", "endpoint")
+)
+upstream_responses = registry.counter(
+    "ragebet_upstream_responses_total", "Upstream calls by HTTP status code (or \"error\" when no response)",
+    ("upstream", "endpoint", "status")
+)
+fallbacks = registry.counter(
+    "ragebet_fallbacks_total", "Degraded answers served instead of an upstream result", ("upstream", "reason")
+)
+loop_lag_seconds = registry.histogram(
+    "ragebet_event_loop_lag_seconds", "How late the event loop ran a timer", (), LAG_BUCKETS
+)
+loop_lag_last = registry.gauge("ragebet_event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+
+def record_fallback(upstream: str, reason: str):
+    fallbacks.inc(upstream, reason)
+
+
+def upstream_endpoint(upstream: str, path: str) -> str:
+    """Low-cardinality endpoint label: the script / last path segment ("lookupevent.php", "completions")"""
+    segment = path.rstrip("/").rsplit("/", 1)[-1]
+    return segment or "/"
+
+
+def fallback_rates() -> Dict[str, Dict[str, float]]:
+    """Fallbacks per upstream as a share of its calls (for /health)"""
+    calls: Dict[str, float] = {}
+    for (upstream, _, _), value in upstream_responses._values.items():
+        calls[upstream] = calls.get(upstream, 0.0) + value
+    totals: Dict[str, float] = {}
+    for (upstream, _), value in fallbacks._values.items():
+        totals[upstream] = totals.get(upstream, 0.0) + value
+    return {
+        upstream: {"fallbacks": total, "rate": round(total / calls[upstream], 4) if calls.get(upstream) else None}
+        for upstream, total in totals.items()
+    }
+
+
+class RouteMetricsMiddleware:
+    """Times every HTTP request and labels it with the matched route template, not the raw path"""
+
+    def __init__(self, app, histogram: Histogram = http_request_seconds):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            self.histogram.observe(time.perf_counter() - start, scope["method"], template, str(status["code"]))
+
+
+class LoopLagMonitor:
+    """Samples event loop lag: how much later than requested a short sleep returns"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            loop_lag_seconds.observe(lag)
+            loop_lag_last.set(lag)
+
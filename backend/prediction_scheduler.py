@@ -0,0 +1,204 @@
+"""
+Background pre-generation of AI predictions for upcoming fixtures.
+
+Periodically pulls the upcoming fixtures of the configured leagues and queues
+every fixture kicking off within the horizon that doesn't have a prediction
+yet. A fixed pool of workers (bounding concurrency against Groq) works through
+the queue in kickoff order and retries failures with exponential backoff,
+unless the retry (or the queued generation) would run after kickoff.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_kickoff(event: Dict) -> Optional[datetime]:
+    """Kickoff time of a SportsDB event (UTC, naive), or None if it has no usable date"""
+    timestamp = event.get("strTimestamp")
+    if timestamp:
+        try:
+            return datetime.fromisoformat(timestamp.replace("Z", "").split("+")[0])
+        except ValueError:
+            pass
+    date = event.get("dateEvent")
+    if not date:
+        return None
+    time_part = (event.get("strTime") or "00:00:00").split("+")[0]
+    try:
+        return datetime.fromisoformat(f"{date}T{time_part}")
+    except ValueError:
+        try:
+            return datetime.fromisoformat(date)
+        except ValueError:
+            return None
+
+
+def utc_now() -> datetime:
+    """Current UTC time, naive like parse_kickoff's results"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class PredictionScheduler:
+    """Keeps predictions for upcoming fixtures generated ahead of time"""
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable[object]],
+        fetch_fixtures: Callable[[str], Awaitable[List[Dict]]],
+        has_prediction: Callable[[str], bool],
+        leagues: List[str],
+        horizon_days: float = 3,
+        concurrency: int = 2,
+        refresh_interval: float = 900,
+        max_retries: int = 3,
+        backoff_base: float = 30,
+    ):
+        self.generate = generate
+        self.fetch_fixtures = fetch_fixtures
+        self.has_prediction = has_prediction
+        self.leagues = leagues
+        self.horizon = timedelta(days=horizon_days)
+        self.concurrency = concurrency
+        self.refresh_interval = refresh_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        # (kickoff timestamp, match_id, attempt) - earliest kickoff first
+        self._queue: "asyncio.PriorityQueue[tuple]" = asyncio.PriorityQueue()
+        self._pending: set = set()  # queued, retrying or in progress
+        self._in_progress: set = set()
+        self._tasks: List[asyncio.Task] = []
+        # match_id -> timer that puts a failed generation back on the queue
+        self._retry_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._completed_at: deque = deque(maxlen=1000)
+        self._recent_failures: deque = deque(maxlen=20)
+
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.missed_kickoff = 0
+        self.last_refresh: Optional[str] = None
+        self.last_refresh_error: Optional[str] = None
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks.append(asyncio.create_task(self._refresh_loop()))
+        for _ in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        # Retries still waiting out their backoff would fill a queue nobody drains
+        timers, self._retry_timers = self._retry_timers, {}
+        for match_id, timer in timers.items():
+            timer.cancel()
+            self._pending.discard(match_id)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def refresh(self):
+        """Queue every fixture within the horizon that still needs a prediction"""
+        now = utc_now()
+        for league_id in self.leagues:
+            for event in await self.fetch_fixtures(league_id):
+                match_id = event.get("idEvent")
+                kickoff = parse_kickoff(event)
+                if not match_id or kickoff is None:
+                    continue
+                if not (now <= kickoff <= now + self.horizon):
+                    continue
+                if match_id in self._pending or self.has_prediction(match_id):
+                    continue
+                self._pending.add(match_id)
+                self._queue.put_nowait((kickoff.timestamp(), match_id, 0))
+        self.last_refresh = datetime.now().isoformat()
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+                self.last_refresh_error = None
+            except Exception as e:
+                self.last_refresh_error = repr(e)
+                logger.exception("Prediction scheduler refresh failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _worker(self):
+        while True:
+            priority, match_id, attempt = await self._queue.get()
+            if not self._before_kickoff(priority):
+                # Queued behind other work until kickoff: a pre-match prediction is no use now
+                self.missed_kickoff += 1
+                self._pending.discard(match_id)
+                self._queue.task_done()
+                continue
+            self._in_progress.add(match_id)
+            try:
+                await self.generate(match_id)
+                self.completed += 1
+                self._completed_at.append(time.monotonic())
+                self._pending.discard(match_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._recent_failures.append({
+                    "match_id": match_id,
+                    "attempt": attempt + 1,
+                    "error": repr(e),
+                    "at": datetime.now().isoformat(),
+                })
+                delay = self.backoff_base * (2 ** attempt)
+                if attempt + 1 < self.max_retries and self._before_kickoff(priority, delay):
+                    self.retries += 1
+                    self._retry_timers[match_id] = asyncio.get_running_loop().call_later(
+                        delay, self._retry, (priority, match_id, attempt + 1)
+                    )
+                elif attempt + 1 < self.max_retries:
+                    # The retry would only run after kickoff
+                    self.missed_kickoff += 1
+                    self._pending.discard(match_id)
+                else:
+                    self.failed += 1
+                    self._pending.discard(match_id)
+            finally:
+                self._in_progress.discard(match_id)
+                self._queue.task_done()
+
+    @staticmethod
+    def _before_kickoff(priority: float, delay: float = 0) -> bool:
+        """Whether a generation started delay seconds from now would still be before kickoff"""
+        # priority is the kickoff's naive UTC datetime .timestamp(); fromtimestamp() gives it back
+        return utc_now() + timedelta(seconds=delay) < datetime.fromtimestamp(priority)
+
+    def _retry(self, item: tuple):
+        self._retry_timers.pop(item[1], None)
+        self._queue.put_nowait(item)
+
+    def status(self) -> Dict:
+        now = time.monotonic()
+        last_hour = sum(1 for t in self._completed_at if now - t <= 3600)
+        return {
+            "running": bool(self._tasks),
+            "leagues": self.leagues,
+            "horizon_days": self.horizon.total_seconds() / 86400,
+            "concurrency": self.concurrency,
+            "queue_depth": self._queue.qsize(),
+            "in_progress": len(self._in_progress),
+            "retrying": len(self._retry_timers),
+            "pending": len(self._pending),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "missed_kickoff": self.missed_kickoff,
+            "throughput_per_hour": last_hour,
+            "last_refresh": self.last_refresh,
+            "last_refresh_error": self.last_refresh_error,
+            "recent_failures": list(self._recent_failures),
+        }
@@ -0,0 +1,184 @@
+"""
+Durable storage for generated AI predictions, keyed by match_id.
+
+Predictions are stored as plain dicts (the AIPrediction fields) so the store
+doesn't depend on the API models. Every write bumps the match's generation
+number and the previous generations are kept as history, with the time each
+was stored (markets settle against the last generation stored before kickoff).
+
+The backend is picked from a URL so it can be swapped without touching the
+callers:
+
+    sqlite:///path/to/predictions.sqlite3   (default, WAL mode)
+    memory://                               (tests / throwaway runs)
+"""
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class PredictionStore(ABC):
+    """Interface for prediction repositories"""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    @abstractmethod
+    def get(self, match_id: str) -> Optional[Dict]:
+        """Latest prediction for a match, or None"""
+
+    @abstractmethod
+    def put(self, match_id: str, prediction: Dict) -> int:
+        """Store a new generation for a match and return its generation number"""
+
+    @abstractmethod
+    def history(self, match_id: str) -> List[Dict]:
+        """All stored generations for a match, oldest first"""
+
+    @abstractmethod
+    def latest_before(self, match_id: str, timestamp: float) -> Optional[Dict]:
+        """Latest generation for a match stored before timestamp (epoch seconds), or None"""
+
+    @abstractmethod
+    def match_ids(self) -> List[str]:
+        """Every match with at least one stored generation"""
+
+
+class MemoryPredictionStore(PredictionStore):
+    def __init__(self):
+        self._generations: Dict[str, List[Dict]] = {}
+        # match_id -> time each generation was stored, in generation order
+        self._created: Dict[str, List[float]] = {}
+
+    def get(self, match_id: str) -> Optional[Dict]:
+        generations = self._generations.get(match_id)
+        return dict(generations[-1]) if generations else None
+
+    def put(self, match_id: str, prediction: Dict) -> int:
+        generations = self._generations.setdefault(match_id, [])
+        generation = len(generations) + 1
+        generations.append(dict(prediction, generation=generation))
+        self._created.setdefault(match_id, []).append(time.time())
+        return generation
+
+    def history(self, match_id: str) -> List[Dict]:
+        return [dict(p) for p in self._generations.get(match_id, [])]
+
+    def latest_before(self, match_id: str, timestamp: float) -> Optional[Dict]:
+        generations = self._generations.get(match_id, [])
+        created = self._created.get(match_id, [])
+        earlier = [g for g, at in zip(generations, created) if at < timestamp]
+        return dict(earlier[-1]) if earlier else None
+
+    def match_ids(self) -> List[str]:
+        return list(self._generations)
+
+
+class SQLitePredictionStore(PredictionStore):
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        if self._db is not None:
+            return
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # WAL lets several uvicorn workers read while one writes
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS predictions (
+                match_id TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                ipfs_hash TEXT,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS prediction_history (
+                match_id TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                ipfs_hash TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (match_id, generation)
+            )"""
+        )
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.open()
+        return self._db
+
+    def get(self, match_id: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT data, generation FROM predictions WHERE match_id = ?", (match_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row[0]), generation=row[1])
+
+    def put(self, match_id: str, prediction: Dict) -> int:
+        db = self._conn()
+        now = time.time()
+        with db:
+            # Take the write lock before reading the generation, or another
+            # worker's put for the match could read (and reuse) the same number
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT generation FROM predictions WHERE match_id = ?", (match_id,)
+            ).fetchone()
+            generation = (row[0] if row else 0) + 1
+            data = json.dumps(dict(prediction, generation=generation))
+            ipfs_hash = prediction.get("ipfs_hash")
+            db.execute(
+                "INSERT OR REPLACE INTO predictions (match_id, generation, data, ipfs_hash, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (match_id, generation, data, ipfs_hash, now)
+            )
+            db.execute(
+                "INSERT INTO prediction_history (match_id, generation, data, ipfs_hash, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (match_id, generation, data, ipfs_hash, now)
+            )
+        return generation
+
+    def history(self, match_id: str) -> List[Dict]:
+        rows = self._conn().execute(
+            "SELECT data FROM prediction_history WHERE match_id = ? ORDER BY generation", (match_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def latest_before(self, match_id: str, timestamp: float) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT data FROM prediction_history WHERE match_id = ? AND created_at < ? "
+            "ORDER BY generation DESC LIMIT 1",
+            (match_id, timestamp)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def match_ids(self) -> List[str]:
+        return [row[0] for row in self._conn().execute("SELECT match_id FROM predictions")]
+
+
+def open_prediction_store(url: str) -> PredictionStore:
+    """Create a prediction store from a sqlite:///... or memory:// URL"""
+    if url.startswith("memory://"):
+        return MemoryPredictionStore()
+    if url.startswith("sqlite:///"):
+        return SQLitePredictionStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported prediction store URL: {url}")
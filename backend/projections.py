@@ -0,0 +1,298 @@
+"""
+Compact projections of SportsDB payloads.
+
+SportsDB rows carry dozens of fields we never read (descriptions in a dozen
+languages, banners, fan art, social links). Responses of the endpoints
+listed in PROJECTIONS are cut down to one slotted dataclass per row before
+they are cached, which shrinks both the cache and the API responses.
+
+Projected rows keep the SportsDB field names and support read-only dict
+access (row.get("idTeam"), row["strTeam"], dict(row)), so code written
+against the raw dicts keeps working. API routes serialize them with orjson
+when it is installed, and can return a subset of fields (?fields=a,b).
+"""
+import json
+import sys
+from dataclasses import fields as dataclass_fields, make_dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.responses import JSONResponse, Response
+
+from http_caching import not_modified, versioned_headers
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# Strings up to this length are interned: team, league and venue names and
+# statuses repeat across every row of a schedule
+INTERN_MAX_LENGTH = 48
+
+# Response memory / size is measured on the first response of each endpoint and every Nth after it
+MEASURE_EVERY = 10
+
+
+class Compact:
+    """Read-only mapping interface over a slotted projection"""
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    ALIASES: Dict[str, Tuple[str, ...]] = {}
+
+    @classmethod
+    def from_row(cls, row: Dict) -> "Compact":
+        values = {}
+        for name in cls.FIELDS:
+            value = row.get(name)
+            if value is None:
+                for alias in cls.ALIASES.get(name, ()):
+                    value = row.get(alias)
+                    if value is not None:
+                        break
+            if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+                value = sys.intern(value)
+            values[name] = value
+        return cls(**values)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.FIELDS
+
+    def to_dict(self, only: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        names = self.FIELDS if only is None else [name for name in only if name in self.FIELDS]
+        return {name: getattr(self, name) for name in names}
+
+
+def _projection(name: str, field_names: Tuple[str, ...], aliases: Optional[Dict[str, Tuple[str, ...]]] = None):
+    cls = make_dataclass(
+        name,
+        [(field, Optional[Any], None) for field in field_names],
+        bases=(Compact,),
+        slots=True,
+        frozen=True,
+    )
+    # Class attributes, not dataclass fields
+    cls.FIELDS = field_names
+    cls.ALIASES = aliases or {}
+    return cls
+
+
+Event = _projection("Event", (
+    "idEvent", "strEvent", "strSport", "idLeague", "strLeague", "strSeason", "intRound",
+    "idHomeTeam", "strHomeTeam", "strHomeTeamBadge", "idAwayTeam", "strAwayTeam", "strAwayTeamBadge",
+    "intHomeScore", "intAwayScore", "dateEvent", "strTime", "strTimestamp", "strStatus", "strProgress",
+    "strPostponed", "idVenue", "strVenue", "strCountry", "strThumb",
+))
+
+Team = _projection("Team", (
+    "idTeam", "strTeam", "strTeamShort", "strTeamAlternate", "strSport", "idLeague", "strLeague",
+    "strBadge", "idVenue", "strStadium", "intStadiumCapacity", "strLocation", "strCountry", "intFormedYear",
+), aliases={"strBadge": ("strTeamBadge",)})
+
+TableRow = _projection("TableRow", (
+    "intRank", "idTeam", "strTeam", "strBadge", "idLeague", "strLeague", "strSeason", "strForm",
+    "strDescription", "intPlayed", "intWin", "intDraw", "intLoss", "intGoalsFor", "intGoalsAgainst",
+    "intGoalDifference", "intPoints", "dateUpdated",
+), aliases={"strBadge": ("strTeamBadge",)})
+
+Player = _projection("Player", (
+    "idPlayer", "strPlayer", "idTeam", "strTeam", "strSport", "strNationality", "strPosition",
+    "strNumber", "dateBorn", "strHeight", "strWeight", "strStatus", "strThumb", "strCutout",
+))
+
+Venue = _projection("Venue", (
+    "idVenue", "strVenue", "strSport", "strLocation", "strCountry", "intCapacity", "intFormedYear", "strThumb",
+))
+
+League = _projection("League", (
+    "idLeague", "strLeague", "strLeagueAlternate", "strSport", "strCountry", "strCurrentSeason",
+    "intFormedYear", "strBadge", "strLogo",
+))
+
+# SportsDB script -> (list key in the response, row projection)
+PROJECTIONS = {
+    "eventsnextleague.php": ("events", Event),
+    "eventspastleague.php": ("events", Event),
+    "eventsnext.php": ("events", Event),
+    "eventslast.php": ("results", Event),
+    "eventsday.php": ("events", Event),
+    "searchevents.php": ("events", Event),
+    "lookupevent.php": ("events", Event),
+    "searchteams.php": ("teams", Team),
+    "lookupteam.php": ("teams", Team),
+    "lookuptable.php": ("table", TableRow),
+    "searchplayers.php": ("players", Player),
+    "lookupplayer.php": ("players", Player),
+    "searchvenues.php": ("venues", Venue),
+    "lookupleague.php": ("leagues", League),
+}
+
+
+# ----- serialization -----
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Compact):
+        return value.to_dict()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes; projections serialize natively under orjson"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class CompactJSONResponse(JSONResponse):
+    """JSON response rendered with dumps(), skipping FastAPI's jsonable_encoder pass"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(spec: Optional[str]) -> Optional[List[str]]:
+    """"idEvent, strHomeTeam" -> ["idEvent", "strHomeTeam"] (None when no selection was asked for)"""
+    if not spec:
+        return None
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    return names or None
+
+
+def select_fields(data: Any, only: Optional[List[str]]) -> Any:
+    """Keep only the requested fields of a row or list of rows; unknown names are ignored"""
+    if only is None or data is None:
+        return data
+    if isinstance(data, list):
+        return [select_fields(row, only) for row in data]
+    if isinstance(data, Compact):
+        return data.to_dict(only)
+    if isinstance(data, dict):
+        return {name: data[name] for name in only if name in data}
+    return data
+
+
+def compact_response(data: Any, fields: Optional[str] = None) -> Response:
+    """Route response for projected rows; a 304 if the client's ETag still matches the cache entries used"""
+    unchanged = not_modified()
+    if unchanged is not None:
+        return unchanged
+    return CompactJSONResponse(select_fields(data, parse_fields(fields)), headers=versioned_headers())
+
+
+# Projection classes by name, for decode_cached()
+ENTITIES = {cls.__name__: cls for cls in (Event, Team, TableRow, Player, Venue, League)}
+
+
+def encode_cached(data: Any) -> bytes:
+    """Bytes for a (projected) SportsDB response in a shared cache; the row types are recorded alongside"""
+    projected = {}
+    if isinstance(data, dict):
+        for key, rows in data.items():
+            if isinstance(rows, list) and rows and isinstance(rows[0], Compact):
+                projected[key] = type(rows[0]).__name__
+    return dumps({"projected": projected, "data": data})
+
+
+def decode_cached(raw: bytes) -> Any:
+    """Inverse of encode_cached(): rows come back as their projection"""
+    wrapper = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+    data = wrapper["data"]
+    for key, name in wrapper["projected"].items():
+        data[key] = [ENTITIES[name].from_row(row) for row in data[key]]
+    return data
+
+
+# ----- projection + accounting -----
+
+def deep_sizeof(value: Any, seen: Optional[set] = None) -> int:
+    """Bytes held by a JSON-like value, counting shared objects (e.g. interned strings) once"""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    elif isinstance(value, Compact):
+        size += sum(deep_sizeof(getattr(value, f.name), seen) for f in dataclass_fields(value))
+    return size
+
+
+class ProjectionStats:
+    """Per-endpoint raw vs compact sizes (JSON bytes and in-memory bytes)"""
+
+    def __init__(self):
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, script: str, rows: int, raw: Any, compact: Any):
+        entry = self._endpoints.setdefault(script, {
+            "responses": 0, "rows": 0, "measured": 0,
+            "raw_json_bytes": 0, "compact_json_bytes": 0, "raw_memory_bytes": 0, "compact_memory_bytes": 0,
+        })
+        entry["responses"] += 1
+        entry["rows"] += rows
+        if (entry["responses"] - 1) % MEASURE_EVERY:
+            return
+        entry["measured"] += 1
+        entry["raw_json_bytes"] += len(dumps(raw))
+        entry["compact_json_bytes"] += len(dumps(compact))
+        entry["raw_memory_bytes"] += deep_sizeof(raw)
+        entry["compact_memory_bytes"] += deep_sizeof(compact)
+
+    def report(self) -> Dict[str, Any]:
+        report = {}
+        for script, entry in self._endpoints.items():
+            measured = entry["measured"] or 1
+            raw_json = entry["raw_json_bytes"] / measured
+            compact_json = entry["compact_json_bytes"] / measured
+            raw_memory = entry["raw_memory_bytes"] / measured
+            compact_memory = entry["compact_memory_bytes"] / measured
+            report[script] = {
+                "responses": entry["responses"],
+                "rows": entry["rows"],
+                "avg_raw_json_bytes": round(raw_json),
+                "avg_compact_json_bytes": round(compact_json),
+                "json_ratio": round(compact_json / raw_json, 3) if raw_json else None,
+                "avg_raw_memory_bytes": round(raw_memory),
+                "avg_compact_memory_bytes": round(compact_memory),
+                "memory_ratio": round(compact_memory / raw_memory, 3) if raw_memory else None,
+            }
+        return {"orjson": ORJSON_AVAILABLE, "endpoints": report}
+
+
+projection_stats = ProjectionStats()
+
+
+def project_response(endpoint: str, data: Any) -> Any:
+    """Replace the rows of a SportsDB response with their projection (other endpoints pass through)"""
+    script = endpoint.split("?", 1)[0]
+    spec = PROJECTIONS.get(script)
+    if spec is None or not isinstance(data, dict):
+        return data
+    key, projection = spec
+    rows = data.get(key)
+    if not isinstance(rows, list):
+        return data
+    compact = dict(data)
+    compact[key] = [projection.from_row(row) if isinstance(row, dict) else row for row in rows]
+    projection_stats.record(script, len(rows), data, compact)
+    return compact
@@ -0,0 +1,392 @@
+"""
+League strength ratings: Elo plus a Poisson attack/defence model.
+
+Each league's ratings are fitted from its finished events (eventspastleague,
+event lookups) with the league table as a prior, then kept current by
+applying new results as they arrive. predict() turns a fixture into
+win/draw/loss probabilities, expected goals and an over-2.5 probability
+without any upstream call; results are memoised until the ratings change.
+
+The Poisson fit is vectorized with NumPy when it is installed and falls back
+to plain Python otherwise (leagues are a few hundred matches, so both are fast).
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from team_form import is_finished, parse_score
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+ELO_BASE = 1500.0
+ELO_K = 20.0
+ELO_HOME_ADVANTAGE = 60.0
+# Elo points per point-per-game above the league average when seeding from the table
+TABLE_ELO_SCALE = 250.0
+
+# Goals-equivalent weight pulling attack/defence towards the table prior
+PRIOR_WEIGHT = 3.0
+FULL_FIT_ITERATIONS = 25
+INCREMENTAL_FIT_ITERATIONS = 3
+MAX_GOALS = 10
+# Share of the Elo outcome in the blended win/loss probabilities
+ELO_WEIGHT = 0.5
+
+DEFAULT_HOME_GOALS = 1.5
+DEFAULT_AWAY_GOALS = 1.2
+
+
+def _poisson_pmf(rate: float) -> List[float]:
+    probability = math.exp(-rate)
+    pmf = [probability]
+    for goals in range(1, MAX_GOALS + 1):
+        probability *= rate / goals
+        pmf.append(probability)
+    return pmf
+
+
+def _table_number(row: Dict, key: str) -> Optional[float]:
+    value = row.get(key)
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LeagueRatings:
+    """Elo and Poisson ratings for the teams of one league"""
+
+    def __init__(self, league_id: str):
+        self.league_id = league_id
+        self.teams: List[str] = []
+        self.index: Dict[str, int] = {}
+        # Finished results each team played in, by team index
+        self.rated: List[int] = []
+        # Finished results: (home index, away index, home goals, away goals, sort key)
+        self.results: List[Tuple[int, int, int, int, str]] = []
+        self._event_ids = set()
+        self._table: Dict[str, Dict[str, float]] = {}
+        self._table_signature = None
+
+        self.elo: List[float] = []
+        self.attack: List[float] = []
+        self.defence: List[float] = []
+        self.home_goals = DEFAULT_HOME_GOALS
+        self.away_goals = DEFAULT_AWAY_GOALS
+
+        self._needs_full_fit = True
+        self._pending = 0  # results applied since the last Poisson fit
+        self._predictions: Dict[Tuple[str, str], Dict] = {}
+
+    def _team_index(self, team_id: str) -> int:
+        position = self.index.get(team_id)
+        if position is None:
+            position = self.index[team_id] = len(self.teams)
+            self.teams.append(team_id)
+            self.rated.append(0)
+            self._needs_full_fit = True
+            self._predictions.clear()
+        return position
+
+    def add_teams(self, team_ids: Iterable[str]):
+        for team_id in team_ids:
+            self._team_index(team_id)
+
+    def add_results(self, events: Iterable[Dict]) -> int:
+        """Apply finished events not seen before; returns how many were new"""
+        added = 0
+        for event in events:
+            event_id = event.get("idEvent")
+            home_id, away_id = event.get("idHomeTeam"), event.get("idAwayTeam")
+            if not event_id or not home_id or not away_id or event_id in self._event_ids:
+                continue
+            if not is_finished(event):
+                self.add_teams((home_id, away_id))
+                continue
+            self._event_ids.add(event_id)
+            result = (
+                self._team_index(home_id),
+                self._team_index(away_id),
+                parse_score(event.get("intHomeScore")),
+                parse_score(event.get("intAwayScore")),
+                event.get("strTimestamp") or f"{event.get('dateEvent') or ''}T{event.get('strTime') or ''}",
+            )
+            self.results.append(result)
+            self.rated[result[0]] += 1
+            self.rated[result[1]] += 1
+            if not self._needs_full_fit:
+                self._apply_elo(result)
+            added += 1
+        if added:
+            self._pending += added
+            self._predictions.clear()
+        return added
+
+    def set_table(self, rows: Iterable[Dict]):
+        """Use the league table as the prior for Elo seeds and attack/defence"""
+        table = {}
+        for row in rows:
+            team_id = row.get("idTeam")
+            played = _table_number(row, "intPlayed")
+            if not team_id or not played:
+                continue
+            table[team_id] = {
+                "ppg": (_table_number(row, "intPoints") or 0.0) / played,
+                "gf": (_table_number(row, "intGoalsFor") or 0.0) / played,
+                "ga": (_table_number(row, "intGoalsAgainst") or 0.0) / played,
+            }
+        signature = tuple(sorted((team_id, tuple(v.values())) for team_id, v in table.items()))
+        if signature == self._table_signature:
+            return
+        self._table_signature = signature
+        self._table = table
+        self.add_teams(table)
+        self._needs_full_fit = True
+        self._predictions.clear()
+
+    # ----- Elo -----
+
+    def _seed_elo(self) -> List[float]:
+        if not self._table:
+            return [ELO_BASE] * len(self.teams)
+        mean_ppg = sum(t["ppg"] for t in self._table.values()) / len(self._table)
+        return [
+            ELO_BASE + TABLE_ELO_SCALE * (self._table[team_id]["ppg"] - mean_ppg) if team_id in self._table else ELO_BASE
+            for team_id in self.teams
+        ]
+
+    def _apply_elo(self, result: Tuple[int, int, int, int, str]):
+        home, away, home_goals, away_goals, _ = result
+        expected = 1.0 / (1.0 + 10 ** ((self.elo[away] - self.elo[home] - ELO_HOME_ADVANTAGE) / 400.0))
+        actual = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+        # Larger wins move ratings further (World Football Elo margin factor)
+        margin = math.log(abs(home_goals - away_goals) + 1) + 1
+        delta = ELO_K * margin * (actual - expected)
+        self.elo[home] += delta
+        self.elo[away] -= delta
+
+    # ----- Poisson attack/defence -----
+
+    def _priors(self) -> Tuple[List[float], List[float]]:
+        if not self._table:
+            ones = [1.0] * len(self.teams)
+            return ones, list(ones)
+        mean_gf = sum(t["gf"] for t in self._table.values()) / len(self._table) or 1.0
+        mean_ga = sum(t["ga"] for t in self._table.values()) / len(self._table) or 1.0
+        attack = [self._table[t]["gf"] / mean_gf if t in self._table else 1.0 for t in self.teams]
+        defence = [self._table[t]["ga"] / mean_ga if t in self._table else 1.0 for t in self.teams]
+        return [a or 1.0 for a in attack], [d or 1.0 for d in defence]
+
+    def _fit_poisson(self, iterations: int):
+        """Fixed-point fit of goals ~ Poisson(base * attack[scorer] * defence[conceder])"""
+        n = len(self.teams)
+        prior_attack, prior_defence = self._priors()
+        if len(self.attack) != n:
+            self.attack, self.defence = list(prior_attack), list(prior_defence)
+        if not self.results:
+            self.home_goals, self.away_goals = DEFAULT_HOME_GOALS, DEFAULT_AWAY_GOALS
+            return
+        if NUMPY_AVAILABLE:
+            self._fit_poisson_numpy(iterations, prior_attack, prior_defence)
+        else:
+            self._fit_poisson_python(iterations, prior_attack, prior_defence)
+
+    def _fit_poisson_numpy(self, iterations: int, prior_attack: List[float], prior_defence: List[float]):
+        n = len(self.teams)
+        home, away, home_goals, away_goals, _ = zip(*self.results)
+        home, away = np.array(home), np.array(away)
+        home_goals, away_goals = np.array(home_goals, dtype=float), np.array(away_goals, dtype=float)
+        mu_home, mu_away = home_goals.mean(), away_goals.mean()
+        prior_attack, prior_defence = np.array(prior_attack), np.array(prior_defence)
+
+        scored = np.bincount(home, home_goals, n) + np.bincount(away, away_goals, n)
+        conceded = np.bincount(home, away_goals, n) + np.bincount(away, home_goals, n)
+        attack, defence = np.array(self.attack), np.array(self.defence)
+        for _ in range(iterations):
+            expected_scored = np.bincount(home, mu_home * defence[away], n) + np.bincount(away, mu_away * defence[home], n)
+            attack = (scored + PRIOR_WEIGHT * prior_attack) / (expected_scored + PRIOR_WEIGHT)
+            attack /= attack.mean()
+            expected_conceded = np.bincount(home, mu_away * attack[away], n) + np.bincount(away, mu_home * attack[home], n)
+            defence = (conceded + PRIOR_WEIGHT * prior_defence) / (expected_conceded + PRIOR_WEIGHT)
+
+        self.attack, self.defence = attack.tolist(), defence.tolist()
+        self.home_goals, self.away_goals = float(mu_home), float(mu_away)
+
+    def _fit_poisson_python(self, iterations: int, prior_attack: List[float], prior_defence: List[float]):
+        n = len(self.teams)
+        mu_home = sum(r[2] for r in self.results) / len(self.results)
+        mu_away = sum(r[3] for r in self.results) / len(self.results)
+
+        scored, conceded = [0.0] * n, [0.0] * n
+        for home, away, home_goals, away_goals, _ in self.results:
+            scored[home] += home_goals
+            scored[away] += away_goals
+            conceded[home] += away_goals
+            conceded[away] += home_goals
+        attack, defence = list(self.attack), list(self.defence)
+        for _ in range(iterations):
+            expected_scored = [0.0] * n
+            for home, away, _, _, _ in self.results:
+                expected_scored[home] += mu_home * defence[away]
+                expected_scored[away] += mu_away * defence[home]
+            attack = [(scored[i] + PRIOR_WEIGHT * prior_attack[i]) / (expected_scored[i] + PRIOR_WEIGHT) for i in range(n)]
+            mean_attack = sum(attack) / n
+            attack = [a / mean_attack for a in attack]
+            expected_conceded = [0.0] * n
+            for home, away, _, _, _ in self.results:
+                expected_conceded[home] += mu_away * attack[away]
+                expected_conceded[away] += mu_home * attack[home]
+            defence = [(conceded[i] + PRIOR_WEIGHT * prior_defence[i]) / (expected_conceded[i] + PRIOR_WEIGHT) for i in range(n)]
+
+        self.attack, self.defence = attack, defence
+        self.home_goals, self.away_goals = mu_home, mu_away
+
+    def _ensure_fitted(self):
+        if self._needs_full_fit:
+            self.results.sort(key=lambda r: r[4])
+            self.elo = self._seed_elo()
+            for result in self.results:
+                self._apply_elo(result)
+            self.attack, self.defence = [], []
+            self._fit_poisson(FULL_FIT_ITERATIONS)
+            self._needs_full_fit = False
+            self._pending = 0
+        elif self._pending:
+            # Warm start from the current ratings: a few iterations absorb new results
+            self._fit_poisson(INCREMENTAL_FIT_ITERATIONS)
+            self._pending = 0
+
+    # ----- Prediction -----
+
+    def predict(self, home_id: str, away_id: str) -> Optional[Dict]:
+        """Probabilities for a fixture, or None unless both teams have finished results rated
+
+        A team known only from a fixture or the table would get the league
+        average (or its table prior) dressed up as a confident prediction.
+        """
+        cached = self._predictions.get((home_id, away_id))
+        if cached is not None:
+            return cached
+        if home_id not in self.index or away_id not in self.index or home_id == away_id:
+            return None
+        if not self.rated[self.index[home_id]] or not self.rated[self.index[away_id]]:
+            return None
+        self._ensure_fitted()
+        home, away = self.index[home_id], self.index[away_id]
+
+        home_rate = self.home_goals * self.attack[home] * self.defence[away]
+        away_rate = self.away_goals * self.attack[away] * self.defence[home]
+        home_pmf, away_pmf = _poisson_pmf(home_rate), _poisson_pmf(away_rate)
+        if NUMPY_AVAILABLE:
+            grid = np.outer(home_pmf, away_pmf)
+            poisson_home = float(np.tril(grid, -1).sum())
+            draw = float(np.trace(grid))
+            poisson_away = float(np.triu(grid, 1).sum())
+        else:
+            poisson_home = draw = poisson_away = 0.0
+            for i, p_home in enumerate(home_pmf):
+                for j, p_away in enumerate(away_pmf):
+                    if i > j:
+                        poisson_home += p_home * p_away
+                    elif i == j:
+                        draw += p_home * p_away
+                    else:
+                        poisson_away += p_home * p_away
+        total = poisson_home + draw + poisson_away
+        poisson_home, draw, poisson_away = poisson_home / total, draw / total, poisson_away / total
+        under_2_5 = sum(home_pmf[i] * away_pmf[j] for i in range(3) for j in range(3 - i))
+
+        # Elo gives the expected score; the draw share comes from the Poisson model
+        expected = 1.0 / (1.0 + 10 ** ((self.elo[away] - self.elo[home] - ELO_HOME_ADVANTAGE) / 400.0))
+        elo_home = max(expected - draw / 2, 0.0)
+        elo_away = max(1.0 - expected - draw / 2, 0.0)
+        home_win = (1 - ELO_WEIGHT) * poisson_home + ELO_WEIGHT * elo_home
+        away_win = (1 - ELO_WEIGHT) * poisson_away + ELO_WEIGHT * elo_away
+        total = home_win + draw + away_win
+
+        prediction = {
+            "league_id": self.league_id,
+            "home_win": round(home_win / total, 4),
+            "draw": round(draw / total, 4),
+            "away_win": round(away_win / total, 4),
+            "expected_goals": {"home": round(home_rate, 2), "away": round(away_rate, 2)},
+            "over_2_5": round(1.0 - under_2_5, 4),
+            "elo": {"home": round(self.elo[home], 1), "away": round(self.elo[away], 1)},
+            "matches_rated": len(self.results),
+        }
+        self._predictions[(home_id, away_id)] = prediction
+        return prediction
+
+    def standings(self) -> List[Dict]:
+        self._ensure_fitted()
+        rows = [
+            {
+                "idTeam": team_id,
+                "elo": round(self.elo[i], 1),
+                "attack": round(self.attack[i], 3),
+                "defence": round(self.defence[i], 3),
+            }
+            for i, team_id in enumerate(self.teams)
+        ]
+        return sorted(rows, key=lambda r: r["elo"], reverse=True)
+
+
+class RatingEngine:
+    """Per-league ratings, fed from finished events and league tables"""
+
+    def __init__(self):
+        self.leagues: Dict[str, LeagueRatings] = {}
+        self._team_league: Dict[str, str] = {}
+
+    def _league(self, league_id: str) -> LeagueRatings:
+        league = self.leagues.get(league_id)
+        if league is None:
+            league = self.leagues[league_id] = LeagueRatings(league_id)
+        return league
+
+    def ingest_events(self, events: Iterable[Dict], league_id: Optional[str] = None) -> int:
+        """Apply finished events (and register fixture teams) per league"""
+        by_league: Dict[str, List[Dict]] = {}
+        for event in events or []:
+            event_league = event.get("idLeague") or league_id
+            if event_league:
+                by_league.setdefault(event_league, []).append(event)
+        added = 0
+        for event_league, league_events in by_league.items():
+            added += self._league(event_league).add_results(league_events)
+            for event in league_events:
+                for key in ("idHomeTeam", "idAwayTeam"):
+                    if event.get(key):
+                        self._team_league[event[key]] = event_league
+        return added
+
+    def ingest_table(self, league_id: str, rows: Iterable[Dict]):
+        rows = list(rows or [])
+        self._league(league_id).set_table(rows)
+        for row in rows:
+            if row.get("idTeam"):
+                self._team_league[row["idTeam"]] = league_id
+
+    def predict(self, home_id: Optional[str], away_id: Optional[str]) -> Optional[Dict]:
+        """Win/draw/loss probabilities for a fixture, or None if the teams aren't both rated in one league"""
+        league_id = self._team_league.get(home_id)
+        if league_id is None:
+            return None
+        return self.leagues[league_id].predict(home_id, away_id)
+
+    def standings(self, league_id: str) -> List[Dict]:
+        league = self.leagues.get(league_id)
+        return league.standings() if league else []
+
+    def stats(self) -> Dict:
+        return {
+            "numpy": NUMPY_AVAILABLE,
+            "leagues": {
+                league_id: {"teams": len(league.teams), "results": len(league.results)}
+                for league_id, league in self.leagues.items()
+            },
+        }
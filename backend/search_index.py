@@ -0,0 +1,257 @@
+"""
+Autocomplete index over the teams, players and venues the API has seen.
+
+Every SportsDB search result is folded into it, so the keystrokes of a search
+box are answered from memory: a sorted list of name keys (one per word
+suffix, so "united" finds "Manchester United", sorted lazily after writes
+as in the team index) is range-scanned with bisect
+for prefix matches, and a trigram index catches typos and infixes when the
+prefix scan comes up short. Players and venues are persisted to SQLite;
+teams are fed in from the team index (team_index.py), which stores them.
+
+The index also remembers which queries were already sent upstream
+(mark_searched). A query is covered when it was searched within
+coverage_ttl, or a shorter prefix of it was and SportsDB's answer to the
+prefix was complete: some matches, but fewer than page_limit, the most rows
+SportsDB is trusted to return untruncated. The local answer is then as good
+as a new upstream search, so the following keystrokes of the same word never
+leave the process.
+"""
+import bisect
+import json
+import math
+import os
+import sqlite3
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from team_index import fold_text
+
+# kind -> (id field, name fields, detail fields, image fields) of its SportsDB rows
+KINDS: Dict[str, Tuple[str, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]] = {
+    "team": ("idTeam", ("strTeam", "strTeamShort", "strTeamAlternate"), ("strLeague", "strCountry"), ("strBadge",)),
+    "player": ("idPlayer", ("strPlayer",), ("strTeam", "strPosition"), ("strCutout", "strThumb")),
+    "venue": ("idVenue", ("strVenue",), ("strLocation", "strCountry"), ("strThumb",)),
+}
+
+# Prefix keys looked at per query; short prefixes ("a") stop here instead of
+# walking the whole index
+SCAN_LIMIT = 200
+
+# Shortest query the trigram fallback is tried for, and the share of its
+# trigrams a name must contain
+FUZZY_MIN_LENGTH = 3
+FUZZY_MIN_SCORE = 0.5
+
+
+def trigrams(key: str, complete: bool = True) -> List[str]:
+    """Trigrams of a folded key, padded at word starts (and ends, unless it is a prefix being typed)"""
+    padded = " " + key + (" " if complete else "")
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class SearchIndex:
+    """In-memory autocomplete index, players and venues persisted to SQLite"""
+
+    def __init__(self, path: str, coverage_ttl: float = 3600, max_searched: int = 20000, page_limit: int = 10):
+        self.path = path
+        self.coverage_ttl = coverage_ttl
+        self.page_limit = page_limit
+        self.max_searched = max_searched
+        # (kind, id) -> suggestion ({"type", "id", "name", "detail", "image"})
+        self._entries: Dict[Tuple[str, str], Dict] = {}
+        # (key, word offset, kind, id); offset 0 means the name starts with key.
+        # Appended as rows are indexed and sorted once before the next read,
+        # like the team index's prefix keys, so loading n keys costs a sort
+        self._keys: List[Tuple[str, int, str, str]] = []
+        self._key_set = set()
+        self._keys_dirty = False
+        self._grams: Dict[str, set] = {}
+        # (kind, folded query) -> (coverage expiry, whether the answer covers longer queries too)
+        self._searched: "OrderedDict[Tuple[str, str], Tuple[float, bool]]" = OrderedDict()
+        self._counts = Counter()
+        self._db: Optional[sqlite3.Connection] = None
+
+    # ---- persistence -------------------------------------------------
+
+    def open(self):
+        if self._db is not None:
+            return
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "kind TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (kind, id))"
+        )
+        for kind, data in self._db.execute("SELECT kind, data FROM entries"):
+            if kind in KINDS:
+                self._index_row(kind, json.loads(data))
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ---- writes ------------------------------------------------------
+
+    def add(self, kind: str, rows: Iterable[Dict], persist: bool = True):
+        """Merge SportsDB rows of one kind (search results, lookups) into the index"""
+        id_field, name_fields, detail_fields, image_fields = KINDS[kind]
+        fields = (id_field, *name_fields, *detail_fields, *image_fields)
+        changed = []
+        for row in rows:
+            record = {field: row.get(field) for field in fields if row.get(field)}
+            if self._index_row(kind, record):
+                changed.append(record)
+        if persist and changed and self._db is not None:
+            now = time.time()
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (kind, id, data, updated_at) VALUES (?, ?, ?, ?)",
+                    [(kind, str(r[id_field]), json.dumps(r), now) for r in changed]
+                )
+
+    def _index_row(self, kind: str, row: Dict) -> bool:
+        id_field, name_fields, detail_fields, image_fields = KINDS[kind]
+        entry_id = row.get(id_field)
+        name = row.get(name_fields[0])
+        if not entry_id or not name:
+            return False
+        entry_id = str(entry_id)
+        entry = {
+            "type": kind,
+            "id": entry_id,
+            "name": name,
+            "detail": " · ".join(str(row[f]) for f in detail_fields if row.get(f)) or None,
+            "image": next((row[f] for f in image_fields if row.get(f)), None),
+        }
+        existing = self._entries.get((kind, entry_id))
+        if existing is not None:
+            # Never let a sparser payload (e.g. an event row) erase richer fields
+            entry = {k: v if v is not None else existing.get(k) for k, v in entry.items()}
+            if entry == existing:
+                return False
+        self._entries[(kind, entry_id)] = entry
+
+        names = []
+        for field in name_fields:
+            names += str(row.get(field) or "").split(",")
+        for key in {fold_text(n) for n in names} - {""}:
+            words = key.split()
+            for offset in range(len(words)):
+                item = (" ".join(words[offset:]), offset, kind, entry_id)
+                if item not in self._key_set:
+                    self._key_set.add(item)
+                    self._keys.append(item)
+                    self._keys_dirty = True
+            for gram in trigrams(key):
+                self._grams.setdefault(gram, set()).add((kind, entry_id))
+        return True
+
+    def mark_searched(self, kind: str, query: str, results: int):
+        """Record that SportsDB was asked for query and returned this many rows"""
+        key = (kind, fold_text(query))
+        complete = 0 < results < self.page_limit
+        self._searched[key] = (time.monotonic() + self.coverage_ttl, complete)
+        self._searched.move_to_end(key)
+        while len(self._searched) > self.max_searched:
+            self._searched.popitem(last=False)
+
+    # ---- reads -------------------------------------------------------
+
+    def covered(self, kind: str, query: str) -> bool:
+        """Whether an upstream search for query would add nothing the index doesn't have
+
+        True when query itself was searched, or a shorter prefix of it whose
+        answer was complete. An empty answer to a prefix proves nothing about
+        longer queries (the upstream search may need whole words), and neither
+        does a full page: SportsDB may have cut matches of the longer query.
+        """
+        key = fold_text(query)
+        now = time.monotonic()
+        for end in range(len(key), 0, -1):
+            searched = self._searched.get((kind, key[:end]))
+            if searched is not None and searched[0] > now and (end == len(key) or searched[1]):
+                return True
+        return False
+
+    def suggest(self, query: str, kinds: Optional[Iterable[str]] = None, limit: int = 8) -> List[Dict]:
+        """Best matches for a partly typed query: name prefixes, then word prefixes; trigram matches if neither"""
+        key = fold_text(query)
+        if not key:
+            return []
+        kinds = set(kinds or KINDS)
+        self._counts["queries"] += 1
+        if self._keys_dirty:
+            self._keys.sort()
+            self._keys_dirty = False
+
+        # (kind, id) -> (tier, order within tier); lower is better. Keys are
+        # scanned in sorted order, so shorter names come first within a tier
+        # and the scan can stop once limit whole-name prefix matches are found.
+        ranked: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        name_matches = 0
+        start = bisect.bisect_left(self._keys, (key,))
+        for position in range(start, min(start + SCAN_LIMIT, len(self._keys))):
+            candidate, offset, kind, entry_id = self._keys[position]
+            if not candidate.startswith(key):
+                break
+            if kind not in kinds:
+                continue
+            rank = (0 if candidate == key and offset == 0 else 1 if offset == 0 else 2, position)
+            previous = ranked.get((kind, entry_id))
+            if previous is None or rank < previous:
+                if offset == 0 and (previous is None or previous[0] == 2):
+                    name_matches += 1
+                ranked[(kind, entry_id)] = rank
+            if name_matches >= limit:
+                break
+
+        if not ranked and len(key) >= FUZZY_MIN_LENGTH:
+            self._counts["fuzzy"] += 1
+            for entry_key, score in self._fuzzy(key, kinds, limit):
+                ranked.setdefault(entry_key, (3, -score))
+
+        if not ranked:
+            self._counts["empty"] += 1
+        best = sorted(ranked, key=ranked.__getitem__)[:limit]
+        return [self._entries[entry_key] for entry_key in best]
+
+    def _fuzzy(self, key: str, kinds: set, limit: int) -> List[Tuple[Tuple[str, str], float]]:
+        """Entries sharing at least FUZZY_MIN_SCORE of the query's trigrams, best first"""
+        grams = sorted(set(trigrams(key, complete=False)), key=lambda gram: len(self._grams.get(gram, ())))
+        needed = max(1, math.ceil(len(grams) * FUZZY_MIN_SCORE))
+        # A name sharing `needed` trigrams shares at least one of the
+        # len - needed + 1 rarest, so only those postings are walked
+        candidates = set()
+        for gram in grams[:len(grams) - needed + 1]:
+            candidates.update(self._grams.get(gram, ()))
+        scored = []
+        for entry_key in candidates:
+            if entry_key[0] not in kinds:
+                continue
+            shared = sum(1 for gram in grams if entry_key in self._grams.get(gram, ()))
+            if shared >= needed:
+                scored.append((entry_key, shared / len(grams)))
+        scored.sort(key=lambda item: (-item[1], len(self._entries[item[0]]["name"])))
+        return scored[:limit]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        kinds = Counter(kind for kind, _ in self._entries)
+        return {
+            "entries": {kind: kinds.get(kind, 0) for kind in KINDS},
+            "keys": len(self._keys),
+            "trigrams": len(self._grams),
+            "searched": len(self._searched),
+            "queries": self._counts["queries"],
+            "fuzzy_fallbacks": self._counts["fuzzy"],
+            "empty": self._counts["empty"],
+            "path": self.path,
+        }
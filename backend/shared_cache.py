@@ -0,0 +1,421 @@
+"""
+Shared cache tier for running several API workers.
+
+Each worker keeps its in-process TTLCache (L1). With REDIS_URL set, the
+caches sit in front of a shared Redis (or Redis-compatible) server (L2):
+
+* Writes go to L1 and are written through to L2 in the background. Other
+  workers are told over pub/sub to drop their L1 copy, so their next read
+  picks up the new value from L2.
+* L1 misses are looked up in L2 before the caller goes upstream; the entry
+  keeps its freshness window and version (and therefore its ETag).
+* DistributedSingleFlight extends the per-process request coalescing with a
+  Redis lock per key. Only one worker fetches a SportsDB payload or generates
+  a prediction. The others wait for the lock to be released and then read
+  the result the lock holder stored.
+
+Without REDIS_URL (or without the redis package) everything stays
+per-process. Redis errors are logged and counted, and callers fall back to
+L1 and local single-flight. "fakeredis://" uses an in-process fakeredis
+server, for tests.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from cache import TTLCache, estimate_size
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis
+    from redis.exceptions import RedisError, ResponseError
+    REDIS_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+    RedisError = ResponseError = OSError
+    REDIS_AVAILABLE = False
+
+# Compare-and-delete, so a worker only releases a lock it still holds
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCacheBackend:
+    """Redis connection, invalidation / lock-release pub/sub and locks shared by the tiered caches"""
+
+    def __init__(self, client, prefix: str = "ragebet"):
+        self.client = client
+        self.prefix = prefix
+        self.worker_id = os.urandom(6).hex()
+        self.invalidate_channel = f"{prefix}:invalidate"
+        self.release_channel = f"{prefix}:released"
+        self._caches: Dict[str, "TieredCache"] = {}
+        self._release_waiters: Dict[str, Set[asyncio.Event]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._pubsub = None
+        self._release = client.register_script(_RELEASE_SCRIPT)
+        self._background: Set[asyncio.Task] = set()
+
+        self.errors = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+        self.last_error: Optional[str] = None
+
+    def key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    def register(self, cache: "TieredCache"):
+        self._caches[cache.name] = cache
+
+    def error(self, operation: str, exc: BaseException):
+        self.errors += 1
+        self.last_error = f"{operation}: {exc!r}"
+        logger.warning("Shared cache %s failed: %r", operation, exc)
+
+    def spawn(self, coro: Awaitable):
+        """Run a write-through / publish in the background, keeping a reference until it's done"""
+        try:
+            task = asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            # No running loop (e.g. called from a script or at import time): nothing to share with
+            coro.close()
+            return
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def start(self):
+        if self._listener is not None:
+            return
+        try:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.invalidate_channel, self.release_channel)
+        except (RedisError, OSError) as e:
+            self.error("subscribe", e)
+            self._pubsub = None
+            return
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except (RedisError, OSError):
+                pass
+            self._pubsub = None
+        try:
+            await self.client.aclose()
+        except (RedisError, OSError):
+            pass
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self._dispatch(_text(message["channel"]), _text(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                self.error("listen", e)
+                await asyncio.sleep(1.0)
+
+    def _dispatch(self, channel: str, data: str):
+        if channel == self.release_channel:
+            for event in self._release_waiters.get(data, ()):
+                event.set()
+            return
+        origin, cache_name, key = data.split(" ", 2)
+        if origin == self.worker_id:
+            return
+        cache = self._caches.get(cache_name)
+        if cache is not None:
+            self.invalidations_received += 1
+            cache.invalidate_local(key)
+
+    async def publish_invalidation(self, cache_name: str, key: str):
+        try:
+            await self.client.publish(self.invalidate_channel, f"{self.worker_id} {cache_name} {key}")
+            self.invalidations_sent += 1
+        except (RedisError, OSError) as e:
+            self.error("publish", e)
+
+    # ----- locks -----
+
+    async def acquire(self, name: str, ttl: float) -> Optional[str]:
+        """Lock token if the lock was free, else None"""
+        token = f"{self.worker_id}-{os.urandom(4).hex()}"
+        if await self.client.set(self.key("lock", name), token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    async def release(self, name: str, token: str):
+        key = self.key("lock", name)
+        try:
+            try:
+                await self._release(keys=[key], args=[token])
+            except ResponseError:
+                # Servers without scripting: not atomic, but the lock TTL bounds the damage
+                if await self.client.get(key) == token.encode():
+                    await self.client.delete(key)
+            await self.client.publish(self.release_channel, name)
+        except (RedisError, OSError) as e:
+            self.error("release", e)
+
+    async def wait_released(self, name: str, timeout: float, poll_interval: float = 0.25):
+        """Wait until another worker's lock on name is released (or expires, or timeout passes)"""
+        event = asyncio.Event()
+        self._release_waiters.setdefault(name, set()).add(event)
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(event.wait(), min(poll_interval, max(0.0, deadline - time.monotonic())))
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                # Release messages can be missed (e.g. on reconnect); the lock key is the truth
+                if not await self.client.exists(self.key("lock", name)):
+                    return
+        finally:
+            waiters = self._release_waiters.get(name)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._release_waiters[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "worker_id": self.worker_id,
+            "listening": self._listener is not None,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+        }
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def open_cache_backend(url: Optional[str], prefix: str = "ragebet") -> Optional[RedisCacheBackend]:
+    """Backend for REDIS_URL, or None to keep caches per-process"""
+    if not url:
+        return None
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return RedisCacheBackend(fakeredis.FakeAsyncRedis(), prefix)
+    if not REDIS_AVAILABLE:
+        logger.warning("REDIS_URL is set but the redis package is not installed; caches stay per-process")
+        return None
+    return RedisCacheBackend(redis.Redis.from_url(url), prefix)
+
+
+class TieredCache(TTLCache):
+    """TTLCache (L1) backed by a shared Redis tier (L2) when a backend is configured
+
+    With share_values=False only invalidations are shared: values stay per
+    worker, and the other workers drop their copy when a key changes (for
+    values that have their own shared store, like predictions).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        backend: Optional[RedisCacheBackend] = None,
+        encode: Optional[Callable[[Any], bytes]] = None,
+        decode: Optional[Callable[[bytes], Any]] = None,
+        share_values: bool = True,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        default_ttl: float = 300,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        super().__init__(name, max_entries=max_entries, max_bytes=max_bytes, default_ttl=default_ttl, sizeof=sizeof)
+        self.backend = backend
+        self.share_values = share_values and backend is not None and encode is not None and decode is not None
+        self.encode = encode
+        self.decode = decode
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_writes = 0
+        if backend is not None:
+            backend.register(self)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, max_stale: float = 0,
+            version: Optional[str] = None, publish: bool = True):
+        """Set key in L1 and, with publish, write it through / invalidate the other workers' copies
+
+        publish=False fills L1 only, for a value read back from a shared store
+        (nothing changed, so there is nothing to tell the other workers).
+        """
+        super().set(key, value, ttl, max_stale, version)
+        if self.backend is None or not publish:
+            return
+        freshness = self.freshness(key)
+        if self.share_values and freshness is not None:
+            self.backend.spawn(self._write_through(key, value, freshness))
+        else:
+            self.backend.spawn(self.backend.publish_invalidation(self.name, key))
+
+    def delete(self, key: str):
+        super().delete(key)
+        if self.backend is not None:
+            if self.share_values:
+                self.backend.spawn(self._delete_shared(key))
+            else:
+                self.backend.spawn(self.backend.publish_invalidation(self.name, key))
+
+    def invalidate_local(self, key: str):
+        """Drop the L1 copy only (another worker changed the key)"""
+        super().delete(key)
+
+    async def _write_through(self, key: str, value: Any, freshness: Tuple[str, float, float]):
+        version, fresh_for, stale_for = freshness
+        # "<fresh until (epoch)> <version>\n<payload>", expiring from Redis with the stale window
+        header = f"{time.time() + fresh_for:.3f} {version}\n".encode()
+        try:
+            await self.backend.client.set(
+                self.backend.key(self.name, key), header + self.encode(value),
+                px=max(1, int((fresh_for + stale_for) * 1000))
+            )
+            self.l2_writes += 1
+        except (RedisError, OSError) as e:
+            self.backend.error("write", e)
+            return
+        await self.backend.publish_invalidation(self.name, key)
+
+    async def _delete_shared(self, key: str):
+        try:
+            await self.backend.client.delete(self.backend.key(self.name, key))
+        except (RedisError, OSError) as e:
+            self.backend.error("delete", e)
+            return
+        await self.backend.publish_invalidation(self.name, key)
+
+    async def lookup_shared(self, key: str, allow_stale: bool = True) -> Optional[Tuple[Any, bool]]:
+        """lookup() that falls back to L2 on an L1 miss, copying the L2 entry into L1"""
+        entry = self.lookup(key, allow_stale)
+        if entry is not None or not self.share_values:
+            return entry
+        try:
+            pipe = self.backend.client.pipeline(transaction=False)
+            pipe.get(self.backend.key(self.name, key))
+            pipe.pttl(self.backend.key(self.name, key))
+            raw, pttl = await pipe.execute()
+        except (RedisError, OSError) as e:
+            self.backend.error("read", e)
+            return None
+        if raw is None or pttl is None or pttl <= 0:
+            self.l2_misses += 1
+            return None
+        header, _, payload = raw.partition(b"\n")
+        fresh_until, version = header.decode().split(" ", 1)
+        fresh_for = max(0.0, float(fresh_until) - time.time())
+        stale = fresh_for == 0
+        if stale and not allow_stale:
+            self.l2_misses += 1
+            return None
+        value = self.decode(payload)
+        self.l2_hits += 1
+        TTLCache.set(self, key, value, fresh_for, max(0.0, pttl / 1000 - fresh_for), version)
+        return value, stale
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        if self.backend is not None:
+            stats["l2"] = {
+                "shared_values": self.share_values,
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "writes": self.l2_writes,
+            }
+        return stats
+
+
+class DistributedSingleFlight(SingleFlight):
+    """SingleFlight whose executions are also serialized across workers with a Redis lock
+
+    do() takes a ready() callback that returns the result another worker
+    produced (e.g. a fresh cache entry), or None. It is checked after the
+    lock is taken, and after waiting for another worker's lock. Without a
+    backend or a ready() callback, do() is plain per-process single-flight.
+    """
+
+    def __init__(self, name: str, backend: Optional[RedisCacheBackend] = None,
+                 lock_ttl: float = 30.0, wait_timeout: float = 30.0):
+        super().__init__(name)
+        self.backend = backend
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.remote_waits = 0
+        self.remote_results = 0
+        self.lock_errors = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 ready: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        if self.backend is None or ready is None:
+            return await super().do(key, fn)
+        return await super().do(key, lambda: self._locked(key, fn, ready))
+
+    async def _locked(self, key: str, fn: Callable[[], Awaitable[Any]], ready: Callable[[], Awaitable[Any]]) -> Any:
+        # Keys can be upstream URLs (with API keys in them): only a digest goes to Redis
+        lock_name = f"{self.name}:{hashlib.sha1(key.encode()).hexdigest()}"
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            try:
+                token = await self.backend.acquire(lock_name, self.lock_ttl)
+            except (RedisError, OSError) as e:
+                self.lock_errors += 1
+                self.backend.error("lock", e)
+                return await fn()
+
+            if token is not None:
+                try:
+                    # Another worker may have finished between our cache miss and taking the lock
+                    result = await ready()
+                    if result is not None:
+                        self.remote_results += 1
+                        return result
+                    return await fn()
+                finally:
+                    await self.backend.release(lock_name, token)
+
+            self.remote_waits += 1
+            try:
+                await self.backend.wait_released(lock_name, max(0.0, deadline - time.monotonic()))
+            except (RedisError, OSError) as e:
+                self.lock_errors += 1
+                self.backend.error("lock wait", e)
+                return await fn()
+            result = await ready()
+            if result is not None:
+                self.remote_results += 1
+                return result
+            if time.monotonic() >= deadline:
+                # The other worker is taking too long (or failed): do the work here
+                return await fn()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        if self.backend is not None:
+            stats.update(remote_waits=self.remote_waits, remote_results=self.remote_results,
+                         lock_errors=self.lock_errors)
+        return stats
@@ -0,0 +1,47 @@
+"""
+In-flight de-duplication ("single-flight") for concurrent identical calls.
+
+The first caller for a key starts the work; every caller that arrives while it
+is still running awaits the same task instead of issuing its own request.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or join the execution already in flight"""
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so one cancelled caller (e.g. a client disconnect) does not
+        # cancel the shared work for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    def running(self, key: str) -> bool:
+        """Whether an execution for key is currently in flight"""
+        return key in self._inflight
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
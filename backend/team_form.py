@@ -0,0 +1,166 @@
+"""
+Team form / results aggregation.
+
+FormEngine keeps each team's most recent finished results (keyed by team id)
+and derives rolling aggregates from them in a single, null-safe pass: form
+string, W/D/L, goals, home/away splits, over last-N windows. Results are fed
+in from any SportsDB payload that carries finished events (eventslast, past
+league schedules, event lookups), so a team's form stays current without
+refetching eventslast.php for every prediction.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+FINISHED_STATUSES = {"Match Finished", "FT", "AET", "PEN", "AP", "Finished"}
+
+# Results kept per team (the largest window we report)
+MAX_RESULTS = 10
+
+
+def parse_score(value) -> Optional[int]:
+    """SportsDB scores arrive as "2", 2, "" or None"""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_finished(event: Dict) -> bool:
+    """Both scores known and the status (when given) says the match is over"""
+    if parse_score(event.get("intHomeScore")) is None or parse_score(event.get("intAwayScore")) is None:
+        return False
+    status = event.get("strStatus")
+    return not status or status in FINISHED_STATUSES
+
+
+@dataclass
+class FormSummary:
+    matches: int = 0
+    form: str = ""  # most recent first, e.g. "WWDLW"
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    goals_scored: int = 0
+    goals_conceded: int = 0
+    home: Dict[str, int] = field(default_factory=lambda: {"played": 0, "wins": 0, "draws": 0, "losses": 0})
+    away: Dict[str, int] = field(default_factory=lambda: {"played": 0, "wins": 0, "draws": 0, "losses": 0})
+
+    def to_dict(self) -> Dict:
+        return {
+            "matches": self.matches,
+            "form": self.form,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "goals_scored": self.goals_scored,
+            "goals_conceded": self.goals_conceded,
+            "home": dict(self.home),
+            "away": dict(self.away),
+        }
+
+
+@dataclass
+class _Result:
+    event_id: str
+    sort_key: str
+    home: bool
+    scored: int
+    conceded: int
+
+
+class TeamForm:
+    """The latest finished results of one team, with cached window summaries"""
+
+    def __init__(self, team_id: str):
+        self.team_id = team_id
+        self.results: List[_Result] = []  # most recent first
+        self.loaded_at: Optional[float] = None  # last full eventslast load
+        self._summaries: Dict[int, FormSummary] = {}
+
+    def add(self, result: _Result) -> bool:
+        if any(r.event_id == result.event_id for r in self.results):
+            return False
+        self.results.append(result)
+        self.results.sort(key=lambda r: r.sort_key, reverse=True)
+        del self.results[MAX_RESULTS:]
+        self._summaries.clear()
+        return True
+
+    def summary(self, window: int = 5) -> FormSummary:
+        cached = self._summaries.get(window)
+        if cached is not None:
+            return cached
+        summary = FormSummary()
+        form = []
+        for result in self.results[:window]:
+            split = summary.home if result.home else summary.away
+            split["played"] += 1
+            summary.matches += 1
+            summary.goals_scored += result.scored
+            summary.goals_conceded += result.conceded
+            if result.scored > result.conceded:
+                outcome, summary.wins = "W", summary.wins + 1
+                split["wins"] += 1
+            elif result.scored == result.conceded:
+                outcome, summary.draws = "D", summary.draws + 1
+                split["draws"] += 1
+            else:
+                outcome, summary.losses = "L", summary.losses + 1
+                split["losses"] += 1
+            form.append(outcome)
+        summary.form = "".join(form)
+        self._summaries[window] = summary
+        return summary
+
+
+class FormEngine:
+    """Per-team rolling form aggregates, updated incrementally from finished events"""
+
+    def __init__(self, max_age: float = 6 * 60 * 60):
+        self.max_age = max_age
+        self._teams: Dict[str, TeamForm] = {}
+
+    def _team(self, team_id: str) -> TeamForm:
+        form = self._teams.get(team_id)
+        if form is None:
+            form = self._teams[team_id] = TeamForm(team_id)
+        return form
+
+    def ingest_events(self, events: Iterable[Dict]) -> int:
+        """Add every finished event to both teams' results; returns how many were new"""
+        added = 0
+        for event in events or []:
+            event_id = event.get("idEvent")
+            if not event_id or not is_finished(event):
+                continue
+            home_score = parse_score(event.get("intHomeScore"))
+            away_score = parse_score(event.get("intAwayScore"))
+            sort_key = event.get("strTimestamp") or f"{event.get('dateEvent') or ''}T{event.get('strTime') or ''}"
+            for team_key, is_home, scored, conceded in (
+                ("idHomeTeam", True, home_score, away_score),
+                ("idAwayTeam", False, away_score, home_score),
+            ):
+                team_id = event.get(team_key)
+                if team_id and self._team(team_id).add(_Result(event_id, sort_key, is_home, scored, conceded)):
+                    added += 1
+        return added
+
+    def load_team_results(self, team_id: str, events: Iterable[Dict]):
+        """Ingest a team's full recent-results payload (eventslast) and mark it loaded"""
+        self.ingest_events(events)
+        self._team(team_id).loaded_at = time.monotonic()
+
+    def needs_load(self, team_id: str) -> bool:
+        """True if the team has never had a full results load, or it is older than max_age"""
+        form = self._teams.get(team_id)
+        return form is None or form.loaded_at is None or time.monotonic() - form.loaded_at > self.max_age
+
+    def summary(self, team_id: str, window: int = 5) -> FormSummary:
+        form = self._teams.get(team_id)
+        return form.summary(window) if form else FormSummary()
+
+    def stats(self) -> Dict:
+        return {"teams": len(self._teams), "loaded": sum(1 for f in self._teams.values() if f.loaded_at)}
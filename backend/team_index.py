@@ -0,0 +1,219 @@
+"""
+Local team-identity index: team names, aliases and normalized spellings -> idTeam.
+
+Backed by a small SQLite file so it survives restarts, and held fully in memory
+for lookups. It is filled from every SportsDB payload that carries team
+identities (search results, league tables, schedules) so name -> idTeam
+resolution and team autocomplete rarely need an upstream call.
+"""
+import bisect
+import difflib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional
+
+# SportsDB team fields kept in the index (enough for search result cards)
+TEAM_FIELDS = (
+    "idTeam", "strTeam", "strTeamShort", "strTeamAlternate", "idLeague", "strLeague",
+    "strBadge", "strStadium", "intStadiumCapacity", "strCountry", "intFormedYear",
+)
+
+# Tokens that don't help tell teams apart ("Arsenal FC" == "Arsenal")
+_NOISE_TOKENS = {"fc", "afc", "cf", "sc", "ac", "the"}
+
+
+def fold_text(text: str) -> str:
+    """Lowercase, strip accents and punctuation: "Brighton & Hove" -> "brighton and hove" """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace("&", " and ")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def normalize_team_name(name: str) -> str:
+    """fold_text without club suffixes: "Atlético Madrid FC" -> "atletico madrid" """
+    tokens = fold_text(name).split()
+    meaningful = [t for t in tokens if t not in _NOISE_TOKENS]
+    return " ".join(meaningful or tokens)
+
+
+class TeamIndex:
+    """In-memory team index persisted to SQLite"""
+
+    def __init__(self, path: str, on_team: Optional[Callable[[Dict], None]] = None):
+        self.path = path
+        # Called with every team record indexed (e.g. to feed the search index)
+        self.on_team = on_team
+        self._teams: Dict[str, Dict] = {}
+        self._by_name: Dict[str, str] = {}
+        # Sorted (key, idTeam) pairs for prefix search. Each name also gets an
+        # entry per word so "united" finds "Manchester United".
+        self._prefix_keys: List[tuple] = []
+        self._prefix_dirty = False
+        self._db: Optional[sqlite3.Connection] = None
+        # Bumped whenever a team or name is indexed, so responses built from
+        # the index can tell (e.g. in their ETag) that its contents changed
+        self.generation = 0
+        self._instance = os.urandom(4).hex()
+
+    # ---- persistence -------------------------------------------------
+
+    def open(self):
+        if self._db is not None:
+            return
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS teams (id_team TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, id_team TEXT NOT NULL)"
+        )
+        for id_team, data in self._db.execute("SELECT id_team, data FROM teams"):
+            self._index_team(json.loads(data))
+        for alias, id_team in self._db.execute("SELECT alias, id_team FROM aliases"):
+            self._index_name(alias, id_team)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ---- writes ------------------------------------------------------
+
+    def add_teams(self, teams: Iterable[Dict]):
+        """Merge SportsDB team rows (searchteams / lookupteam / lookuptable) into the index"""
+        changed = []
+        for team in teams:
+            record = self._merge({field: team.get(field) for field in TEAM_FIELDS if team.get(field)})
+            if record:
+                changed.append(record)
+        self._persist(changed)
+
+    def add_events(self, events: Iterable[Dict]):
+        """Record the home/away team identities carried by SportsDB event rows"""
+        rows = []
+        for event in events:
+            for side in ("Home", "Away"):
+                if event.get(f"id{side}Team") and event.get(f"str{side}Team"):
+                    rows.append({
+                        "idTeam": event[f"id{side}Team"],
+                        "strTeam": event[f"str{side}Team"],
+                        "idLeague": event.get("idLeague"),
+                        "strLeague": event.get("strLeague"),
+                        "strBadge": event.get(f"str{side}TeamBadge"),
+                    })
+        self.add_teams(rows)
+
+    def add_alias(self, alias: str, id_team: str):
+        """Remember that a searched name resolved to a team"""
+        key = normalize_team_name(alias)
+        if not key or self._by_name.get(key) == id_team or id_team not in self._teams:
+            return
+        self._index_name(key, id_team)
+        if self._db is not None:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO aliases (alias, id_team) VALUES (?, ?)", (key, id_team)
+                )
+
+    def _merge(self, row: Dict) -> Optional[Dict]:
+        id_team = row.get("idTeam")
+        if not id_team or not row.get("strTeam"):
+            return None
+        existing = self._teams.get(id_team)
+        if existing is not None and all(existing.get(k) == v for k, v in row.items()):
+            return None
+        # Never let a sparser payload (e.g. an event row) erase richer fields
+        record = dict(existing or {})
+        record.update(row)
+        self._index_team(record)
+        return record
+
+    def _persist(self, records: List[Dict]):
+        if not records or self._db is None:
+            return
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO teams (id_team, data, updated_at) VALUES (?, ?, ?)",
+                [(r["idTeam"], json.dumps(r), now) for r in records]
+            )
+
+    def _index_team(self, record: Dict):
+        id_team = record["idTeam"]
+        self._teams[id_team] = record
+        self.generation += 1
+        if self.on_team is not None:
+            self.on_team(record)
+        names = [record.get("strTeam"), record.get("strTeamShort")]
+        names += (record.get("strTeamAlternate") or "").split(",")
+        for name in names:
+            key = normalize_team_name(name or "")
+            if key:
+                self._index_name(key, id_team)
+
+    def _index_name(self, key: str, id_team: str):
+        if self._by_name.get(key) == id_team:
+            return
+        self._by_name[key] = id_team
+        self.generation += 1
+        words = key.split()
+        for i in range(len(words)):
+            self._prefix_keys.append((" ".join(words[i:]), id_team))
+        self._prefix_dirty = True
+
+    # ---- reads -------------------------------------------------------
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """Exact (normalized) name or alias lookup"""
+        id_team = self._by_name.get(normalize_team_name(name))
+        return self._teams.get(id_team) if id_team else None
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the index does (and differs between processes, which index separately)"""
+        return f"{self._instance}:{self.generation}"
+
+    def get(self, id_team: str) -> Optional[Dict]:
+        return self._teams.get(id_team)
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[Dict]:
+        """Prefix match on any word of a team name/alias, falling back to fuzzy matching"""
+        key = normalize_team_name(query)
+        if not key:
+            return []
+        if self._prefix_dirty:
+            self._prefix_keys = sorted(set(self._prefix_keys))
+            self._prefix_dirty = False
+
+        ids: List[str] = []
+        start = bisect.bisect_left(self._prefix_keys, (key, ""))
+        for candidate, id_team in self._prefix_keys[start:]:
+            if not candidate.startswith(key):
+                break
+            if id_team not in ids:
+                ids.append(id_team)
+                if len(ids) >= limit:
+                    break
+
+        if not ids and fuzzy:
+            for match in difflib.get_close_matches(key, list(self._by_name), n=limit, cutoff=0.75):
+                if self._by_name[match] not in ids:
+                    ids.append(self._by_name[match])
+
+        return [self._teams[i] for i in ids]
+
+    def __len__(self) -> int:
+        return len(self._teams)
+
+    def stats(self) -> Dict:
+        return {"teams": len(self._teams), "names": len(self._by_name), "path": self.path}
@@ -0,0 +1,20 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# The backend modules are imported top-level, as main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def main(monkeypatch, tmp_path):
+    """The app module, imported with local stores under a temp dir and no Redis"""
+    monkeypatch.setenv("SPORTSDB_API_KEY", "test")
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    main = importlib.import_module("main")
+    main.api_cache.clear()
+    yield main
+    main.api_cache.clear()
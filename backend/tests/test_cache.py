@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import TTLCache, estimate_size
+
+
+class Clock:
+    """Stands in for the time module inside cache.py only (asyncio keeps the real clock)"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_entry_expires_after_its_ttl(clock):
+    c = TTLCache("test", default_ttl=60)
+    c.set("a", 1)
+    c.set("b", 2, ttl=10)
+
+    clock.now += 9.9
+    assert c.get("a") == 1 and c.get("b") == 2
+    clock.now += 0.1
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    clock.now += 50
+    assert c.get("a") is None
+    assert len(c) == 0
+    assert c.expirations == 2
+
+
+def test_stale_window_after_ttl(clock):
+    c = TTLCache("test")
+    c.set("table", "rows", ttl=10, max_stale=30)
+
+    assert c.lookup("table") == ("rows", False)
+    clock.now += 10
+    assert c.lookup("table") == ("rows", True)
+    assert c.stale_hits == 1
+    # Stale entries are a miss for callers that can't serve them
+    assert c.get("table") is None
+    assert c.lookup("table", allow_stale=False) is None
+
+
+def test_entry_past_expires_at_is_a_miss(clock):
+    c = TTLCache("test")
+    c.set("table", "rows", ttl=10, max_stale=30)
+    misses = c.misses
+
+    clock.now += 40
+    assert c.lookup("table") is None
+    assert c.misses == misses + 1
+    assert c.expirations == 1
+    assert len(c) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    c = TTLCache("test", max_entries=3)
+    for key in "abc":
+        c.set(key, key)
+    c.get("a")
+    c.set("d", "d")
+
+    assert c.get("b") is None
+    assert [c.get(key) for key in "acd"] == ["a", "c", "d"]
+    assert c.evictions == 1
+
+
+def test_eviction_by_total_size(clock):
+    c = TTLCache("test", max_bytes=100, sizeof=len)
+    c.set("a", "x" * 40)
+    c.set("b", "x" * 40)
+    c.set("c", "x" * 40)
+
+    assert c.get("a") is None
+    assert c.current_bytes == 80
+
+
+def test_oversized_value_is_rejected_and_drops_the_previous_entry(clock):
+    c = TTLCache("test", max_bytes=100, sizeof=len)
+    c.set("a", "x" * 10)
+    c.set("b", "x" * 10)
+    c.set("b", "x" * 101)
+
+    assert c.get("b") is None
+    assert c.get("a") == "x" * 10
+    assert c.current_bytes == 10
+    assert c.evictions == 0
+
+
+def test_estimate_size_tracks_json_size_without_serializing():
+    rows = [{"idEvent": str(n), "strEvent": "Arsenal vs Chelsea", "intHomeScore": None} for n in range(500)]
+    size = estimate_size({"events": rows})
+
+    assert 20_000 < size < 40_000
+    assert estimate_size({"events": rows[:1]}) < size / 100
+
+
+def test_fetch_sportsdb_serves_stale_while_one_refresh_runs(main, monkeypatch):
+    fetched = []
+
+    async def get_json(client, url, project=None):
+        fetched.append(url)
+        await asyncio.sleep(0.01)
+        return {"table": ["fresh"]}
+
+    monkeypatch.setattr(main, "_get_json", get_json)
+    flights = main.upstream_flights
+    url = f"{main.SPORTSDB_BASE_URL}/lookuptable.php?l=4328"
+
+    async def scenario():
+        main.api_cache.set("table_4328", {"table": ["stale"]}, 0, 60)
+        assert main.api_cache.lookup("table_4328") == ({"table": ["stale"]}, True)
+        executions = flights.executions
+        served = await asyncio.gather(*(
+            main.fetch_sportsdb("lookuptable.php?l=4328", "table_4328", cache_duration=60, max_stale=60)
+            for _ in range(5)
+        ))
+        assert served == [{"table": ["stale"]}] * 5
+        # The refresh runs in the background, through the upstream single-flight
+        assert flights.running(url)
+        assert flights.executions == executions + 1
+        await asyncio.sleep(0.05)
+        assert not flights.running(url)
+        return await main.fetch_sportsdb("lookuptable.php?l=4328", "table_4328", cache_duration=60, max_stale=60)
+
+    assert asyncio.run(scenario()) == {"table": ["fresh"]}
+    assert len(fetched) == 1
+    assert main.api_cache.lookup("table_4328") == ({"table": ["fresh"]}, False)
+
+
+def test_fetch_sportsdb_waits_for_entries_past_the_stale_window(main, monkeypatch, clock):
+    async def get_json(client, url, project=None):
+        return {"table": ["fresh"]}
+
+    monkeypatch.setattr(main, "_get_json", get_json)
+    main.api_cache.set("table_4328", {"table": ["stale"]}, 10, 30)
+    clock.now += 40
+
+    data = asyncio.run(main.fetch_sportsdb("lookuptable.php?l=4328", "table_4328", cache_duration=60, max_stale=30))
+    assert data == {"table": ["fresh"]}
@@ -0,0 +1,65 @@
+import json
+
+from cache import TTLCache
+from cache_snapshot import CacheSnapshotter, read_snapshot
+
+
+def worker(path):
+    cache = TTLCache("sportsdb", default_ttl=60)
+    snapshotter = CacheSnapshotter(path, [(cache, lambda v: json.dumps(v).encode(), json.loads)])
+    return cache, snapshotter
+
+
+def save(snapshotter):
+    snapshotter._write(snapshotter._collect())
+
+
+def snapshot_keys(path):
+    return {entry[0] for entry in read_snapshot(path)[1]["caches"]["sportsdb"]}
+
+
+def test_save_keeps_other_workers_entries(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    (cache_a, a), (cache_b, b) = worker(path), worker(path)
+    cache_a.set("table", [1])
+    cache_b.set("events", [2])
+    save(a)
+    save(b)
+
+    assert snapshot_keys(path) == {"table", "events"}
+
+
+def test_deleted_key_is_not_carried_over_from_the_file(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    (cache_a, a), (cache_b, b) = worker(path), worker(path)
+    cache_a.set("table", [1])
+    cache_a.set("events", [2])
+    save(a)
+
+    # Worker b never held "table" but was told it changed; a itself dropped "events"
+    cache_b.delete("table")
+    save(b)
+    assert snapshot_keys(path) == {"events"}
+
+    cache_a.delete("events")
+    save(a)
+    assert snapshot_keys(path) == {"table"}
+
+
+def test_restored_then_deleted_key_stays_deleted(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    cache_a, a = worker(path)
+    cache_a.set("table", [1])
+    save(a)
+
+    cache_b, b = worker(path)
+    b.load()
+    assert cache_b.get("table") == [1]
+    cache_b.delete("table")
+    save(b)
+    assert snapshot_keys(path) == set()
+
+    # Setting the key again lifts the tombstone
+    cache_b.set("table", [3])
+    save(b)
+    assert snapshot_keys(path) == {"table"}
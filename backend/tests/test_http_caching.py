@@ -0,0 +1,97 @@
+import gzip
+import json
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cache import TTLCache
+from http_caching import HTTPCachingMiddleware, ResponseCompressor, record_dependency
+from projections import compact_response
+
+TABLE = [{"idTeam": str(133600 + n), "strTeam": f"Team {n}", "intPoints": str(90 - n)} for n in range(20)]
+
+
+@pytest.fixture
+def api():
+    cache = TTLCache("test")
+    compressor = ResponseCompressor(min_size=256)
+    app = FastAPI()
+    app.add_middleware(HTTPCachingMiddleware, compressor=compressor)
+
+    @app.get("/api/table")
+    async def table():
+        record_dependency(cache.freshness("table"))
+        return compact_response(cache.get("table"))
+
+    @app.get("/api/small")
+    async def small():
+        return {"ok": True}
+
+    cache.set("table", TABLE, ttl=60)
+    return TestClient(app), cache, compressor
+
+
+def test_if_none_match_is_answered_with_304_and_no_body(api):
+    client, _, compressor = api
+    first = client.get("/api/table", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("public, max-age=")
+
+    again = client.get("/api/table", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+    assert compressor.not_modified == 1
+
+
+def test_body_hash_etag_for_responses_without_cache_entries(api):
+    client, _, _ = api
+    first = client.get("/api/small")
+    assert first.headers["etag"].startswith('"b')
+    assert first.headers["cache-control"] == "no-cache"
+    assert client.get("/api/small", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+
+@pytest.mark.parametrize("accept, encoding, decompress", [
+    ("gzip, deflate, br", "br", brotli.decompress),
+    ("gzip", "gzip", gzip.decompress),
+    ("br;q=0, gzip", "gzip", gzip.decompress),
+    ("identity", None, None),
+])
+def test_encoding_follows_accept_encoding(api, accept, encoding, decompress):
+    client, _, _ = api
+    with client.stream("GET", "/api/table", headers={"Accept-Encoding": accept}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers.get("content-encoding") == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    body = decompress(raw) if decompress else raw
+    assert json.loads(body) == TABLE
+    if encoding:
+        assert response.headers["etag"].endswith(f'-{encoding}"')
+        assert len(raw) < len(body)
+
+
+def test_small_bodies_are_not_compressed(api):
+    client, _, _ = api
+    response = client.get("/api/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+
+
+def test_compressed_body_is_refreshed_when_the_cache_version_changes(api):
+    client, cache, compressor = api
+    first = client.get("/api/table", headers={"Accept-Encoding": "gzip"})
+    repeat = client.get("/api/table", headers={"Accept-Encoding": "gzip"})
+    assert repeat.headers["etag"] == first.headers["etag"]
+    assert compressor.stats()["memo"]["hits"] == 1
+
+    updated = [dict(row, intPoints="0") for row in TABLE]
+    cache.set("table", updated, ttl=60)
+    changed = client.get("/api/table", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != first.headers["etag"]
+    assert changed.json() == updated
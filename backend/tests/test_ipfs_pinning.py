@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from ipfs_pinning import CHUNK_SIZE, PINNED, PinQueue, compute_cid, encode_json
+
+
+@pytest.mark.parametrize("content, cid", [
+    # `echo "hello world" | ipfs add` and an empty file, with default settings
+    (b"hello world\n", "QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o"),
+    (b"", "QmbFMke1KXqnYyBBWxB74N4c5SBnJMVAiMNRcGu6x1AwQH"),
+])
+def test_compute_cid_matches_ipfs_add(content, cid):
+    assert compute_cid(content) == cid
+
+
+def test_multi_chunk_content_has_no_local_cid():
+    assert compute_cid(b"x" * CHUNK_SIZE) is not None
+    assert compute_cid(b"x" * (CHUNK_SIZE + 1)) is None
+
+
+def test_encode_json_is_canonical():
+    assert encode_json({"b": 1.0, "a": "é"}) == '{"b":1,"a":"é"}'.encode("utf-8")
+
+
+def run_queue(path, pin, submit=()):
+    async def scenario():
+        queue = PinQueue(pin, path=path, backoff_base=0.01)
+        queue.open()
+        queue.start()
+        cids = [queue.submit_json(data, name) for data, name in submit]
+        await asyncio.sleep(0.05)
+        await queue.stop(drain_timeout=0.5)
+        queue.close()
+        return queue, cids
+    return asyncio.run(scenario())
+
+
+def test_pinned_cids_survive_a_restart(tmp_path):
+    path = str(tmp_path / "pins.sqlite3")
+    pinned = []
+
+    async def pin(content, name):
+        pinned.append(name)
+        return compute_cid(content)
+
+    _, (cid,) = run_queue(path, pin, [({"match_id": "m1"}, "prediction-m1")])
+    queue, (again,) = run_queue(path, pin, [({"match_id": "m1"}, "prediction-m1")])
+
+    assert again == cid
+    assert pinned == ["prediction-m1"]
+    assert queue.deduplicated == 1
+    assert queue.status(cid)["status"] == PINNED
+
+
+def test_unfinished_pins_are_queued_again_after_a_restart(tmp_path):
+    path = str(tmp_path / "pins.sqlite3")
+
+    async def unavailable(content, name):
+        raise ConnectionError("Pinata down")
+
+    async def pin(content, name):
+        return compute_cid(content)
+
+    async def submit_and_stop():
+        queue = PinQueue(unavailable, path=path, backoff_base=60)
+        queue.open()
+        queue.start()
+        cid = queue.submit_json({"match_id": "m2"}, "prediction-m2")
+        await asyncio.sleep(0.05)
+        await queue.stop(drain_timeout=0)
+        queue.close()
+        return cid
+
+    cid = asyncio.run(submit_and_stop())
+    queue, _ = run_queue(path, pin)
+
+    assert queue.status(cid)["status"] == PINNED
+    assert queue.pinned == 1
@@ -0,0 +1,71 @@
+import json
+import random
+
+import pytest
+
+from json_stream import IncrementalJSONFields
+
+# A Groq completion as stream_prediction receives it: fenced, with escapes,
+# unicode, a nested object and bare scalars
+COMPLETION = {
+    "prediction": "Arsenal wins 2-1 \"easily\"",
+    "roast_loser": "Chelsea's back line:\n\ta \\ masterclass in {open doors} [sic], 💀",
+    "details": {"score": [2, 1], "notes": {"why": "form, \"home\" advantage"}, "empty": {}},
+    "confidence": 0.72,
+    "upset": False,
+    "reasoning": "Five wins in a row, }{ ][ and a é for good measure.",
+    "extra": None,
+}
+TEXT = "```json\n" + json.dumps(COMPLETION, ensure_ascii=False, indent=2) + "\n```"
+
+
+def feed_in_chunks(chunks):
+    parser = IncrementalJSONFields()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+def split(text, rng):
+    chunks, position = [], 0
+    while position < len(text):
+        size = rng.randint(1, 7)
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_fields_survive_arbitrary_chunk_boundaries(seed):
+    parser, events = feed_in_chunks(split(TEXT, random.Random(seed)))
+
+    assert parser.done
+    assert events == list(COMPLETION.items())
+    assert parser.fields == COMPLETION
+
+
+def test_every_split_point_of_every_field():
+    for cut in range(1, len(TEXT)):
+        parser, events = feed_in_chunks([TEXT[:cut], TEXT[cut:]])
+        assert parser.fields == COMPLETION, cut
+        assert [name for name, _ in events] == list(COMPLETION), cut
+
+
+def test_field_is_reported_as_soon_as_its_value_completes():
+    parser = IncrementalJSONFields()
+    assert parser.feed('{"prediction": "Arsenal') == []
+    assert parser.feed(' wins", "confidence": 0.') == [("prediction", "Arsenal wins")]
+    assert parser.feed("8") == []
+    assert parser.feed("}") == [("confidence", 0.8)]
+    assert parser.done
+    # Trailing text after the object is ignored
+    assert parser.feed('\n```{"other": 1}') == []
+
+
+def test_incomplete_completion_lacks_the_unfinished_field():
+    parser, events = feed_in_chunks(['{"prediction": "Draw", "reasoning": "cut o'])
+
+    assert not parser.done
+    assert events == [("prediction", "Draw")]
+    assert "reasoning" not in parser.fields
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+import llm_gateway
+from llm_gateway import CircuitBreaker, CircuitOpenError, LLMGateway, QueueTimeoutError, TokenBucket
+
+
+class Clock:
+    """Stands in for the time module inside llm_gateway.py only (asyncio keeps the real clock)"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_gateway, "time", clock)
+    return clock
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise ConnectionError("Groq down")
+
+
+def test_breaker_opens_after_consecutive_failures_and_closes_after_a_probe(clock):
+    gateway = LLMGateway("groq", requests_per_minute=0,
+                         breaker=CircuitBreaker(failure_threshold=3, recovery_timeout=30))
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                await gateway.call(fail)
+        assert gateway.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            await gateway.call(succeed)
+
+        # After the cool-down a single probe goes through; others are still turned away
+        clock.now += 30
+        assert gateway.breaker.allow()
+        assert gateway.breaker.state == CircuitBreaker.HALF_OPEN
+        assert not gateway.breaker.allow()
+        gateway.breaker.record_abandoned()
+
+        assert await gateway.call(succeed) == "ok"
+        assert gateway.breaker.state == CircuitBreaker.CLOSED
+        assert gateway.breaker.consecutive_failures == 0
+
+    asyncio.run(scenario())
+    assert gateway.rejected["circuit_open"] == 1
+    assert gateway.breaker.times_opened == 1
+
+
+def test_failed_probe_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.times_opened == 2
+
+
+def test_admit_raises_once_the_queue_deadline_passes():
+    gateway = LLMGateway("groq", max_concurrency=1, requests_per_minute=0, queue_timeout=0.05)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with gateway.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(QueueTimeoutError):
+            async with gateway.admit():
+                pass
+        release.set()
+        await holder
+        # A queue timeout isn't an upstream failure
+        assert gateway.breaker.consecutive_failures == 0
+        assert await gateway.call(succeed) == "ok"
+
+    asyncio.run(scenario())
+    assert gateway.rejected["queue_timeout"] == 1
+    assert gateway.waiting == gateway.in_flight == 0
+
+
+def test_admit_raises_when_no_token_comes_before_the_deadline():
+    gateway = LLMGateway("groq", requests_per_minute=60, burst=1, queue_timeout=0.05)
+
+    async def scenario():
+        assert await gateway.call(succeed) == "ok"
+        # The next token is a second away, past the deadline: rejected without waiting for it
+        with pytest.raises(QueueTimeoutError):
+            await gateway.call(succeed)
+
+    asyncio.run(scenario())
+    assert gateway.rejected["queue_timeout"] == 1
+
+
+@pytest.mark.parametrize("elapsed, admitted", [
+    (0.0, 0),
+    (0.25, 0),
+    (0.5, 1),
+    (1.5, 3),
+    # Never more than the burst capacity
+    (60.0, 4),
+])
+def test_bucket_refills_at_the_configured_rate(clock, elapsed, admitted):
+    bucket = TokenBucket(rate=2, capacity=4)
+
+    async def take_all():
+        taken = 0
+        while True:
+            try:
+                await bucket.acquire(deadline=clock.now)
+            except QueueTimeoutError:
+                return taken
+            taken += 1
+
+    assert asyncio.run(take_all()) == 4
+    clock.now += elapsed
+    assert asyncio.run(take_all()) == admitted
+
+
+def test_bucket_waits_for_a_token_within_the_deadline():
+    bucket = TokenBucket(rate=50, capacity=1)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        await bucket.acquire(deadline=llm_gateway.time.monotonic())
+        start = loop.time()
+        await bucket.acquire(deadline=llm_gateway.time.monotonic() + 1)
+        return loop.time() - start
+
+    assert 0.015 <= asyncio.run(scenario()) < 0.5
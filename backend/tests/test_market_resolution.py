@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from market_resolution import (
+    AWAY, DRAW, HOME, MarketConflict, ResolutionStore, ResolutionWorker, build_resolution, predicted_outcome,
+)
+
+MAN_UTD_CITY = {"home_team": "Manchester United", "away_team": "Manchester City"}
+MAN_CITY_UTD = {"home_team": "Manchester City", "away_team": "Manchester United"}
+
+
+@pytest.mark.parametrize("teams, text, outcome", [
+    (MAN_UTD_CITY, "Manchester United wins 2-1", HOME),
+    (MAN_UTD_CITY, "Manchester City to win", AWAY),
+    (MAN_CITY_UTD, "Manchester United will win comfortably", AWAY),
+    (MAN_CITY_UTD, "Manchester City wins", HOME),
+    (MAN_UTD_CITY, "MANCHESTER UNITED FC WINS", HOME),
+    # A name containing another is not a call for the shorter one, nor the reverse
+    (MAN_UTD_CITY, "Manchester wins", None),
+    ({"home_team": "Arsenal", "away_team": "Arsenal Tula"}, "Arsenal Tula wins", AWAY),
+    ({"home_team": "Arsenal", "away_team": "Arsenal Tula"}, "Arsenal wins", HOME),
+    ({"home_team": "Arsenal", "away_team": "Chelsea"}, "Arsenal Tula wins", None),
+    (MAN_UTD_CITY, "Home Team wins", HOME),
+    (MAN_UTD_CITY, "the away team to win", AWAY),
+    (MAN_UTD_CITY, "Draw", DRAW),
+    (MAN_UTD_CITY, "It's a draw, 1-1", DRAW),
+    (MAN_UTD_CITY, "DRAW", DRAW),
+    # A draw mentioned after another call doesn't count
+    (MAN_UTD_CITY, "Manchester United wins, no chance of a draw", HOME),
+    (MAN_UTD_CITY, "Not a draw this time", None),
+    (MAN_UTD_CITY, "", None),
+    (MAN_UTD_CITY, "Chelsea wins", None),
+])
+def test_predicted_outcome(teams, text, outcome):
+    assert predicted_outcome(dict(teams, ai_prediction=text)) == outcome
+
+
+def finished(home_score, away_score, status="Match Finished"):
+    return {"strStatus": status, "intHomeScore": home_score, "intAwayScore": away_score}
+
+
+def prediction(text, generation=1):
+    return dict(MAN_UTD_CITY, ai_prediction=text, generation=generation)
+
+
+@pytest.mark.parametrize("event, stored, result, actual, ai_was_right", [
+    (finished("2", "1"), prediction("Manchester United wins"), "settled", HOME, True),
+    (finished("0", "3"), prediction("Manchester United wins"), "settled", AWAY, False),
+    (finished("1", "1"), prediction("It's a draw"), "settled", DRAW, True),
+    (finished("1", "1", "FT"), prediction("Manchester City to win"), "settled", DRAW, False),
+    (finished("2", "2"), None, "void", DRAW, False),
+    (finished("2", "0"), prediction("Goals galore"), "void", HOME, False),
+    (finished(None, None, "Postponed"), prediction("Manchester United wins"), "void", None, False),
+])
+def test_build_resolution(event, stored, result, actual, ai_was_right):
+    record = build_resolution(7, "m1", event, stored)
+
+    assert record["result"] == result
+    assert record["actual_outcome"] == actual
+    assert record["ai_was_right"] is ai_was_right
+    assert record["prediction_generation"] == (stored or {}).get("generation")
+    assert (record["reason"] is None) == (result == "settled")
+
+
+@pytest.mark.parametrize("event", [
+    finished("1", "0", "2H"),
+    finished(None, None, "Not Started"),
+    finished("1", None),
+    {},
+])
+def test_build_resolution_waits_for_the_final_result(event):
+    assert build_resolution(7, "m1", event, prediction("Draw")) is None
+
+
+def make_worker(events, max_missing=3):
+    store = ResolutionStore(":memory:")
+    store.open()
+
+    async def fetch_event(match_id):
+        return events.get(match_id)
+
+    worker = ResolutionWorker(store, fetch_event, lambda match_id, event: prediction("Manchester United wins"),
+                              max_missing=max_missing, backoff_base=0)
+    return store, worker
+
+
+def test_unknown_match_is_voided_after_max_missing_lookups():
+    store, worker = make_worker({})
+    worker.track(1, "missing")
+    worker.track(2, "missing")
+
+    async def passes(count):
+        return [await worker.run_once() for _ in range(count)]
+
+    assert asyncio.run(passes(2)) == [0, 0]
+    assert store.market(1)["attempts"] == 2 and store.get(1) is None
+    assert asyncio.run(passes(1)) == [2]
+
+    for market_id in (1, 2):
+        record = store.get(market_id)
+        assert record["result"] == "void"
+        assert record["reason"] == "Match not found after 3 lookups"
+    assert worker.status()["voided"] == 2 and worker.status()["open_markets"] == 0
+
+
+def test_markets_of_a_finished_match_settle_once():
+    events = {"m1": finished("3", "1")}
+    store, worker = make_worker(events)
+    worker.track(1, "m1")
+
+    first = asyncio.run(worker.resolve_now(1, "m1"))
+    events["m1"] = finished("0", "4")
+    again = asyncio.run(worker.resolve_now(1, "m1"))
+
+    assert first["result"] == "settled" and first["ai_was_right"] is True
+    assert again == first
+
+
+def test_market_cannot_move_to_another_match():
+    store, worker = make_worker({})
+    worker.track(1, "m1")
+
+    with pytest.raises(MarketConflict):
+        worker.track(1, "m2")
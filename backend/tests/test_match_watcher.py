@@ -0,0 +1,90 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from match_watcher import MatchWatcher
+
+
+class Match:
+    """A live SportsDB event whose score the test moves on"""
+
+    def __init__(self):
+        self.home_score = "0"
+        self.status = "1H"
+        self.fetches = 0
+
+    async def fetch(self, match_id):
+        self.fetches += 1
+        return {
+            "idEvent": match_id, "strHomeTeam": "Arsenal", "strAwayTeam": "Chelsea",
+            "intHomeScore": self.home_score, "intAwayScore": "0", "strStatus": self.status, "strProgress": "12",
+        }
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def live(main, monkeypatch):
+    match = Match()
+    watcher = MatchWatcher(match.fetch, live_interval=0.02)
+    monkeypatch.setattr(main, "match_watcher", watcher)
+    # The socket route alone, without the app's startup (stores, schedulers, upstream warm-up)
+    app = FastAPI()
+    app.add_api_websocket_route("/ws/match/{match_id}", main.match_updates_socket)
+    with TestClient(app) as client:
+        yield client, watcher, match
+
+
+def test_subscribers_share_one_poller_and_get_pushed_updates(live):
+    client, watcher, match = live
+    with client.websocket_connect("/ws/match/2070201") as first, \
+            client.websocket_connect("/ws/match/2070201") as second:
+        for socket in (first, second):
+            snapshot = socket.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["match"]["home_score"] == "0"
+
+        status = watcher.status()
+        assert status["watched_matches"] == 1
+        assert status["matches"]["2070201"]["subscribers"] == 2
+
+        match.home_score = "1"
+        for socket in (first, second):
+            update = socket.receive_json()
+            assert update["type"] == "update"
+            assert update["changes"] == {"home_score": ["0", "1"]}
+
+        match.status = "Match Finished"
+        for socket in (first, second):
+            assert socket.receive_json()["changes"] == {"status": ["1H", "Match Finished"]}
+            assert socket.receive_json()["type"] == "final"
+
+    # Each change was diffed once and fanned out to both viewers
+    assert watcher.changes == 2
+    assert watcher.messages_sent == 8
+
+
+def test_poller_stops_when_the_last_subscriber_disconnects(live):
+    client, watcher, match = live
+    with client.websocket_connect("/ws/match/2070201") as first:
+        first.receive_json()
+        with client.websocket_connect("/ws/match/2070201") as second:
+            second.receive_json()
+        wait_until(lambda: watcher.status()["subscribers"] == 1)
+        # Still polling for the remaining viewer
+        fetches = match.fetches
+        wait_until(lambda: match.fetches > fetches)
+        assert watcher.status()["watched_matches"] == 1
+
+    wait_until(lambda: watcher.status()["watched_matches"] == 0)
+    fetches = match.fetches
+    time.sleep(0.1)
+    assert match.fetches == fetches
+    assert watcher.latest("2070201") is None
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import timedelta
+
+from prediction_scheduler import PredictionScheduler, utc_now
+
+
+def fixture(match_id, kickoff_in):
+    """An upcoming SportsDB event kicking off kickoff_in seconds from now"""
+    kickoff = utc_now() + timedelta(seconds=kickoff_in)
+    return {"idEvent": match_id, "strTimestamp": kickoff.isoformat(timespec="seconds")}
+
+
+def run_scheduler(generate, fixtures, run_for=0.1, **options):
+    """Refresh once from fixtures, let the workers run for run_for seconds, then stop"""
+    async def fetch_fixtures(league_id):
+        return fixtures
+
+    async def scenario():
+        scheduler = PredictionScheduler(generate, fetch_fixtures, lambda match_id: False, ["4328"],
+                                        concurrency=1, refresh_interval=3600, **options)
+        scheduler.start()
+        await asyncio.sleep(run_for)
+        status = scheduler.status()
+        await scheduler.stop()
+        await asyncio.sleep(0.05)
+        return scheduler, status
+
+    return asyncio.run(scenario())
+
+
+def test_failed_generation_is_retried_with_backoff():
+    attempts = []
+
+    async def generate(match_id):
+        attempts.append(match_id)
+        if len(attempts) < 2:
+            raise RuntimeError("Groq fallback")
+
+    _, status = run_scheduler(generate, [fixture("m1", 3600)], backoff_base=0.02)
+    assert attempts == ["m1", "m1"]
+    assert status["completed"] == 1 and status["retries"] == 1 and status["retrying"] == 0
+
+
+def test_retry_that_would_run_after_kickoff_is_dropped():
+    attempts = []
+
+    async def generate(match_id):
+        attempts.append(match_id)
+        raise RuntimeError("Groq fallback")
+
+    # Kickoff is 10 s away; the first retry would wait 30 s
+    _, status = run_scheduler(generate, [fixture("m1", 10)], backoff_base=30)
+    assert attempts == ["m1"]
+    assert status["retries"] == 0 and status["retrying"] == 0
+    assert status["missed_kickoff"] == 1
+    assert status["pending"] == 0
+
+
+def test_stop_cancels_pending_retries():
+    attempts = []
+
+    async def generate(match_id):
+        attempts.append(match_id)
+        raise RuntimeError("Groq fallback")
+
+    scheduler, status = run_scheduler(generate, [fixture("m1", 3600)], run_for=0.02, backoff_base=0.05)
+    assert status["retrying"] == 1
+    # The retry timer would have fired during the wait after stop()
+    assert attempts == ["m1"]
+    after = scheduler.status()
+    assert after["retrying"] == 0 and after["pending"] == 0 and after["queue_depth"] == 0
+
+
+def test_fixtures_outside_the_horizon_or_kicked_off_are_not_queued():
+    attempts = []
+
+    async def generate(match_id):
+        attempts.append(match_id)
+
+    run_scheduler(generate, [fixture("past", -60), fixture("soon", 3600), fixture("later", 10 * 86400)],
+                  horizon_days=3)
+    assert attempts == ["soon"]
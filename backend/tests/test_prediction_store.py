@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from prediction_store import MemoryPredictionStore, PredictionStore, SQLitePredictionStore
+
+
+def test_concurrent_puts_get_distinct_generations(tmp_path):
+    path = str(tmp_path / "predictions.sqlite3")
+    stores = [SQLitePredictionStore(path) for _ in range(2)]
+    for store in stores:
+        store.open()
+    barrier = threading.Barrier(len(stores))
+    generations, errors = [], []
+
+    def regenerate(store):
+        barrier.wait()
+        for i in range(50):
+            try:
+                generations.append(store.put("m1", {"match_id": "m1", "ai_prediction": f"take {i}"}))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=regenerate, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for store in stores:
+        store.close()
+
+    assert errors == []
+    assert sorted(generations) == list(range(1, 101))
+    reader = SQLitePredictionStore(path)
+    assert [p["generation"] for p in reader.history("m1")] == list(range(1, 101))
+    assert reader.get("m1")["generation"] == 100
+    reader.close()
+
+
+def test_incomplete_backend_fails_when_created():
+    class GetOnly(PredictionStore):
+        def get(self, match_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+    MemoryPredictionStore()
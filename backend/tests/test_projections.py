@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from projections import (
+    ENTITIES, PROJECTIONS, Event, League, Player, TableRow, Team, Venue,
+    compact_response, decode_cached, encode_cached, parse_fields, select_fields,
+)
+
+# Fields the frontend pages read from each kind of row (frontend/src/pages)
+FRONTEND_FIELDS = [
+    (Event, {  # Dashboard, MatchDetails, CreateMatchEvent, Search
+        "idEvent", "strEvent", "strLeague", "strStatus", "strProgress", "dateEvent", "strTime", "strVenue",
+        "strHomeTeam", "strAwayTeam", "strHomeTeamBadge", "strAwayTeamBadge", "intHomeScore", "intAwayScore",
+    }),
+    (Team, {  # Search
+        "idTeam", "strTeam", "strBadge", "strLeague", "strStadium", "intStadiumCapacity", "strCountry",
+        "intFormedYear",
+    }),
+    (TableRow, {  # LeagueStandings
+        "idTeam", "intRank", "strTeam", "strBadge", "strForm", "intPlayed", "intWin", "intDraw", "intLoss",
+        "intGoalsFor", "intGoalsAgainst", "intGoalDifference", "intPoints",
+    }),
+    (Player, {  # Search
+        "idPlayer", "strPlayer", "strTeam", "strThumb", "strPosition", "strNationality", "strHeight", "strWeight",
+    }),
+    (Venue, {  # Search
+        "idVenue", "strVenue", "strThumb", "strLocation", "intCapacity", "strCountry", "intFormedYear",
+    }),
+    (League, {  # Dashboard, LeagueStandings
+        "strBadge", "strLeague", "strCountry", "strCurrentSeason",
+    }),
+]
+
+
+@pytest.mark.parametrize("projection, read", FRONTEND_FIELDS, ids=lambda value: getattr(value, "__name__", ""))
+def test_projection_keeps_every_field_the_frontend_reads(projection, read):
+    assert read <= set(projection.FIELDS)
+    row = {name: f"value of {name}" for name in read}
+    row["strDescriptionEN"] = "dropped"
+    projected = projection.from_row(row)
+
+    assert {name: projected.get(name) for name in read} == {name: row[name] for name in read}
+    assert "strDescriptionEN" not in projected
+    assert projected.get("strDescriptionEN") is None
+
+
+def test_every_projected_endpoint_uses_a_known_entity():
+    assert {projection.__name__ for _, projection in PROJECTIONS.values()} == set(ENTITIES)
+
+
+def test_badge_aliases_fill_strBadge():
+    team = Team.from_row({"idTeam": "133604", "strTeam": "Arsenal", "strTeamBadge": "arsenal.png"})
+    assert team["strBadge"] == "arsenal.png"
+    assert TableRow.from_row({"strBadge": "a.png", "strTeamBadge": "b.png"})["strBadge"] == "a.png"
+
+
+def test_projected_rows_round_trip_through_the_shared_cache():
+    data = {"events": [Event.from_row({"idEvent": "1", "strHomeTeam": "Arsenal"})], "page": 1}
+    decoded = decode_cached(encode_cached(data))
+
+    assert isinstance(decoded["events"][0], Event)
+    assert decoded == data
+
+
+@pytest.mark.parametrize("spec, selected", [
+    (None, None),
+    ("", None),
+    (" , ", None),
+    ("idEvent", ["idEvent"]),
+    ("idEvent, strHomeTeam,", ["idEvent", "strHomeTeam"]),
+])
+def test_parse_fields(spec, selected):
+    assert parse_fields(spec) == selected
+
+
+@pytest.mark.parametrize("data", [
+    Event.from_row({"idEvent": "1", "strHomeTeam": "Arsenal", "strAwayTeam": "Chelsea"}),
+    {"idEvent": "1", "strHomeTeam": "Arsenal", "strAwayTeam": "Chelsea"},
+], ids=["projection", "dict"])
+def test_unknown_fields_are_ignored(data):
+    only = parse_fields("strHomeTeam,strNotAField,idEvent")
+    assert select_fields(data, only) == {"strHomeTeam": "Arsenal", "idEvent": "1"}
+    assert select_fields([data, data], only) == [{"strHomeTeam": "Arsenal", "idEvent": "1"}] * 2
+    assert select_fields(data, ["strNotAField"]) == {}
+
+
+def test_compact_response_applies_the_fields_selection():
+    rows = [Team.from_row({"idTeam": "133604", "strTeam": "Arsenal", "strLeague": "English Premier League"})]
+    response = compact_response(rows, "strTeam,bogus")
+
+    assert json.loads(response.body) == [{"strTeam": "Arsenal"}]
+    assert json.loads(compact_response(rows).body)[0]["strLeague"] == "English Premier League"
@@ -0,0 +1,43 @@
+from ratings import RatingEngine
+
+
+def event(event_id, home, away, home_score=None, away_score=None, league="4328"):
+    return {
+        "idEvent": event_id, "idLeague": league, "idHomeTeam": home, "idAwayTeam": away,
+        "intHomeScore": home_score, "intAwayScore": away_score, "dateEvent": f"2024-01-{int(event_id):02d}",
+    }
+
+
+def table_row(team, points, played=10):
+    return {"idTeam": team, "intPlayed": played, "intPoints": points, "intGoalsFor": 15, "intGoalsAgainst": 12}
+
+
+def test_rated_teams_get_probabilities():
+    engine = RatingEngine()
+    engine.ingest_events([event(1, "a", "b", 3, 0), event(2, "b", "a", 1, 1)])
+
+    prediction = engine.predict("a", "b")
+    assert prediction is not None
+    assert abs(prediction["home_win"] + prediction["draw"] + prediction["away_win"] - 1) < 0.001
+    assert prediction["home_win"] > prediction["away_win"]
+    assert prediction["matches_rated"] == 2
+
+
+def test_team_without_rated_results_gets_no_prediction():
+    engine = RatingEngine()
+    # "c" is known from an upcoming fixture and the table, but has no finished results
+    engine.ingest_events([event(1, "a", "b", 2, 1), event(3, "a", "c")])
+    engine.ingest_table("4328", [table_row("a", 20), table_row("b", 12), table_row("c", 25)])
+
+    assert engine.predict("a", "b") is not None
+    assert engine.predict("a", "c") is None
+    assert engine.predict("c", "a") is None
+
+
+def test_unknown_or_cross_league_teams_get_no_prediction():
+    engine = RatingEngine()
+    engine.ingest_events([event(1, "a", "b", 2, 1), event(2, "x", "y", 0, 0, league="4335")])
+
+    assert engine.predict("a", "zz") is None
+    assert engine.predict("a", "x") is None
+    assert engine.predict(None, "b") is None
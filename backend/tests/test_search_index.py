@@ -0,0 +1,45 @@
+import search_index
+from search_index import SearchIndex
+
+
+def test_rows_added_after_a_read_are_found_in_order():
+    index = SearchIndex(":memory:")
+    index.add("team", [{"idTeam": "1", "strTeam": "Manchester United"}], persist=False)
+    assert [s["id"] for s in index.suggest("man")] == ["1"]
+
+    index.add("team", [{"idTeam": "2", "strTeam": "Manchester City"}, {"idTeam": "3", "strTeam": "Mansfield"}],
+              persist=False)
+    assert [s["name"] for s in index.suggest("man")] == ["Manchester City", "Manchester United", "Mansfield"]
+    assert [s["id"] for s in index.suggest("united")] == ["1"]
+
+
+def test_complete_prefix_answer_covers_longer_queries():
+    index = SearchIndex(":memory:", page_limit=10)
+    index.mark_searched("team", "Manch", 2)
+
+    assert index.covered("team", "manch")
+    assert index.covered("team", "Manchester Uni")
+    assert not index.covered("player", "Manchester Uni")
+    assert not index.covered("team", "Man")
+
+
+def test_full_or_empty_prefix_answer_covers_only_itself():
+    index = SearchIndex(":memory:", page_limit=10)
+    index.mark_searched("team", "united", 10)
+    index.mark_searched("player", "sa", 0)
+
+    # A full page may have been truncated upstream
+    assert index.covered("team", "united")
+    assert not index.covered("team", "united states")
+    # An empty answer proves nothing about longer queries
+    assert index.covered("player", "sa")
+    assert not index.covered("player", "saka")
+
+
+def test_coverage_expires(monkeypatch):
+    index = SearchIndex(":memory:", coverage_ttl=60)
+    index.mark_searched("venue", "anfield", 1)
+    now = search_index.time.monotonic()
+    monkeypatch.setattr(search_index.time, "monotonic", lambda: now + 61)
+
+    assert not index.covered("venue", "anfield")
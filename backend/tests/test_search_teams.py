@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+
+
+def test_exact_match_is_merged_with_the_upstream_results(main, monkeypatch):
+    main.team_index.add_teams([{"idTeam": "133604", "strTeam": "Arsenal", "strLeague": "English Premier League"}])
+    fetched = []
+
+    async def get_json(client, url, project=None):
+        fetched.append(url)
+        return {"teams": [
+            {"idTeam": "133604", "strTeam": "Arsenal"},
+            {"idTeam": "135442", "strTeam": "Arsenal Tula"},
+            {"idTeam": "135962", "strTeam": "Arsenal de Sarandí"},
+        ]}
+
+    monkeypatch.setattr(main, "_get_json", get_json)
+    client = TestClient(main.app)
+
+    teams = client.get("/api/search/teams", params={"q": "Arsenal"}).json()
+    assert [team["idTeam"] for team in teams] == ["133604", "135442", "135962"]
+    assert len(fetched) == 1
+
+    # SportsDB has answered "Arsenal" now: the index covers it
+    again = client.get("/api/search/teams", params={"q": "arsenal"}).json()
+    assert {team["idTeam"] for team in again} == {"133604", "135442", "135962"}
+    assert len(fetched) == 1
+
+
+def test_etag_changes_with_the_local_matches(main, monkeypatch):
+    # Searches never count as covered, so every request merges SportsDB's results with the local matches
+    monkeypatch.setattr(main.search_index, "coverage_ttl", -1)
+
+    async def get_json(client, url, project=None):
+        return {"teams": [{"idTeam": "133610", "strTeam": "Chelsea"}]}
+
+    monkeypatch.setattr(main, "_get_json", get_json)
+    client = TestClient(main.app)
+
+    def search(etag=None):
+        return client.get("/api/search/teams", params={"q": "Chelsea"},
+                          headers={"If-None-Match": etag} if etag else {})
+
+    # The first search indexes the SportsDB rows, which changes the local matches
+    search()
+    etag = search().headers["etag"]
+    assert etag.startswith('"v')
+    assert search(etag).status_code == 304
+
+    main.team_index.add_teams([{"idTeam": "138127", "strTeam": "Chelsea FC Women"}])
+    changed = search(etag)
+    assert changed.status_code == 200
+    assert [team["idTeam"] for team in changed.json()] == ["133610", "138127"]
+    assert changed.headers["etag"] != etag
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import fakeredis
+
+from shared_cache import DistributedSingleFlight, RedisCacheBackend, TieredCache, open_cache_backend
+
+
+def encode(value):
+    return json.dumps(value).encode()
+
+
+def decode(payload):
+    return json.loads(payload)
+
+
+def workers(count=2):
+    """Backends for count workers sharing one in-process Redis server"""
+    server = fakeredis.FakeServer()
+    return [RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), prefix="test") for _ in range(count)]
+
+
+async def settle(*backends):
+    """Wait for the background write-throughs / publishes started so far"""
+    for backend in backends:
+        await asyncio.gather(*list(backend._background))
+
+
+async def until(predicate, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_fakeredis_url_opens_a_backend():
+    assert isinstance(open_cache_backend("fakeredis://"), RedisCacheBackend)
+    assert open_cache_backend(None) is None
+
+
+def test_writes_go_through_to_the_shared_tier():
+    async def scenario():
+        first, second = workers()
+        writer = TieredCache("api", first, encode, decode)
+        reader = TieredCache("api", second, encode, decode)
+
+        writer.set("table_4328", {"table": ["Arsenal"]}, ttl=60, version="v1")
+        await settle(first)
+        assert writer.l2_writes == 1
+
+        # An L1 miss on the other worker is answered from L2, with the writer's version
+        assert reader.lookup("table_4328") is None
+        assert await reader.lookup_shared("table_4328") == ({"table": ["Arsenal"]}, False)
+        assert reader.freshness("table_4328")[0] == "v1"
+        assert reader.l2_hits == 1
+        # ... and copied into L1
+        assert reader.lookup("table_4328") == ({"table": ["Arsenal"]}, False)
+
+        writer.delete("table_4328")
+        await settle(first)
+        reader.invalidate_local("table_4328")
+        assert await reader.lookup_shared("table_4328") is None
+        assert reader.l2_misses == 1
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_reaches_the_other_workers_l1():
+    async def scenario():
+        first, second = workers()
+        await first.start()
+        await second.start()
+        writer = TieredCache("api", first, encode, decode)
+        reader = TieredCache("api", second, encode, decode)
+        reader.set("table_4328", {"table": ["old"]}, ttl=60, publish=False)
+
+        writer.set("table_4328", {"table": ["new"]}, ttl=60)
+        await settle(first)
+        await until(lambda: second.invalidations_received == 1)
+
+        assert reader.lookup("table_4328") is None
+        assert await reader.lookup_shared("table_4328") == ({"table": ["new"]}, False)
+        # A worker ignores its own invalidations
+        assert first.invalidations_received == 0
+        assert writer.lookup("table_4328") == ({"table": ["new"]}, False)
+
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(scenario())
+
+
+def test_only_the_lock_holder_can_release_it():
+    async def scenario():
+        first, second = workers()
+        token = await first.acquire("prediction:m1", ttl=30)
+        assert token is not None
+        assert await second.acquire("prediction:m1", ttl=30) is None
+
+        # The compare-and-delete script leaves a lock held under another token alone
+        await second.release("prediction:m1", "not-the-token")
+        assert await second.client.exists(first.key("lock", "prediction:m1"))
+        assert await second.acquire("prediction:m1", ttl=30) is None
+
+        await first.release("prediction:m1", token)
+        assert not await second.client.exists(first.key("lock", "prediction:m1"))
+        assert await second.acquire("prediction:m1", ttl=30) is not None
+        assert first.errors == second.errors == 0
+
+    asyncio.run(scenario())
+
+
+def test_one_worker_runs_a_flight_the_other_reads_its_result():
+    async def scenario():
+        first, second = workers()
+        await first.start()
+        await second.start()
+        results = {}
+        calls = []
+
+        async def generate(worker):
+            calls.append(worker)
+            await asyncio.sleep(0.05)
+            results["m1"] = f"from {worker}"
+            return results["m1"]
+
+        async def ready():
+            return results.get("m1")
+
+        flights = [DistributedSingleFlight("predictions", backend) for backend in (first, second)]
+        served = await asyncio.gather(*(
+            flight.do("m1", lambda n=n: generate(n), ready) for n, flight in enumerate(flights)
+        ))
+
+        assert len(calls) == 1
+        assert served == [results["m1"]] * 2
+        assert sum(flight.remote_results for flight in flights) == 1
+
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"table": ["Arsenal"]}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("table_4328", fetch) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [{"table": ["Arsenal"]}] * 5
+    assert results[0] is results[4]
+    assert (flight.calls, flight.executions, flight.coalesced) == (5, 1, 4)
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+
+    async def scenario():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")),
+                                    flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert flight.executions == 2
+
+
+def test_failure_is_shared_and_releases_the_key():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError("SportsDB down")
+
+    async def succeeding():
+        calls.append(1)
+        return "ok"
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+        assert not flight.running("k")
+        # The next call starts a new execution instead of getting the old error
+        return results, await flight.do("k", succeeding)
+
+    results, after = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert results[0] is results[2]
+    assert after == "ok"
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_execution():
+    flight = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
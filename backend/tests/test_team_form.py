@@ -0,0 +1,119 @@
+import pytest
+
+import team_form
+from team_form import MAX_RESULTS, FormEngine, is_finished, parse_score
+
+
+def event(event_id, home_score, away_score, date="2024-03-01", home="133604", away="133610", status="Match Finished"):
+    return {
+        "idEvent": str(event_id), "dateEvent": date, "strTime": "15:00:00",
+        "idHomeTeam": home, "idAwayTeam": away,
+        "intHomeScore": home_score, "intAwayScore": away_score, "strStatus": status,
+    }
+
+
+@pytest.mark.parametrize("value, score", [
+    ("2", 2), (2, 2), (0, 0), ("0", 0), ("", None), (None, None), ("abc", None),
+])
+def test_parse_score(value, score):
+    assert parse_score(value) == score
+
+
+@pytest.mark.parametrize("row, finished", [
+    (event(1, "2", "1"), True),
+    (event(1, 0, 0), True),
+    (event(1, "2", "1", status=None), True),
+    (event(1, None, None), False),
+    (event(1, "2", None), False),
+    (event(1, "", ""), False),
+    (event(1, "1", "0", status="2H"), False),
+])
+def test_is_finished(row, finished):
+    assert is_finished(row) == finished
+
+
+@pytest.mark.parametrize("events, form, totals", [
+    # (events, Arsenal's form string, (wins, draws, losses, scored, conceded))
+    ([], "", (0, 0, 0, 0, 0)),
+    ([event(1, "2", "1")], "W", (1, 0, 0, 2, 1)),
+    # Null and empty scores are not results
+    ([event(1, None, None), event(2, "", "1"), event(3, "1", "1", date="2024-03-08")], "D", (0, 1, 0, 1, 1)),
+    # Most recent first, as an away side too
+    ([event(1, "0", "3", date="2024-02-01"),
+      event(2, "1", "2", date="2024-02-08", home="133610", away="133604")], "WL", (1, 0, 1, 2, 4)),
+    # The same event fed twice counts once
+    ([event(1, "2", "1"), event(1, "2", "1")], "W", (1, 0, 0, 2, 1)),
+])
+def test_summary(events, form, totals):
+    engine = FormEngine()
+    engine.ingest_events(events)
+    summary = engine.summary("133604", window=5)
+
+    assert summary.form == form
+    assert (summary.wins, summary.draws, summary.losses, summary.goals_scored, summary.goals_conceded) == totals
+    assert summary.matches == len(form)
+
+
+def test_home_and_away_splits():
+    engine = FormEngine()
+    engine.ingest_events([
+        event(1, "2", "0", date="2024-02-01"),
+        event(2, "1", "1", date="2024-02-08", home="133610", away="133604"),
+    ])
+    summary = engine.summary("133604").to_dict()
+
+    assert summary["home"] == {"played": 1, "wins": 1, "draws": 0, "losses": 0}
+    assert summary["away"] == {"played": 1, "wins": 0, "draws": 1, "losses": 0}
+
+
+def test_only_the_latest_max_results_are_kept():
+    engine = FormEngine()
+    # Oldest first: a loss, then wins every week after it
+    events = [event(100, "0", "1", date="2023-08-01")]
+    events += [event(n, "1", "0", date=f"2024-01-{n:02d}") for n in range(1, MAX_RESULTS + 1)]
+    assert engine.ingest_events(events) == 2 * len(events)
+
+    summary = engine.summary("133604", window=MAX_RESULTS + 5)
+    assert summary.matches == MAX_RESULTS
+    assert summary.form == "W" * MAX_RESULTS
+
+    # An older result than everything kept is dropped straight away
+    engine.ingest_events([event(101, "0", "4", date="2023-01-01")])
+    assert engine.summary("133604", window=MAX_RESULTS).form == "W" * MAX_RESULTS
+
+
+def test_new_results_refresh_cached_summaries():
+    engine = FormEngine()
+    engine.ingest_events([event(1, "2", "1", date="2024-02-01")])
+    assert engine.summary("133604").form == "W"
+
+    engine.ingest_events([event(2, "0", "1", date="2024-02-08")])
+    assert engine.summary("133604").form == "LW"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.mark.parametrize("loaded, elapsed, needs_load", [
+    (False, 0, True),
+    (True, 0, False),
+    (True, 3600, False),
+    (True, 3601, True),
+])
+def test_needs_load_after_max_age(monkeypatch, loaded, elapsed, needs_load):
+    clock = Clock()
+    monkeypatch.setattr(team_form, "time", clock)
+    engine = FormEngine(max_age=3600)
+    # Results fed in from other payloads don't count as a full load
+    engine.ingest_events([event(1, "2", "1")])
+    if loaded:
+        engine.load_team_results("133604", [event(2, "1", "1", date="2024-03-08")])
+    clock.now += elapsed
+
+    assert engine.needs_load("133604") == needs_load
+    assert engine.needs_load("999999")
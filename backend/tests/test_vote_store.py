@@ -0,0 +1,65 @@
+from vote_store import VoteStore
+
+
+def open_workers(path, count=2):
+    stores = [VoteStore(path) for _ in range(count)]
+    for store in stores:
+        store.open()
+    return stores
+
+
+def test_flush_picks_up_other_workers_votes_for_untouched_roasts(tmp_path):
+    a, b = open_workers(str(tmp_path / "votes.sqlite3"))
+    a.add("m1", "r1", "0xAAA", 3)
+    a.add("m1", "r1", "0xBBB", 2)
+    a.add("m2", "r2", "0xAAA", 1)
+    a.flush()
+
+    assert b.tally("r1") is None
+    b.flush()
+
+    assert b.tally("r1") == {"roast_id": "r1", "match_id": "m1", "score": 5, "votes": 2}
+    total, rows = b.leaderboard()
+    assert total == 2
+    assert [(row["roast_id"], row["rank"]) for row in rows] == [("r1", 1), ("r2", 2)]
+    assert b.leaderboard(match_id="m2")[1][0]["roast_id"] == "r2"
+
+
+def test_tallies_converge_across_workers(tmp_path):
+    a, b = open_workers(str(tmp_path / "votes.sqlite3"))
+    a.add("m1", "r1", "0xAAA", 3)
+    b.add("m1", "r1", "0xBBB", 4)
+    b.add("m1", "r2", "0xCCC", 1)
+    a.flush()
+    b.flush()
+    a.flush()
+
+    for store in (a, b):
+        assert store.tally("r1")["score"] == 7 and store.tally("r1")["votes"] == 2
+        assert store.tally("r2")["score"] == 1
+
+
+def test_late_duplicate_is_not_counted(tmp_path):
+    a, b = open_workers(str(tmp_path / "votes.sqlite3"))
+    a.add("m1", "r1", "0xAAA", 3)
+    # b hasn't seen a's vote yet, so accepts the same voter's vote locally
+    assert b.add("m1", "r1", "0xaaa", 3) is not None
+    a.flush()
+    b.flush()
+
+    assert b.tally("r1")["votes"] == 1
+    assert b.stats()["duplicates"] == 1
+    assert b.add("m1", "r1", "0xAAA", 3) is None
+
+
+def test_tallies_reload_with_their_revision(tmp_path):
+    path = str(tmp_path / "votes.sqlite3")
+    (a,) = open_workers(path, 1)
+    a.add("m1", "r1", "0xAAA", 3)
+    a.close()
+
+    (c, d) = open_workers(path)
+    d.add("m1", "r1", "0xBBB", 2)
+    d.flush()
+    c.flush()
+    assert c.tally("r1")["score"] == 5
@@ -0,0 +1,492 @@
+"""
+Lightweight per-request tracing.
+
+Each sampled request gets a trace: a tree of spans with wall-clock timing.
+Spans are opened with span() (or the traced() decorator) and nest through a
+ContextVar, so tasks started with asyncio.gather / create_task attach their
+spans to whichever span was current when they were created. Every upstream
+HTTP call gets a span from UpstreamTransport (http_clients.py); main.py adds
+spans for the prediction pipeline stages and cache lookups.
+
+Finished traces are kept in a small ring buffer (/debug/traces) and handed to
+the exporters in batches by a background task: JSON lines appended to a
+file, and/or OTLP/HTTP (JSON encoding) posted to a collector. An incoming
+W3C traceparent header is continued rather than starting a new trace.
+
+A sample_rate share of requests is traced (1% by default). With debug
+enabled, a request sent with "X-Debug-Trace: 1" is always traced
+and its response carries the span summary in Server-Timing (shown by the
+browser dev tools) plus X-Trace-Id for looking up the full tree.
+
+Outside a trace, span() costs a ContextVar lookup.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from starlette.datastructures import Headers, MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+INTERNAL = "internal"
+SERVER = "server"
+CLIENT = "client"
+
+# OTLP SpanKind values
+_OTLP_KINDS = {INTERNAL: 1, SERVER: 2, CLIENT: 3}
+
+DEBUG_HEADER = "x-debug-trace"
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "_t0", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], kind: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = random.getrandbits(64).to_bytes(8, "big").hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self._t0)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else self.start_ns + (time.perf_counter_ns() - self._t0)
+        return (end - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Stands in for a span outside a trace (or past the span limit) so callers never need to check"""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    __slots__ = ("trace_id", "root", "spans", "max_spans", "dropped", "closed", "debug")
+
+    def __init__(self, trace_id: str, max_spans: int, debug: bool = False):
+        self.trace_id = trace_id
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self.max_spans = max_spans
+        self.dropped = 0
+        self.closed = False
+        self.debug = debug
+
+    def open_span(self, name: str, parent_id: Optional[str], kind: str, attributes: Dict[str, Any]) -> Optional[Span]:
+        if self.closed:
+            # e.g. a background refresh outliving the request that started it
+            return None
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = Span(self, name, parent_id, kind, attributes)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms if self.root else 0.0
+
+    def summary(self, limit: int = 12) -> List[Tuple[str, int, float]]:
+        """(span name, count, total ms) below the root, slowest first"""
+        totals: Dict[str, List] = {}
+        for span in self.spans:
+            if span is self.root or span.end_ns is None:
+                continue
+            entry = totals.setdefault(span.name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += span.duration_ms
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+        return [(name, count, total) for name, (count, total) in ranked[:limit]]
+
+    def server_timing(self, limit: int = 12) -> str:
+        """Server-Timing header value: total so far plus the slowest span names"""
+        entries = [f"total;dur={self.duration_ms:.1f}"]
+        for position, (name, count, total) in enumerate(self.summary(limit), 1):
+            desc = name if count == 1 else f"{name} x{count}"
+            desc = desc.replace("\\", "").replace('"', "'")
+            entries.append(f'span{position};desc="{desc}";dur={total:.1f}')
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The span tree, with offsets relative to the start of the trace"""
+        origin = self.root.start_ns if self.root else 0
+        nodes: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            nodes[span.span_id] = {
+                "name": span.name,
+                "kind": span.kind,
+                "span_id": span.span_id,
+                "offset_ms": round((span.start_ns - origin) / 1e6, 3),
+                "duration_ms": round(span.duration_ms, 3),
+                "attributes": span.attributes,
+                "error": span.error,
+                "children": [],
+            }
+        roots = []
+        for span in self.spans:
+            parent = nodes.get(span.parent_id) if span.parent_id else None
+            (parent["children"] if parent is not None else roots).append(nodes[span.span_id])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name if self.root else None,
+            "duration_ms": round(self.duration_ms, 3),
+            "spans": len(self.spans),
+            "dropped_spans": self.dropped,
+            "tree": roots,
+        }
+
+
+class _SpanScope:
+    __slots__ = ("name", "kind", "attributes", "_span", "_token")
+
+    def __init__(self, name: str, kind: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self._span: Optional[Span] = None
+        self._token = None
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is None:
+            return NOOP_SPAN
+        self._span = parent.trace.open_span(self.name, parent.span_id, self.kind, self.attributes)
+        if self._span is None:
+            return NOOP_SPAN
+        self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        if exc_type is not None:
+            self._span.error = "cancelled" if issubclass(exc_type, asyncio.CancelledError) else _describe(exc)
+        self._span.finish()
+        _current.reset(self._token)
+        return False
+
+
+def _describe(exc: BaseException) -> str:
+    text = f"{type(exc).__name__}: {exc}"
+    return text if len(text) <= 200 else text[:197] + "..."
+
+
+def span(name: str, kind: str = INTERNAL, **attributes: Any) -> _SpanScope:
+    """Context manager timing a block as a child of the current span (a no-op outside a trace)"""
+    return _SpanScope(name, kind, attributes)
+
+
+def current_span():
+    """The innermost open span, or a no-op stand-in"""
+    return _current.get() or NOOP_SPAN
+
+
+def traced(name: Optional[str] = None, **attributes: Any) -> Callable:
+    """Decorator: run each call of a (sync or async) function in its own span"""
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _SpanScope(span_name, INTERNAL, dict(attributes)):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _SpanScope(span_name, INTERNAL, dict(attributes)):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a W3C traceparent header"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1].lower(), parts[2].lower(), bool(flags & 1)
+
+
+# ----- export -----
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def otlp_payload(traces: List[Trace], service_name: str) -> Dict[str, Any]:
+    """ExportTraceServiceRequest in the OTLP/HTTP JSON encoding"""
+    spans = []
+    for trace in traces:
+        for span in trace.spans:
+            record = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": _OTLP_KINDS.get(span.kind, 1),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": _otlp_attributes(span.attributes),
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+            }
+            if span.parent_id:
+                record["parentSpanId"] = span.parent_id
+            spans.append(record)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{"scope": {"name": "ragebet.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class Tracer:
+    """Starts traces, keeps the most recent ones and exports finished traces in the background"""
+
+    def __init__(self, service_name: str = "ragebet-backend", sample_rate: float = 0.01, debug: bool = False,
+                 max_spans: int = 256, keep_recent: int = 100, json_path: Optional[str] = None,
+                 otlp_endpoint: Optional[str] = None, export_interval: float = 2.0, export_batch: int = 64,
+                 queue_size: int = 1000):
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.debug = debug
+        self.max_spans = max_spans
+        self.json_path = json_path
+        self.otlp_endpoint = otlp_endpoint
+        if otlp_endpoint and not otlp_endpoint.rstrip("/").endswith("/v1/traces"):
+            self.otlp_endpoint = otlp_endpoint.rstrip("/") + "/v1/traces"
+        self.export_interval = export_interval
+        self.export_batch = export_batch
+        self._recent: Deque[Trace] = deque(maxlen=keep_recent)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._exporter: Optional[asyncio.Task] = None
+        self._in_flight: Optional[asyncio.Future] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.traces = 0
+        self.exported = 0
+        self.export_dropped = 0
+        self.export_errors = 0
+
+    @property
+    def exporting(self) -> bool:
+        return bool(self.json_path or self.otlp_endpoint)
+
+    def start(self):
+        if self._exporter is None and self.exporting:
+            if self.json_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.json_path)), exist_ok=True)
+            if self.otlp_endpoint:
+                self._client = httpx.AsyncClient(timeout=5.0)
+            self._exporter = asyncio.create_task(self._export_loop())
+
+    async def stop(self):
+        if self._exporter is not None:
+            self._exporter.cancel()
+            await asyncio.gather(self._exporter, return_exceptions=True)
+            self._exporter = None
+            if self._in_flight is not None:
+                await asyncio.gather(self._in_flight, return_exceptions=True)
+            # Flush what finished before shutdown
+            while not self._queue.empty():
+                await self._export(self._take(self.export_batch))
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ----- traces -----
+
+    def begin(self, name: str, debug: bool = False, traceparent: Optional[str] = None,
+              **attributes: Any) -> Optional[Trace]:
+        """A new trace with its root span, or None when the request isn't sampled"""
+        parent = parse_traceparent(traceparent)
+        sampled = debug or (parent is not None and parent[2]) or random.random() < self.sample_rate
+        if not sampled:
+            return None
+        trace_id = parent[0] if parent else random.getrandbits(128).to_bytes(16, "big").hex()
+        trace = Trace(trace_id, self.max_spans, debug=debug)
+        trace.root = trace.open_span(name, parent[1] if parent else None, SERVER, attributes)
+        self.traces += 1
+        return trace
+
+    def end(self, trace: Trace):
+        trace.root.finish()
+        trace.closed = True
+        self._recent.append(trace)
+        if self.exporting:
+            try:
+                self._queue.put_nowait(trace)
+            except asyncio.QueueFull:
+                self.export_dropped += 1
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Newest first: id, name, duration and span count of recently finished traces"""
+        traces = list(self._recent)[-limit:]
+        return [
+            {
+                "trace_id": trace.trace_id,
+                "name": trace.root.name,
+                "duration_ms": round(trace.duration_ms, 3),
+                "spans": len(trace.spans),
+                "error": trace.root.error,
+            }
+            for trace in reversed(traces)
+        ]
+
+    def find(self, trace_id: str) -> Optional[Trace]:
+        for trace in self._recent:
+            if trace.trace_id == trace_id:
+                return trace
+        return None
+
+    # ----- export -----
+
+    def _take(self, limit: int) -> List[Trace]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _export_loop(self):
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), self.export_interval)
+            except asyncio.TimeoutError:
+                continue
+            # Shielded so a batch already taken from the queue isn't lost when stop() cancels the loop
+            self._in_flight = asyncio.ensure_future(self._export([first] + self._take(self.export_batch - 1)))
+            await asyncio.shield(self._in_flight)
+
+    async def _export(self, batch: List[Trace]):
+        if not batch:
+            return
+        try:
+            if self.json_path:
+                lines = "".join(json.dumps(trace.to_dict(), default=str) + "\n" for trace in batch)
+                await asyncio.to_thread(self._append_json, lines)
+            if self.otlp_endpoint and self._client is not None:
+                response = await self._client.post(
+                    self.otlp_endpoint, json=otlp_payload(batch, self.service_name)
+                )
+                response.raise_for_status()
+            self.exported += len(batch)
+        except Exception as e:
+            self.export_errors += 1
+            logger.warning("Trace export failed (%d traces dropped): %r", len(batch), e)
+
+    def _append_json(self, lines: str):
+        with open(self.json_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "debug": self.debug,
+            "traces": self.traces,
+            "recent": len(self._recent),
+            "exporters": [name for name, on in (("json", self.json_path), ("otlp", self.otlp_endpoint)) if on],
+            "export_queue": self._queue.qsize(),
+            "exported": self.exported,
+            "export_dropped": self.export_dropped,
+            "export_errors": self.export_errors,
+        }
+
+
+class TracingMiddleware:
+    """Runs each HTTP request in a trace; debug requests get the span summary back in their headers"""
+
+    def __init__(self, app, tracer: Tracer, skip_paths: Tuple[str, ...] = ("/metrics", "/health")):
+        self.app = app
+        self.tracer = tracer
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        debug = self.tracer.debug and headers.get(DEBUG_HEADER, "").lower() not in ("", "0", "false")
+        trace = self.tracer.begin(
+            f"{scope['method']} {scope['path']}", debug=debug, traceparent=headers.get("traceparent"),
+            **{"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        if trace is None:
+            await self.app(scope, receive, send)
+            return
+
+        root = trace.root
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                root.set(**{"http.status_code": message["status"]})
+                if trace.debug:
+                    response_headers = MutableHeaders(raw=list(message["headers"]))
+                    response_headers.append("Server-Timing", trace.server_timing())
+                    response_headers["X-Trace-Id"] = trace.trace_id
+                    message["headers"] = response_headers.raw
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, traced_send)
+        except BaseException as e:
+            root.error = "cancelled" if isinstance(e, asyncio.CancelledError) else _describe(e)
+            raise
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if getattr(route, "path", None):
+                root.name = f"{scope['method']} {route.path}"
+                root.set(**{"http.route": route.path})
+            self.tracer.end(trace)
@@ -0,0 +1,268 @@
+"""
+Roast votes and the roast leaderboard.
+
+Votes are append-only: the first vote of a voter for a roast counts, later
+ones are rejected as duplicates. Accepted votes update the roast's weighted
+tally and the sorted leaderboards in memory straight away. They are written
+to SQLite in batches (every batch_size votes or flush_interval seconds), so
+a burst of votes costs one transaction rather than one per vote.
+
+Several workers share the database, so it has the last word: the votes
+table's (roast_id, voter_address) key drops a vote another worker already
+wrote, and tallies are bumped with an upsert counting only the votes that
+were inserted. Every tally write stamps the row with the next revision
+number, and each flush (every flush_interval, with or without votes of its
+own) re-reads the tallies changed since the last revision it saw, picking up
+the votes other workers wrote, for any roast.
+
+Tallies are persisted next to the votes, so startup loads one row per roast
+instead of replaying every vote. The leaderboards (global and per match) are
+sorted lists updated in place on each vote: reading a page of K rows is a
+slice, never a rescan.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _rank_key(tally: Dict) -> Tuple:
+    # Highest weighted score first, then most votes, then roast_id for a stable order
+    return (-tally["score"], -tally["votes"], tally["roast_id"])
+
+
+class VoteStore:
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._db: Optional[sqlite3.Connection] = None
+
+        self._tallies: Dict[str, Dict] = {}
+        self._ranking: List[Tuple] = []
+        self._match_rankings: Dict[str, List[Tuple]] = {}
+        self._pending: List[Tuple] = []
+        self._pending_keys: set = set()  # (roast_id, voter) of the pending votes
+        self._revision = 0  # highest roast_tallies revision read so far
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.flushes = 0
+
+    def open(self):
+        if self._db is not None:
+            return
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS votes (
+                roast_id TEXT NOT NULL,
+                voter_address TEXT NOT NULL,
+                match_id TEXT NOT NULL,
+                vote_weight INTEGER NOT NULL,
+                timestamp TEXT,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (roast_id, voter_address)
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS roast_tallies (
+                roast_id TEXT PRIMARY KEY,
+                match_id TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                votes INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                revision INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(roast_tallies)")}
+        if "revision" not in columns:
+            # Databases created before tallies carried a revision
+            self._db.execute("ALTER TABLE roast_tallies ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS roast_tallies_revision ON roast_tallies (revision)")
+        self._db.commit()
+        for roast_id, match_id, score, votes, revision in self._db.execute(
+            "SELECT roast_id, match_id, score, votes, revision FROM roast_tallies"
+        ):
+            self._tallies[roast_id] = {"roast_id": roast_id, "match_id": match_id, "score": score, "votes": votes}
+            self._revision = max(self._revision, revision)
+        self._ranking = sorted(_rank_key(t) for t in self._tallies.values())
+        self._match_rankings = {}
+        for tally in self._tallies.values():
+            self._match_rankings.setdefault(tally["match_id"], []).append(_rank_key(tally))
+        for ranking in self._match_rankings.values():
+            ranking.sort()
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.warning("Vote flush failed, will retry: %r", e)
+
+    # ----- writes -----
+
+    def _already_voted(self, roast_id: str, voter: str) -> bool:
+        if (roast_id, voter) in self._pending_keys:
+            return True
+        if self._db is None:
+            return False
+        row = self._db.execute(
+            "SELECT 1 FROM votes WHERE roast_id = ? AND voter_address = ?", (roast_id, voter)
+        ).fetchone()
+        return row is not None
+
+    def add(self, match_id: str, roast_id: str, voter_address: str, vote_weight: int,
+            timestamp: Optional[str] = None) -> Optional[Dict]:
+        """Record a vote; returns the roast's updated tally, or None for a duplicate vote"""
+        voter = voter_address.lower()
+        if self._already_voted(roast_id, voter):
+            self.duplicates += 1
+            return None
+        self._pending_keys.add((roast_id, voter))
+
+        tally = self._tallies.get(roast_id)
+        if tally is None:
+            tally = self._tallies[roast_id] = {"roast_id": roast_id, "match_id": match_id, "score": 0, "votes": 0}
+        else:
+            self._unrank(tally)
+        tally["score"] += vote_weight
+        tally["votes"] += 1
+        self._rank(tally)
+
+        self._pending.append((roast_id, voter, tally["match_id"], vote_weight, timestamp, time.time()))
+        self.accepted += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return dict(tally)
+
+    def flush(self):
+        """Write pending votes and bump the tallies they count toward in one transaction,
+        then pick up every tally changed since the last flush (by any worker)"""
+        if self._db is None:
+            return
+        pending, self._pending = self._pending, []
+        now = time.time()
+        # roast_id -> [match_id, score, votes] of the votes actually inserted
+        deltas: Dict[str, List] = {}
+        late_duplicates = 0
+        try:
+            with self._db:
+                for vote in pending:
+                    inserted = self._db.execute(
+                        "INSERT OR IGNORE INTO votes "
+                        "(roast_id, voter_address, match_id, vote_weight, timestamp, recorded_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        vote
+                    ).rowcount
+                    if inserted:
+                        delta = deltas.setdefault(vote[0], [vote[2], 0, 0])
+                        delta[1] += vote[3]
+                        delta[2] += 1
+                    else:
+                        # Another worker already wrote this voter's vote
+                        late_duplicates += 1
+                if deltas:
+                    # The votes inserted above hold the write lock, so no other
+                    # worker can take the same revision number
+                    (revision,) = self._db.execute(
+                        "SELECT COALESCE(MAX(revision), 0) + 1 FROM roast_tallies"
+                    ).fetchone()
+                    self._db.executemany(
+                        "INSERT INTO roast_tallies (roast_id, match_id, score, votes, updated_at, revision) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(roast_id) DO UPDATE SET score = score + excluded.score, "
+                        "votes = votes + excluded.votes, updated_at = excluded.updated_at, "
+                        "revision = excluded.revision",
+                        [(roast_id, match_id, score, votes, now, revision)
+                         for roast_id, (match_id, score, votes) in deltas.items()]
+                    )
+                # Roasts whose pending votes were all late duplicates got no new
+                # revision, but their local tallies counted those votes
+                recount = list({vote[0] for vote in pending} - set(deltas))
+                rows = self._db.execute(
+                    f"SELECT roast_id, match_id, score, votes, revision FROM roast_tallies "
+                    f"WHERE revision > ? OR roast_id IN ({', '.join('?' * len(recount))})",
+                    [self._revision, *recount]
+                ).fetchall()
+        except sqlite3.Error:
+            # Keep the batch for the next flush
+            self._pending = pending + self._pending
+            raise
+        self._pending_keys.clear()
+        self.accepted -= late_duplicates
+        self.duplicates += late_duplicates
+        for roast_id, match_id, score, votes, revision in rows:
+            self._revision = max(self._revision, revision)
+            tally = self._tallies.get(roast_id)
+            if tally is None:
+                tally = self._tallies[roast_id] = {"roast_id": roast_id, "match_id": match_id, "score": 0, "votes": 0}
+            else:
+                self._unrank(tally)
+            tally["score"], tally["votes"] = score, votes
+            self._rank(tally)
+        if pending:
+            self.flushes += 1
+
+    # ----- leaderboard -----
+
+    def _rank(self, tally: Dict):
+        key = _rank_key(tally)
+        insort(self._ranking, key)
+        insort(self._match_rankings.setdefault(tally["match_id"], []), key)
+
+    def _unrank(self, tally: Dict):
+        key = _rank_key(tally)
+        for ranking in (self._ranking, self._match_rankings.get(tally["match_id"], [])):
+            position = bisect_left(ranking, key)
+            if position < len(ranking) and ranking[position] == key:
+                del ranking[position]
+
+    def leaderboard(self, limit: int = 10, offset: int = 0, match_id: Optional[str] = None) -> Tuple[int, List[Dict]]:
+        """(total roasts, one page of ranked tallies), overall or for one match"""
+        ranking = self._ranking if match_id is None else self._match_rankings.get(match_id, [])
+        page = ranking[offset:offset + limit]
+        return len(ranking), [
+            dict(self._tallies[roast_id], rank=offset + position + 1)
+            for position, (_, _, roast_id) in enumerate(page)
+        ]
+
+    def tally(self, roast_id: str) -> Optional[Dict]:
+        tally = self._tallies.get(roast_id)
+        return dict(tally) if tally else None
+
+    def stats(self) -> Dict:
+        return {
+            "roasts": len(self._tallies),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+        }
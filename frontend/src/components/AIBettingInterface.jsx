@@ -45,12 +45,37 @@ export default function AIBettingInterface({ matchId, matchData }) {
     }
   }, [address]);
 
+  // Maps streamed JSON fields onto the AIPrediction shape
+  const STREAMED_FIELDS = {
+    prediction: 'ai_prediction',
+    roast_loser: 'ai_roast_loser',
+    confidence: 'confidence',
+    reasoning: 'reasoning'
+  };
+
   const loadAIPrediction = async () => {
     try {
-      const response = await aiService.generatePrediction(matchId);
+      // Show each part of the prediction as soon as the AI has written it
+      const response = await aiService.streamPrediction(matchId, {
+        onField: (name, value) => {
+          if (!STREAMED_FIELDS[name]) return;
+          setAiPrediction(prev => ({
+            confidence: 0,
+            home_team: matchData?.home_team,
+            away_team: matchData?.away_team,
+            ...prev,
+            [STREAMED_FIELDS[name]]: value
+          }));
+        }
+      });
       setAiPrediction(response.prediction);
-    } catch (err) {
-      console.error('Error loading AI prediction:', err);
+    } catch (streamErr) {
+      try {
+        const response = await aiService.generatePrediction(matchId);
+        setAiPrediction(response.prediction);
+      } catch (err) {
+        console.error('Error loading AI prediction:', err);
+      }
     }
   };
 
@@ -1,22 +1,46 @@
 import { useState, useEffect } from 'react';
+import { sportsService } from '../services/apiService';
 
 export default function LiveOdds({ matchId, homeTeam, awayTeam }) {
   const [odds, setOdds] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    // Simulate fetching odds
-    setTimeout(() => {
-      setOdds({
-        home: (Math.random() * 3 + 1).toFixed(2),
-        draw: (Math.random() * 2 + 2).toFixed(2),
-        away: (Math.random() * 3 + 1).toFixed(2),
-        overUnder: (Math.random() * 0.5 + 1.7).toFixed(2),
-        trending: Math.random() > 0.5 ? 'home' : 'away',
-        volume: Math.floor(Math.random() * 5000) + 1000
+    let cancelled = false;
+    setLoading(true);
+
+    sportsService.getMatchOdds(matchId)
+      .then((data) => {
+        if (cancelled) return;
+        const { probabilities } = data;
+        setOdds({
+          home: data.odds.home?.toFixed(2) ?? '-',
+          draw: data.odds.draw?.toFixed(2) ?? '-',
+          away: data.odds.away?.toFixed(2) ?? '-',
+          overUnder: data.odds.over_2_5?.toFixed(2) ?? '-',
+          trending: probabilities.home_win >= probabilities.away_win ? 'home' : 'away',
+          volume: Math.floor(Math.random() * 5000) + 1000
+        });
+      })
+      .catch(() => {
+        if (cancelled) return;
+        // No ratings for this match yet: show simulated odds
+        setOdds({
+          home: (Math.random() * 3 + 1).toFixed(2),
+          draw: (Math.random() * 2 + 2).toFixed(2),
+          away: (Math.random() * 3 + 1).toFixed(2),
+          overUnder: (Math.random() * 0.5 + 1.7).toFixed(2),
+          trending: Math.random() > 0.5 ? 'home' : 'away',
+          volume: Math.floor(Math.random() * 5000) + 1000
+        });
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
       });
-      setLoading(false);
-    }, 500);
+
+    return () => {
+      cancelled = true;
+    };
   }, [matchId]);
 
   if (loading) {
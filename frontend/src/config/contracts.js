@@ -43,13 +43,18 @@ export const API_ENDPOINTS = {
   SCHEDULE: '/api/schedule/next-league',
   LEAGUE_INFO: '/api/lookup/league',
   MATCH_DETAILS: '/api/lookup/event',
+  MATCH_ODDS: '/api/odds',
+  MATCH_LIVE_SOCKET: '/ws/match',
   TEAM_SEARCH: '/api/search/teams',
   PLAYER_SEARCH: '/api/search/players',
   VENUE_SEARCH: '/api/search/venues',
+  SEARCH_SUGGEST: '/api/search/suggest',
   EVENTS_BY_DATE: '/api/events/date',
   
   // AI Prediction endpoints
   AI_GENERATE_PREDICTION: '/ai/generate-prediction',
+  AI_STREAM_PREDICTION: '/ai/generate-prediction/stream',
+  AI_GENERATE_PREDICTIONS_BATCH: '/ai/generate-predictions',
   AI_GET_PREDICTION: '/ai/predictions',
   
   // NFT endpoints
@@ -693,6 +693,9 @@ export function usePredictionMarket() {
       }
 
       const oracleData = await oracleResponse.json();
+      if (oracleData.result === 'void') {
+        throw new Error(oracleData.reason || 'Market cannot be settled');
+      }
       
       // Now call the smart contract to resolve the market
       const tx = await contract.resolveMarket(marketId, oracleData.ai_was_right);
@@ -46,35 +46,46 @@ export default function Dashboard({ onMatchClick }) {
   };
 
   const loadAIPredictions = async (matches) => {
-    // Load AI predictions in parallel with a delay to avoid overwhelming the API
-    const predictionPromises = matches.slice(0, 6).map(async (match, index) => {
-      if (!match.idEvent) return;
-      
-      // Add delay between requests to avoid rate limiting
-      await new Promise(resolve => setTimeout(resolve, index * 2000));
-      
-      setLoadingPredictions(prev => ({ ...prev, [match.idEvent]: true }));
-      try {
-        const prediction = await aiService.generatePrediction(match.idEvent);
-        setAiPredictions(prev => ({ ...prev, [match.idEvent]: prediction.prediction }));
-      } catch (error) {
-        console.error(`Error loading AI prediction for match ${match.idEvent}:`, error);
-        // Set a fallback prediction for failed requests
-        setAiPredictions(prev => ({ 
-          ...prev, 
-          [match.idEvent]: {
-            ai_prediction: "AI analysis unavailable",
-            ai_roast_loser: "Sorry, AI is taking a coffee break ☕",
-            confidence: 0.5
-          }
+    // Load AI predictions for the first matches in a single batch request;
+    // each card updates as soon as its prediction is ready
+    const matchIds = matches.slice(0, 6).map(match => match.idEvent).filter(Boolean);
+    if (matchIds.length === 0) return;
+
+    const fallbackPrediction = {
+      ai_prediction: "AI analysis unavailable",
+      ai_roast_loser: "Sorry, AI is taking a coffee break ☕",
+      confidence: 0.5
+    };
+
+    setLoadingPredictions(prev => ({
+      ...prev,
+      ...Object.fromEntries(matchIds.map(id => [id, true]))
+    }));
+
+    try {
+      await aiService.generatePredictionsBatch(matchIds, (result) => {
+        if (!result.success) {
+          console.error(`Error loading AI prediction for match ${result.match_id}:`, result.error);
+        }
+        setAiPredictions(prev => ({
+          ...prev,
+          [result.match_id]: result.success ? result.prediction : fallbackPrediction
         }));
-      } finally {
-        setLoadingPredictions(prev => ({ ...prev, [match.idEvent]: false }));
-      }
-    });
-    
-    // Don't await all promises to avoid blocking the UI
-    Promise.allSettled(predictionPromises);
+        setLoadingPredictions(prev => ({ ...prev, [result.match_id]: false }));
+      });
+    } catch (error) {
+      console.error('Error loading AI predictions:', error);
+      // Set a fallback prediction for every match still waiting
+      setAiPredictions(prev => ({
+        ...Object.fromEntries(matchIds.map(id => [id, fallbackPrediction])),
+        ...prev
+      }));
+    } finally {
+      setLoadingPredictions(prev => ({
+        ...prev,
+        ...Object.fromEntries(matchIds.map(id => [id, false]))
+      }));
+    }
   };
 
   const fetchLeagueInfo = async () => {
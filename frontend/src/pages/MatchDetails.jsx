@@ -18,6 +18,21 @@ export default function MatchDetails({ match, onBack }) {
     }
   }, [match]);
 
+  // Live score / status pushes while the page is open
+  useEffect(() => {
+    if (!match?.idEvent) return undefined;
+
+    return sportsService.subscribeToMatch(match.idEvent, ({ match: live }) => {
+      setMatchDetails((current) => current && {
+        ...current,
+        intHomeScore: live.home_score,
+        intAwayScore: live.away_score,
+        strStatus: live.status,
+        strProgress: live.progress
+      });
+    });
+  }, [match?.idEvent]);
+
   const fetchMatchData = async () => {
     try {
       setLoading(true);
@@ -1,12 +1,20 @@
 import { useState, useEffect } from 'react';
 import { sportsService } from '../services/apiService';
 
+// Search types with autocomplete, mapped to /api/search/suggest kinds
+const SUGGEST_TYPES = { teams: 'team', players: 'player', venues: 'venue' };
+// Wait for a pause in typing before asking for suggestions
+const SUGGEST_DEBOUNCE_MS = 150;
+const SUGGEST_MIN_LENGTH = 2;
+
 export default function Search() {
   const [searchType, setSearchType] = useState('teams');
   const [query, setQuery] = useState('');
   const [results, setResults] = useState([]);
   const [loading, setLoading] = useState(false);
   const [recentSearches, setRecentSearches] = useState([]);
+  const [suggestions, setSuggestions] = useState([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
   const [filters, setFilters] = useState({
     league: '',
     country: '',
@@ -57,24 +65,53 @@ export default function Search() {
     }
   }, []);
 
+  useEffect(() => {
+    // Debounced autocomplete; a newer keystroke cancels the pending request
+    const kind = SUGGEST_TYPES[searchType];
+    if (!kind || query.trim().length < SUGGEST_MIN_LENGTH) {
+      setSuggestions([]);
+      return undefined;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const data = await sportsService.suggestSearch(query.trim(), { types: kind, signal: controller.signal });
+        setSuggestions(data.suggestions || []);
+      } catch (error) {
+        if (!controller.signal.aborted) {
+          console.error('Error loading suggestions:', error);
+        }
+      }
+    }, SUGGEST_DEBOUNCE_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query, searchType]);
+
   const handleSearch = async (e) => {
     e.preventDefault();
-    if (!query.trim()) return;
+    runSearch(query, searchType);
+  };
+
+  const runSearch = async (searchQuery, type) => {
+    if (!searchQuery.trim()) return;
+    setShowSuggestions(false);
 
     try {
       setLoading(true);
       let searchResults = [];
       
       // Use appropriate service method based on search type
-      switch (searchType) {
+      switch (type) {
         case 'teams':
-          searchResults = await sportsService.searchTeams(query);
+          searchResults = await sportsService.searchTeams(searchQuery);
           break;
         case 'players':
-          searchResults = await sportsService.searchPlayers(query);
+          searchResults = await sportsService.searchPlayers(searchQuery);
           break;
         case 'venues':
-          searchResults = await sportsService.searchVenues(query);
+          searchResults = await sportsService.searchVenues(searchQuery);
           break;
         default:
           searchResults = [];
@@ -86,13 +123,13 @@ export default function Search() {
       
       // Save to recent searches
       const newSearch = {
-        query,
-        type: searchType,
+        query: searchQuery,
+        type,
         timestamp: new Date().toISOString(),
         resultCount: filteredResults.length
       };
       
-      const updatedRecent = [newSearch, ...recentSearches.filter(s => s.query !== query)].slice(0, 5);
+      const updatedRecent = [newSearch, ...recentSearches.filter(s => s.query !== searchQuery)].slice(0, 5);
       setRecentSearches(updatedRecent);
       localStorage.setItem('recentSearches', JSON.stringify(updatedRecent));
       
@@ -122,7 +159,12 @@ export default function Search() {
   const handleRecentSearch = (recent) => {
     setQuery(recent.query);
     setSearchType(recent.type);
-    handleSearch({ preventDefault: () => {} });
+    runSearch(recent.query, recent.type);
+  };
+
+  const handleSuggestion = (suggestion) => {
+    setQuery(suggestion.name);
+    runSearch(suggestion.name, searchType);
   };
 
   const clearFilters = () => {
@@ -131,7 +173,7 @@ export default function Search() {
 
   const handleTrendingSearch = (trendingItem) => {
     setQuery(trendingItem.query);
-    handleSearch({ preventDefault: () => {} });
+    runSearch(trendingItem.query, searchType);
   };
 
   const renderResult = (item) => {
@@ -332,13 +374,40 @@ export default function Search() {
       <div className="search-form-container">
       <form onSubmit={handleSearch} className="search-form">
           <div className="search-input-container">
+        <div className="search-input-wrapper">
         <input
           type="text"
           value={query}
-          onChange={(e) => setQuery(e.target.value)}
+          onChange={(e) => {
+            setQuery(e.target.value);
+            setShowSuggestions(true);
+          }}
+          onFocus={() => setShowSuggestions(true)}
+          onBlur={() => setShowSuggestions(false)}
           placeholder={`Search for ${searchType}...`}
           className="search-input"
+          autoComplete="off"
         />
+        {showSuggestions && suggestions.length > 0 && (
+          <ul className="search-suggestions">
+            {suggestions.map((suggestion) => (
+              <li
+                key={`${suggestion.type}-${suggestion.id}`}
+                className="suggestion-item"
+                // mousedown fires before the input's blur hides the list
+                onMouseDown={(e) => {
+                  e.preventDefault();
+                  handleSuggestion(suggestion);
+                }}
+              >
+                {suggestion.image && <img src={suggestion.image} alt="" className="suggestion-image" />}
+                <span className="suggestion-name">{suggestion.name}</span>
+                {suggestion.detail && <span className="suggestion-detail">{suggestion.detail}</span>}
+              </li>
+            ))}
+          </ul>
+        )}
+        </div>
         <button type="submit" className="search-btn" disabled={loading}>
           {loading ? '🔄' : '🔍'} Search
         </button>
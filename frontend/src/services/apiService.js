@@ -69,6 +69,36 @@ export const sportsService = {
     }
   },
 
+  // Get model odds for a match
+  getMatchOdds: async (matchId) => {
+    try {
+      const response = await apiClient.get(`${API_ENDPOINTS.MATCH_ODDS}/${matchId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching match odds:', error);
+      throw error;
+    }
+  },
+
+  // Subscribe to live score / status changes for a match over a WebSocket.
+  // onMessage({ type: 'snapshot' | 'update' | 'final', match, changes }) is
+  // called for each push; returns a function that closes the subscription.
+  subscribeToMatch: (matchId, onMessage) => {
+    const socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}${API_ENDPOINTS.MATCH_LIVE_SOCKET}/${matchId}`);
+
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      onMessage(message);
+      if (message.type === 'final') socket.close();
+    };
+
+    socket.onerror = () => {
+      console.error('Live match connection failed');
+    };
+
+    return () => socket.close();
+  },
+
   // Search teams
   searchTeams: async (query) => {
     try {
@@ -91,6 +121,16 @@ export const sportsService = {
     }
   },
 
+  // Autocomplete suggestions (teams, players, venues) from the backend's local search index.
+  // Pass an AbortSignal so a newer keystroke can cancel the previous request.
+  suggestSearch: async (query, { types, limit = 8, signal } = {}) => {
+    const response = await apiClient.get(API_ENDPOINTS.SEARCH_SUGGEST, {
+      params: { q: query, types, limit },
+      signal,
+    });
+    return response.data;
+  },
+
   // Search venues
   searchVenues: async (query) => {
     try {
@@ -131,6 +171,59 @@ export const aiService = {
     }
   },
 
+  // Stream AI prediction generation over Server-Sent Events.
+  // onField(name, value) is called as each prediction field completes;
+  // resolves with the final prediction.
+  streamPrediction: (matchId, { onField } = {}) => {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`${API_URL}${API_ENDPOINTS.AI_STREAM_PREDICTION}?match_id=${matchId}`);
+
+      source.addEventListener('field', (event) => {
+        const { name, value } = JSON.parse(event.data);
+        if (onField) onField(name, value);
+      });
+
+      source.addEventListener('prediction', (event) => {
+        source.close();
+        resolve(JSON.parse(event.data));
+      });
+
+      source.addEventListener('error', (event) => {
+        source.close();
+        const detail = event.data ? JSON.parse(event.data).detail : 'Prediction stream failed';
+        console.error('Error streaming AI prediction:', detail);
+        reject(new Error(detail));
+      });
+    });
+  },
+
+  // Generate predictions for several matches in one request.
+  // onResult({ match_id, success, prediction | error }) is called for each
+  // match as soon as its prediction is ready.
+  generatePredictionsBatch: async (matchIds, onResult) => {
+    const response = await fetch(`${API_URL}${API_ENDPOINTS.AI_GENERATE_PREDICTIONS_BATCH}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ match_ids: matchIds, stream: true }),
+    });
+    if (!response.ok) {
+      throw new Error(`Batch prediction failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.filter(line => line.trim()).forEach(line => onResult(JSON.parse(line)));
+    }
+    if (buffer.trim()) onResult(JSON.parse(buffer));
+  },
+
   // Get existing AI prediction
   getPrediction: async (matchId) => {
     try {
@@ -181,10 +274,12 @@ export const communityService = {
     }
   },
 
-  // Get roast leaderboard
-  getRoastLeaderboard: async () => {
+  // Get roast leaderboard (paged; pass matchId for a single match)
+  getRoastLeaderboard: async ({ limit = 10, offset = 0, matchId } = {}) => {
     try {
-      const response = await apiClient.get(API_ENDPOINTS.COMMUNITY_ROAST_LEADERBOARD);
+      const response = await apiClient.get(API_ENDPOINTS.COMMUNITY_ROAST_LEADERBOARD, {
+        params: { limit, offset, match_id: matchId }
+      });
       return response.data;
     } catch (error) {
       console.error('Error fetching roast leaderboard:', error);